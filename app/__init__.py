@@ -4,7 +4,8 @@ Bariq Al-Yusr Application Factory
 import os
 from flask import Flask, jsonify, send_from_directory
 from app.config import config
-from app.extensions import db, migrate, jwt, cors, limiter, socketio
+from app.extensions import db, migrate, jwt, cors, limiter, socketio, cache
+from app.utils.serialization import OrjsonProvider
 
 
 def create_app(config_name=None):
@@ -24,6 +25,9 @@ def create_app(config_name=None):
     )
     app.config.from_object(config[config_name])
 
+    # Serialize JSON responses with orjson
+    app.json = OrjsonProvider(app)
+
     # Initialize extensions
     register_extensions(app)
 
@@ -52,7 +56,16 @@ def register_extensions(app):
     jwt.init_app(app)
     cors.init_app(app, resources={r"/api/*": {"origins": "*"}})
     limiter.init_app(app)
-    socketio.init_app(app)
+    cache.init_app(app)
+    socketio.init_app(app, message_queue=app.config.get('SOCKETIO_MESSAGE_QUEUE'))
+
+    # Background task queue
+    from app.tasks import init_celery
+    init_celery(app)
+
+    # Development guardrail against N+1 query regressions
+    from app.utils.query_counter import register_query_count_warning
+    register_query_count_warning(app)
 
     # JWT error handlers
     @jwt.expired_token_loader
@@ -335,12 +335,12 @@ def get_notifications():
 
     identity = current_user
     unread_only = request.args.get('unread_only', 'false').lower() == 'true'
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
 
     result = NotificationService.get_customer_notifications(
         identity['id'],
         unread_only=unread_only,
-        page=page
+        cursor=cursor
     )
 
     return jsonify(result)
@@ -358,6 +358,26 @@ def mark_notification_read(notification_id):
     return jsonify(result)
 
 
+@customers_bp.route('/me/notifications/read', methods=['POST'])
+@jwt_required()
+def mark_notifications_read():
+    """Mark a batch of notifications as read"""
+    from app.services.notification_service import NotificationService
+
+    identity = current_user
+    data = request.get_json() or {}
+
+    result = NotificationService.mark_many_as_read(
+        identity['id'],
+        data.get('notification_ids', [])
+    )
+
+    if not result['success']:
+        return jsonify(result), 400
+
+    return jsonify(result)
+
+
 @customers_bp.route('/me/notifications/read-all', methods=['POST'])
 @jwt_required()
 def mark_all_notifications_read():
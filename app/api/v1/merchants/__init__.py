@@ -1,7 +1,7 @@
 """
 Merchant Routes
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, current_user
 
 merchants_bp = Blueprint('merchants', __name__)
@@ -240,6 +240,35 @@ def get_staff():
     return jsonify(result)
 
 
+@merchants_bp.route('/me/staff/export', methods=['GET'])
+@jwt_required()
+def export_staff():
+    """Stream all staff (role-filtered) as a single JSON document"""
+    from app.services.merchant_service import MerchantService
+    from app.utils.serialization import iter_json_list_response
+
+    identity = current_user
+    role = request.args.get('role')
+    branch_id = request.args.get('branch_id')
+
+    result = MerchantService.get_staff(
+        identity['merchant_id'],
+        requester_id=identity['id'],
+        role=role,
+        branch_id=branch_id,
+        stream=True
+    )
+
+    if not result['success']:
+        status = 403 if result.get('error_code') == 'AUTH_003' else 404
+        return jsonify(result), status
+
+    return Response(
+        stream_with_context(iter_json_list_response('staff', result['data']['staff'])),
+        mimetype='application/json'
+    )
+
+
 @merchants_bp.route('/me/staff', methods=['POST'])
 @jwt_required()
 def create_staff():
@@ -725,12 +754,12 @@ def get_staff_notifications():
 
     identity = current_user
     unread_only = request.args.get('unread_only', 'false').lower() == 'true'
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
 
     result = NotificationService.get_merchant_staff_notifications(
         identity['id'],
         unread_only=unread_only,
-        page=page
+        cursor=cursor
     )
 
     return jsonify(result)
@@ -751,6 +780,26 @@ def mark_staff_notification_read(notification_id):
     return jsonify(result)
 
 
+@merchants_bp.route('/me/notifications/read', methods=['POST'])
+@jwt_required()
+def mark_staff_notifications_read():
+    """Mark a batch of notifications as read"""
+    from app.services.notification_service import NotificationService
+
+    identity = current_user
+    data = request.get_json() or {}
+
+    result = NotificationService.mark_many_staff_notifications_read(
+        identity['id'],
+        data.get('notification_ids', [])
+    )
+
+    if not result['success']:
+        return jsonify(result), 400
+
+    return jsonify(result)
+
+
 @merchants_bp.route('/me/notifications/read-all', methods=['POST'])
 @jwt_required()
 def mark_all_staff_notifications_read():
@@ -4,7 +4,6 @@ Webhook Routes - Handle external service callbacks
 from flask import Blueprint, jsonify, request, current_app
 from datetime import datetime, timedelta
 from app.extensions import limiter
-import json
 import os
 
 webhooks_bp = Blueprint('webhooks', __name__)
@@ -14,6 +13,8 @@ WEBHOOK_TIMESTAMP_TOLERANCE_MINUTES = 5  # Allow 5 minute window for webhook tim
 # PayTabs doesn't always send signatures, so we disable mandatory check
 # Enable this once you configure PayTabs to send server-to-server callbacks with signature
 REQUIRE_SIGNATURE_IN_PRODUCTION = False
+# PayTabs callbacks are a few KB; larger bodies are rejected before being read
+WEBHOOK_MAX_BODY_BYTES = 64 * 1024
 
 
 def _mask_sensitive_data(payload):
@@ -37,6 +38,13 @@ def _mask_sensitive_data(payload):
     return mask_recursive(masked)
 
 
+def _payload_too_large():
+    return jsonify({
+        'success': False,
+        'message': 'Payload too large'
+    }), 413
+
+
 @webhooks_bp.route('/paytabs', methods=['POST'])
 @limiter.limit("100 per minute")  # Allow reasonable webhook volume while preventing abuse
 def paytabs_callback():
@@ -55,8 +63,26 @@ def paytabs_callback():
     from app.services.paytabs_service import PayTabsService
 
     try:
-        # Get payload
-        payload = request.get_json()
+        # Declared oversize bodies are rejected without reading them
+        if request.content_length and request.content_length > WEBHOOK_MAX_BODY_BYTES:
+            current_app.logger.warning(f"PayTabs webhook rejected: Body too large ({request.content_length} bytes)")
+            return _payload_too_large()
+
+        # Chunked bodies declare no length: read at most one byte past the
+        # limit, so an oversize body is never held in memory in full
+        raw_body = request.stream.read(WEBHOOK_MAX_BODY_BYTES + 1)
+        if len(raw_body) > WEBHOOK_MAX_BODY_BYTES:
+            current_app.logger.warning("PayTabs webhook rejected: Streamed body exceeds size limit")
+            return _payload_too_large()
+
+        # The raw body is kept for signature verification
+        try:
+            payload = current_app.json.loads(raw_body) if raw_body and request.is_json else None
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid JSON payload'
+            }), 400
 
         if not payload:
             return jsonify({
@@ -66,7 +92,7 @@ def paytabs_callback():
 
         # Log webhook with masked sensitive data
         masked_payload = _mask_sensitive_data(payload)
-        current_app.logger.info(f"PayTabs webhook received: {json.dumps(masked_payload)}")
+        current_app.logger.info(f"PayTabs webhook received: {current_app.json.dumps(masked_payload)}")
 
         # === SECURITY: Signature Verification ===
         signature = request.headers.get('X-PayTabs-Signature')
@@ -83,7 +109,7 @@ def paytabs_callback():
 
         # Verify signature if provided (mandatory in production)
         if signature:
-            if not PayTabsService.verify_signature(payload, signature):
+            if not PayTabsService.verify_signature(raw_body, signature):
                 current_app.logger.warning("PayTabs webhook signature verification failed")
                 return jsonify({
                     'success': False,
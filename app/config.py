@@ -22,6 +22,16 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
 
+    # Connection pool (reuse warm connections, drop stale ones before use)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 20)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 30)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+        'pool_use_lifo': True,
+    }
+
     # JWT
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
@@ -34,6 +44,19 @@ class Config:
     RATELIMIT_DEFAULT = "100 per minute"
     RATELIMIT_STORAGE_URL = os.environ.get('REDIS_URL', 'memory://')
 
+    # Caching (Redis when available, per-process memory otherwise)
+    CACHE_TYPE = 'RedisCache' if os.environ.get('REDIS_URL') else 'SimpleCache'
+    CACHE_REDIS_URL = os.environ.get('REDIS_URL')
+    CACHE_DEFAULT_TIMEOUT = 60
+
+    # Socket.IO events relayed between web and worker processes over Redis pub/sub
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', os.environ.get('REDIS_URL'))
+
+    # Background tasks (Celery); tasks run inline when no broker is set.
+    # Set this only where the worker and beat processes (Procfile) also run,
+    # otherwise queued tasks are never consumed.
+    CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL')
+
     # Business Rules
     DEFAULT_CREDIT_LIMIT = 500  # SAR
     MAX_CREDIT_LIMIT = 5000  # SAR
@@ -81,6 +104,7 @@ class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     SQLALCHEMY_ECHO = True
+    QUERY_COUNT_WARNING_THRESHOLD = 20  # Flag likely N+1 queries per request
     SQLALCHEMY_DATABASE_URI = os.environ.get(
         'DATABASE_URL',
         'sqlite:///bariq_dev.db'
@@ -91,7 +115,11 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # In-memory SQLite uses a single-connection pool
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=5)
+    CACHE_TYPE = 'NullCache'
+    CELERY_BROKER_URL = None  # Run background tasks inline
+    SOCKETIO_MESSAGE_QUEUE = None
 
 
 class ProductionConfig(Config):
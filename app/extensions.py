@@ -7,6 +7,7 @@ from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from flask_caching import Cache
 from flask_socketio import SocketIO
 
 # Database
@@ -21,6 +22,9 @@ jwt = JWTManager()
 # CORS
 cors = CORS()
 
+# Caching
+cache = Cache()
+
 # Rate Limiting
 limiter = Limiter(
     key_func=get_remote_address,
@@ -24,8 +24,9 @@ class Branch(db.Model, TimestampMixin):
     city = db.Column(db.String(100), nullable=False)
     district = db.Column(db.String(100), nullable=True)
     address_line = db.Column(db.Text, nullable=True)
-    latitude = db.Column(db.Numeric(10, 8), nullable=True)
-    longitude = db.Column(db.Numeric(11, 8), nullable=True)
+    # Loaded as float; coordinates are only ever serialized, never summed
+    latitude = db.Column(db.Numeric(10, 8, asdecimal=False), nullable=True)
+    longitude = db.Column(db.Numeric(11, 8, asdecimal=False), nullable=True)
 
     # Contact
     phone = db.Column(db.String(20), nullable=True)
@@ -49,6 +50,11 @@ class Branch(db.Model, TimestampMixin):
 
     __table_args__ = (
         db.UniqueConstraint('merchant_id', 'code', name='uq_branch_merchant_code'),
+        # Partial indexes for the active-branch lookups (PostgreSQL)
+        db.Index('ix_branches_merchant_active', 'merchant_id',
+                 postgresql_where=db.text('is_active')),
+        db.Index('ix_branches_city_active_merchant', 'city', 'merchant_id',
+                 postgresql_where=db.text('is_active')),
     )
 
     def to_dict(self):
@@ -61,7 +67,7 @@ class Branch(db.Model, TimestampMixin):
             'code': self.code,
             'city': self.city,
             'district': self.district,
-            'latitude': float(self.latitude) if self.latitude else None,
-            'longitude': float(self.longitude) if self.longitude else None,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
             'is_active': self.is_active,
         }
@@ -67,6 +67,8 @@ class Customer(db.Model, TimestampMixin):
     # Settings
     language = db.Column(db.String(5), default='ar', nullable=False)
     notifications_enabled = db.Column(db.Boolean, default=True, nullable=False)
+    # Denormalized unread badge count, maintained by NotificationService
+    unread_notification_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
 
     # Timestamps
     last_login_at = db.Column(db.DateTime, nullable=True)
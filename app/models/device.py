@@ -30,6 +30,7 @@ class CustomerDevice(db.Model, TimestampMixin):
     # Unique constraint: one FCM token per customer
     __table_args__ = (
         db.UniqueConstraint('customer_id', 'fcm_token', name='uq_customer_device_token'),
+        db.Index('ix_customer_devices_customer_active', 'customer_id', 'is_active'),
     )
 
     def to_dict(self):
@@ -67,6 +68,7 @@ class MerchantUserDevice(db.Model, TimestampMixin):
     # Unique constraint
     __table_args__ = (
         db.UniqueConstraint('merchant_user_id', 'fcm_token', name='uq_merchant_user_device_token'),
+        db.Index('ix_merchant_user_devices_user_active', 'merchant_user_id', 'is_active'),
     )
 
     def to_dict(self):
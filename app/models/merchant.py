@@ -58,6 +58,15 @@ class Merchant(db.Model, TimestampMixin):
     transactions = db.relationship('Transaction', back_populates='merchant', lazy='dynamic')
     settlements = db.relationship('Settlement', back_populates='merchant', lazy='dynamic')
 
+    __table_args__ = (
+        # Partial index for the public store listing (PostgreSQL)
+        db.Index('ix_merchants_active_name', 'name_ar',
+                 postgresql_where=db.text("status = 'active'")),
+        # Keyset pagination for the admin merchant search
+        db.Index('ix_merchants_status_city_created', 'status', 'city',
+                 db.text('created_at DESC'), db.text('id DESC')),
+    )
+
     def __repr__(self):
         return f'<Merchant {self.name_ar}>'
 
@@ -1,6 +1,7 @@
 """
 Merchant User Model
 """
+from sqlalchemy.orm import raiseload, selectinload
 from app.extensions import db
 from app.models.mixins import TimestampMixin
 import uuid
@@ -70,6 +71,12 @@ class MerchantUser(db.Model, TimestampMixin):
     branch = db.relationship('Branch', back_populates='users')
     region = db.relationship('Region', back_populates='users')
 
+    __table_args__ = (
+        # Partial index for active staff counts (PostgreSQL)
+        db.Index('ix_merchant_users_merchant_active', 'merchant_id',
+                 postgresql_where=db.text('is_active')),
+    )
+
     def set_password(self, password):
         """Hash and set password"""
         self.password_hash = bcrypt.hashpw(
@@ -156,7 +163,11 @@ class MerchantUser(db.Model, TimestampMixin):
     def get_subordinates(self):
         """Get all users this user can manage"""
         my_level = self.get_role_level()
-        query = MerchantUser.query.filter(
+        query = MerchantUser.query.options(
+            selectinload(MerchantUser.branch),
+            selectinload(MerchantUser.region),
+            raiseload('*')
+        ).filter(
             MerchantUser.merchant_id == self.merchant_id,
             MerchantUser.id != self.id,
             MerchantUser.is_active == True
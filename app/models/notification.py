@@ -13,7 +13,7 @@ class Notification(db.Model, TimestampMixin):
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
 
-    customer_id = db.Column(db.String(36), db.ForeignKey('customers.id'), nullable=True, index=True)
+    customer_id = db.Column(db.String(36), db.ForeignKey('customers.id'), nullable=True)
     merchant_user_id = db.Column(db.String(36), db.ForeignKey('merchant_users.id'), nullable=True)
     admin_user_id = db.Column(db.String(36), db.ForeignKey('admin_users.id'), nullable=True)
 
@@ -33,6 +33,18 @@ class Notification(db.Model, TimestampMixin):
     # Relationships
     customer = db.relationship('Customer', back_populates='notifications')
 
+    __table_args__ = (
+        # Keyset pagination of a customer's notification feed
+        db.Index('ix_notifications_customer_created', 'customer_id',
+                 db.text('created_at DESC'), db.text('id DESC')),
+        # Read-filtered feeds, unread counts and mark-all-read batches;
+        # also serves plain customer_id lookups
+        db.Index('ix_notif_cust_read_created', 'customer_id', 'is_read',
+                 db.text('created_at DESC')),
+        db.Index('ix_notif_staff_read_created', 'merchant_user_id', 'is_read',
+                 db.text('created_at DESC')),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -28,7 +28,7 @@ class Payment(db.Model, TimestampMixin):
     completed_at = db.Column(db.DateTime, nullable=True)
 
     # PayTabs gateway fields
-    gateway_reference = db.Column(db.String(100), nullable=True, index=True)  # PayTabs tran_ref
+    gateway_reference = db.Column(db.String(100), nullable=True)  # PayTabs tran_ref, unique (see __table_args__)
     gateway_response = db.Column(db.Text, nullable=True)  # Full gateway response JSON
     refunded_amount = db.Column(db.Numeric(10, 2), default=0)
 
@@ -39,6 +39,18 @@ class Payment(db.Model, TimestampMixin):
     transaction = db.relationship('Transaction', back_populates='payments')
     customer = db.relationship('Customer', back_populates='payments')
 
+    __table_args__ = (
+        # Completed-payment statistics; amount is carried for index-only scans (PostgreSQL)
+        db.Index('ix_pay_status_completed', 'status', 'completed_at', 'payment_method',
+                 postgresql_include=['amount']),
+        # A customer's payment history, newest first
+        db.Index('ix_pay_customer_created', 'customer_id', db.text('created_at DESC')),
+        # Admin payment list keyset order
+        db.Index('ix_pay_created_id', 'created_at', 'id'),
+        # Webhook lookup by PayTabs tran_ref; one payment per reference
+        db.Index('uq_payments_gateway_reference', 'gateway_reference', unique=True),
+    )
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if not self.reference_number:
@@ -60,6 +60,11 @@ class Transaction(db.Model, TimestampMixin):
     returns = db.relationship('TransactionReturn', back_populates='transaction', lazy='dynamic')
     payments = db.relationship('Payment', back_populates='transaction', lazy='dynamic')
 
+    __table_args__ = (
+        # Outstanding balance lookups: customer + status, oldest due first
+        db.Index('ix_txn_customer_status_due', 'customer_id', 'status', 'due_date'),
+    )
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if not self.reference_number:
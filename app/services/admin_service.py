@@ -13,6 +13,7 @@ from app.models.admin_user import AdminUser
 from app.models.system_setting import SystemSetting
 from app.models.credit_limit_request import CreditLimitRequest
 from app.services.audit_service import AuditService
+from app.services.merchant_service import MerchantService
 
 
 class AdminService:
@@ -486,6 +487,7 @@ class AdminService:
 
             merchant.updated_at = datetime.utcnow()
             db.session.commit()
+            MerchantService.invalidate_store_cache(merchant_id)
 
             AuditService.log_action(
                 actor_type='admin',
@@ -518,6 +520,7 @@ class AdminService:
             merchant.approved_by = admin_id
 
             db.session.commit()
+            MerchantService.invalidate_store_cache(merchant_id)
 
             AuditService.log_action(
                 actor_type='admin',
@@ -546,6 +549,7 @@ class AdminService:
             merchant.suspended_at = datetime.utcnow()
 
             db.session.commit()
+            MerchantService.invalidate_store_cache(merchant_id)
 
             AuditService.log_action(
                 actor_type='admin',
@@ -46,20 +46,30 @@ class AuditService:
 
     @staticmethod
     def log_action(actor_type, actor_id, action, entity_type=None, entity_id=None,
-                   old_values=None, new_values=None, metadata=None, details=None):
-        """Log an action to the audit trail"""
+                   old_values=None, new_values=None, metadata=None, details=None,
+                   commit=True):
+        """
+        Log an action to the audit trail
+
+        Pass commit=False to only add the entry to the session, so it is
+        committed together with the caller's own changes.
+        """
+        log = AuditLog(
+            actor_type=actor_type,
+            actor_id=actor_id,
+            action=action,
+            entity_type=entity_type,
+            entity_id=entity_id,
+            old_values=old_values,
+            new_values=new_values,
+            extra_data=details or metadata
+        )
+        db.session.add(log)
+
+        if not commit:
+            return True
+
         try:
-            log = AuditLog(
-                actor_type=actor_type,
-                actor_id=actor_id,
-                action=action,
-                entity_type=entity_type,
-                entity_id=entity_id,
-                old_values=old_values,
-                new_values=new_values,
-                extra_data=details or metadata
-            )
-            db.session.add(log)
             db.session.commit()
             return True
         except Exception as e:
@@ -7,7 +7,7 @@ from app.extensions import db
 from app.models.customer import Customer
 from app.models.credit_limit_request import CreditLimitRequest
 from app.models.transaction import Transaction
-from app.models.notification import Notification
+from app.services.notification_service import NotificationService
 
 
 class CustomerService:
@@ -596,8 +596,6 @@ class CustomerService:
         customer.updated_at = datetime.utcnow()
 
         try:
-            db.session.commit()
-
             # Log the action
             from app.services.audit_service import AuditService
             AuditService.log_action(
@@ -607,12 +605,16 @@ class CustomerService:
                 entity_type='customer',
                 entity_id=customer_id,
                 old_values={'credit_limit': old_limit, 'available_credit': old_available},
-                new_values={'credit_limit': new_limit, 'available_credit': float(customer.available_credit), 'reason': reason}
+                new_values={'credit_limit': new_limit, 'available_credit': float(customer.available_credit), 'reason': reason},
+                commit=False
             )
 
             # Send notification to customer
             CustomerService._send_credit_limit_notification(customer, old_limit, new_limit)
 
+            # Limit change, audit entry and notification in one commit
+            db.session.commit()
+
             return {
                 'success': True,
                 'message': 'Credit limit updated successfully',
@@ -630,27 +632,23 @@ class CustomerService:
 
     @staticmethod
     def _send_credit_limit_notification(customer, old_limit, new_limit):
-        """Send notification about credit limit change"""
-        try:
-            if new_limit > old_limit:
-                title_ar = 'تم زيادة حد الشراء'
-                body_ar = f'تم زيادة حد الشراء الخاص بك من {old_limit} إلى {new_limit} ريال'
-            else:
-                title_ar = 'تم تعديل حد الشراء'
-                body_ar = f'تم تعديل حد الشراء الخاص بك من {old_limit} إلى {new_limit} ريال'
-
-            notification = Notification(
-                customer_id=customer.id,
-                title_ar=title_ar,
-                title_en='Credit Limit Updated',
-                body_ar=body_ar,
-                body_en=f'Your credit limit has been updated from {old_limit} to {new_limit} SAR',
-                type='account_update'
-            )
-            db.session.add(notification)
-            db.session.commit()
-        except Exception:
-            pass  # Don't fail the main operation if notification fails
+        """Add a credit limit change notification to the caller's transaction"""
+        if new_limit > old_limit:
+            title_ar = 'تم زيادة حد الشراء'
+            body_ar = f'تم زيادة حد الشراء الخاص بك من {old_limit} إلى {new_limit} ريال'
+        else:
+            title_ar = 'تم تعديل حد الشراء'
+            body_ar = f'تم تعديل حد الشراء الخاص بك من {old_limit} إلى {new_limit} ريال'
+
+        NotificationService.create_notification(
+            customer_id=customer.id,
+            title_ar=title_ar,
+            title_en='Credit Limit Updated',
+            body_ar=body_ar,
+            body_en=f'Your credit limit has been updated from {old_limit} to {new_limit} SAR',
+            notification_type='account_update',
+            commit=False
+        )
 
     # ==================== Password Management ====================
 
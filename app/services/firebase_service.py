@@ -18,6 +18,18 @@ except ImportError:
     FIREBASE_AVAILABLE = False
     logger.warning("firebase-admin not installed. Push notifications will be logged only.")
 
+# Maximum tokens per FCM multicast request
+FCM_MULTICAST_LIMIT = 500
+
+# FCM errors worth retrying later (service outage, throttling, timeouts).
+# UnknownError is what firebase-admin raises when a call gets no HTTP
+# response at all, e.g. when the OAuth token refresh cannot reach Google.
+FCM_TRANSIENT_ERRORS = (
+    'UnavailableError', 'InternalError', 'QuotaExceededError',
+    'ResourceExhaustedError', 'DeadlineExceededError', 'UnknownError',
+    'ConnectionError', 'Timeout', 'ReadTimeout', 'ConnectTimeout'
+)
+
 
 class FirebaseService:
     """Firebase Cloud Messaging service for push notifications"""
@@ -75,6 +87,29 @@ class FirebaseService:
             logger.error(f"Failed to initialize Firebase: {str(e)}")
             return False
 
+    @staticmethod
+    def _android_config():
+        """Android delivery options shared by all sends"""
+        return messaging.AndroidConfig(
+            priority='high',
+            notification=messaging.AndroidNotification(
+                sound='default',
+                click_action='FLUTTER_NOTIFICATION_CLICK'
+            )
+        )
+
+    @staticmethod
+    def _apns_config(badge_count=None):
+        """iOS delivery options shared by all sends"""
+        return messaging.APNSConfig(
+            payload=messaging.APNSPayload(
+                aps=messaging.Aps(
+                    sound='default',
+                    badge=badge_count
+                )
+            )
+        )
+
     @classmethod
     def send_notification(
         cls,
@@ -119,32 +154,13 @@ class FirebaseService:
                 image=image_url
             )
 
-            # Build Android config
-            android_config = messaging.AndroidConfig(
-                priority='high',
-                notification=messaging.AndroidNotification(
-                    sound='default',
-                    click_action='FLUTTER_NOTIFICATION_CLICK'
-                )
-            )
-
-            # Build iOS config
-            apns_config = messaging.APNSConfig(
-                payload=messaging.APNSPayload(
-                    aps=messaging.Aps(
-                        sound='default',
-                        badge=badge_count
-                    )
-                )
-            )
-
             # Build message
             message = messaging.Message(
                 notification=notification,
                 data=data or {},
                 token=token,
-                android=android_config,
-                apns=apns_config
+                android=cls._android_config(),
+                apns=cls._apns_config(badge_count)
             )
 
             # Send message
@@ -188,7 +204,9 @@ class FirebaseService:
         image_url: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Send push notification to multiple devices (using individual sends for FCM v1 API)
+        Send push notification to multiple devices
+
+        Uses the FCM v1 batch API, one request per FCM_MULTICAST_LIMIT tokens.
 
         Args:
             tokens: List of FCM device tokens
@@ -225,26 +243,41 @@ class FirebaseService:
         failure_count = 0
         failed_tokens = []
 
-        # Send to each device individually (FCM v1 API compatible)
-        for token in tokens:
-            result = cls.send_notification(
-                token=token,
-                title=title,
-                body=body,
-                data=data,
-                image_url=image_url
+        # One FCM v1 batch call per FCM_MULTICAST_LIMIT tokens
+        for i in range(0, len(tokens), FCM_MULTICAST_LIMIT):
+            chunk = tokens[i:i + FCM_MULTICAST_LIMIT]
+            message = messaging.MulticastMessage(
+                notification=messaging.Notification(
+                    title=title,
+                    body=body,
+                    image=image_url
+                ),
+                data=data or {},
+                tokens=chunk,
+                android=cls._android_config(),
+                apns=cls._apns_config()
             )
 
-            if result.get('success') and not result.get('mock'):
-                success_count += 1
-                logger.info(f"FCM sent to {token[:30]}...")
-            else:
-                failure_count += 1
-                failed_tokens.append({
-                    'token': token,
-                    'error': result.get('message', 'Unknown error')
-                })
-                logger.warning(f"FCM failed for {token[:30]}...: {result.get('message')}")
+            try:
+                response = messaging.send_each_for_multicast(message)
+            except Exception as e:
+                logger.error(f"FCM multicast error: {str(e)}")
+                failure_count += len(chunk)
+                failed_tokens.extend(
+                    {'token': token, 'error': f'{type(e).__name__}: {e}'} for token in chunk
+                )
+                continue
+
+            success_count += response.success_count
+            failure_count += response.failure_count
+            for token, send_response in zip(chunk, response.responses):
+                if not send_response.success:
+                    error = send_response.exception
+                    failed_tokens.append({
+                        'token': token,
+                        'error': f'{type(error).__name__}: {error}'
+                    })
+                    logger.warning(f"FCM failed for {token[:30]}...: {error}")
 
         logger.info(f"FCM send complete: {success_count} success, {failure_count} failed")
 
@@ -367,6 +400,22 @@ class PushNotificationManager:
         self.CustomerDevice = CustomerDevice
         self.MerchantUserDevice = MerchantUserDevice
 
+    def send_to_tokens(
+        self,
+        tokens: List[str],
+        title: str,
+        body: str,
+        data: Dict[str, str] = None,
+        device_type: str = 'customer'
+    ) -> Dict[str, Any]:
+        """
+        Multicast to the given tokens and record the outcome on their devices
+        (last_used_at for delivered tokens, deactivation for unregistered ones)
+        """
+        result = FirebaseService.send_multicast(tokens=tokens, title=title, body=body, data=data)
+        self._record_delivery(tokens, result, device_type)
+        return result
+
     def get_customer_tokens(self, customer_id: str) -> List[str]:
         """Get all active FCM tokens for a customer"""
         devices = self.CustomerDevice.query.filter_by(
@@ -387,16 +436,14 @@ class PushNotificationManager:
         """Get FCM tokens for all active staff of a merchant"""
         from app.models.merchant_user import MerchantUser
 
-        # Get all merchant users
-        staff = MerchantUser.query.filter_by(
-            merchant_id=merchant_id,
-            is_active=True
+        rows = self.db.session.query(self.MerchantUserDevice.fcm_token).join(
+            MerchantUser, MerchantUser.id == self.MerchantUserDevice.merchant_user_id
+        ).filter(
+            MerchantUser.merchant_id == merchant_id,
+            MerchantUser.is_active == True,
+            self.MerchantUserDevice.is_active == True
         ).all()
-
-        tokens = []
-        for s in staff:
-            tokens.extend(self.get_merchant_user_tokens(s.id))
-        return tokens
+        return [row.fcm_token for row in rows]
 
     def send_to_customer(
         self,
@@ -408,25 +455,27 @@ class PushNotificationManager:
         data: Dict[str, str] = None,
         notification_type: str = None,
         related_entity_type: str = None,
-        related_entity_id: str = None
+        related_entity_id: str = None,
+        create_in_app: bool = True
     ) -> Dict[str, Any]:
         """
         Send push notification to all customer devices
-        Also creates an in-app notification record
+        Also creates an in-app notification record unless create_in_app is False
         """
         from app.services.notification_service import NotificationService
 
         # Create in-app notification
-        NotificationService.create_notification(
-            customer_id=customer_id,
-            title_ar=title_ar,
-            body_ar=body_ar,
-            notification_type=notification_type or 'push',
-            title_en=title_en,
-            body_en=body_en,
-            related_entity_type=related_entity_type,
-            related_entity_id=related_entity_id
-        )
+        if create_in_app:
+            NotificationService.create_notification(
+                customer_id=customer_id,
+                title_ar=title_ar,
+                body_ar=body_ar,
+                notification_type=notification_type or 'push',
+                title_en=title_en,
+                body_en=body_en,
+                related_entity_type=related_entity_type,
+                related_entity_id=related_entity_id
+            )
 
         # Get customer devices
         tokens = self.get_customer_tokens(customer_id)
@@ -448,23 +497,15 @@ class PushNotificationManager:
             push_data['entity_id'] = related_entity_id
 
         # Send push (use Arabic as default)
-        result = FirebaseService.send_multicast(
-            tokens=tokens,
-            title=title_ar,
-            body=body_ar,
-            data=push_data
-        )
-
-        # Handle failed tokens (mark as inactive)
-        if result.get('failed_tokens'):
-            self._handle_failed_tokens(result['failed_tokens'], 'customer')
+        result = self.send_to_tokens(tokens, title_ar, body_ar, push_data, 'customer')
 
         return {
             'success': True,
             'message': 'Notification sent',
             'push_sent': True,
             'devices_reached': result.get('success_count', 0),
-            'devices_failed': result.get('failure_count', 0)
+            'devices_failed': result.get('failure_count', 0),
+            'retryable': self._is_transient_failure(result)
         }
 
     def send_to_merchant_user(
@@ -477,25 +518,27 @@ class PushNotificationManager:
         data: Dict[str, str] = None,
         notification_type: str = None,
         related_entity_type: str = None,
-        related_entity_id: str = None
+        related_entity_id: str = None,
+        create_in_app: bool = True
     ) -> Dict[str, Any]:
         """
         Send push notification to a merchant staff member
-        Also creates an in-app notification record
+        Also creates an in-app notification record unless create_in_app is False
         """
         from app.services.notification_service import NotificationService
 
         # Create in-app notification
-        NotificationService.create_staff_notification(
-            staff_id=merchant_user_id,
-            title_ar=title_ar,
-            body_ar=body_ar,
-            notification_type=notification_type or 'push',
-            title_en=title_en,
-            body_en=body_en,
-            related_entity_type=related_entity_type,
-            related_entity_id=related_entity_id
-        )
+        if create_in_app:
+            NotificationService.create_staff_notification(
+                staff_id=merchant_user_id,
+                title_ar=title_ar,
+                body_ar=body_ar,
+                notification_type=notification_type or 'push',
+                title_en=title_en,
+                body_en=body_en,
+                related_entity_type=related_entity_type,
+                related_entity_id=related_entity_id
+            )
 
         # Get merchant user devices
         tokens = self.get_merchant_user_tokens(merchant_user_id)
@@ -517,23 +560,15 @@ class PushNotificationManager:
             push_data['entity_id'] = related_entity_id
 
         # Send push
-        result = FirebaseService.send_multicast(
-            tokens=tokens,
-            title=title_ar,
-            body=body_ar,
-            data=push_data
-        )
-
-        # Handle failed tokens
-        if result.get('failed_tokens'):
-            self._handle_failed_tokens(result['failed_tokens'], 'merchant')
+        result = self.send_to_tokens(tokens, title_ar, body_ar, push_data, 'merchant')
 
         return {
             'success': True,
             'message': 'Notification sent',
             'push_sent': True,
             'devices_reached': result.get('success_count', 0),
-            'devices_failed': result.get('failure_count', 0)
+            'devices_failed': result.get('failure_count', 0),
+            'retryable': self._is_transient_failure(result)
         }
 
     def send_to_merchant_all_staff(
@@ -551,21 +586,25 @@ class PushNotificationManager:
         from app.services.notification_service import NotificationService
 
         # Get all staff
-        staff = MerchantUser.query.filter_by(
-            merchant_id=merchant_id,
-            is_active=True
+        staff = self.db.session.scalars(
+            self.db.select(MerchantUser.id).filter_by(
+                merchant_id=merchant_id,
+                is_active=True
+            )
         ).all()
 
-        # Create in-app notifications for all staff
-        for s in staff:
-            NotificationService.create_staff_notification(
-                staff_id=s.id,
-                title_ar=title_ar,
-                body_ar=body_ar,
-                notification_type=notification_type or 'push',
-                title_en=title_en,
-                body_en=body_en
-            )
+        # Create in-app notifications for all staff in one transaction
+        NotificationService.create_staff_notifications_bulk([
+            {
+                'merchant_user_id': staff_id,
+                'title_ar': title_ar,
+                'body_ar': body_ar,
+                'title_en': title_en,
+                'body_en': body_en,
+                'type': notification_type or 'push'
+            }
+            for staff_id in staff
+        ])
 
         # Get all tokens
         tokens = self.get_merchant_all_staff_tokens(merchant_id)
@@ -582,15 +621,7 @@ class PushNotificationManager:
         if notification_type:
             push_data['notification_type'] = notification_type
 
-        result = FirebaseService.send_multicast(
-            tokens=tokens,
-            title=title_ar,
-            body=body_ar,
-            data=push_data
-        )
-
-        if result.get('failed_tokens'):
-            self._handle_failed_tokens(result['failed_tokens'], 'merchant')
+        result = self.send_to_tokens(tokens, title_ar, body_ar, push_data, 'merchant')
 
         return {
             'success': True,
@@ -600,27 +631,52 @@ class PushNotificationManager:
             'devices_failed': result.get('failure_count', 0)
         }
 
-    def _handle_failed_tokens(self, failed_tokens: List, device_type: str):
-        """Mark failed tokens as inactive"""
-        try:
-            for failed in failed_tokens:
-                token = failed.get('token') if isinstance(failed, dict) else failed
-                error = failed.get('error', '') if isinstance(failed, dict) else ''
-
-                # Only deactivate for unregistered tokens
-                if 'Unregistered' in str(error) or 'NotRegistered' in str(error):
-                    if device_type == 'customer':
-                        self.CustomerDevice.query.filter_by(
-                            fcm_token=token
-                        ).update({'is_active': False})
-                    else:
-                        self.MerchantUserDevice.query.filter_by(
-                            fcm_token=token
-                        ).update({'is_active': False})
+    @staticmethod
+    def _is_transient_failure(result: Dict[str, Any]) -> bool:
+        """True when no device was reached and every failure is worth retrying"""
+        failed_tokens = result.get('failed_tokens') or []
+        return bool(failed_tokens) and not result.get('success_count') and all(
+            str(failed.get('error', '')).startswith(FCM_TRANSIENT_ERRORS)
+            for failed in failed_tokens
+        )
+
+    def _record_delivery(self, tokens: List[str], result: Dict[str, Any], device_type: str):
+        """
+        Stamp last_used_at on the devices FCM accepted and deactivate the
+        unregistered ones, so prune_stale_devices only retires devices that
+        stopped receiving pushes.
+        """
+        failed_tokens = set()
+        unregistered = []
+        for failed in result.get('failed_tokens') or []:
+            token = failed.get('token') if isinstance(failed, dict) else failed
+            error = failed.get('error', '') if isinstance(failed, dict) else ''
+            failed_tokens.add(token)
 
+            # Only deactivate for unregistered tokens
+            if 'Unregistered' in str(error) or 'NotRegistered' in str(error):
+                unregistered.append(token)
+
+        delivered = [token for token in tokens if token not in failed_tokens]
+
+        if not delivered and not unregistered:
+            return
+
+        model = self.CustomerDevice if device_type == 'customer' else self.MerchantUserDevice
+        now = datetime.utcnow()
+        try:
+            for i in range(0, len(delivered), FCM_MULTICAST_LIMIT):
+                model.query.filter(
+                    model.fcm_token.in_(delivered[i:i + FCM_MULTICAST_LIMIT]),
+                    model.is_active == True
+                ).update({'last_used_at': now}, synchronize_session=False)
+            if unregistered:
+                model.query.filter(model.fcm_token.in_(unregistered)).update(
+                    {'is_active': False}, synchronize_session=False
+                )
             self.db.session.commit()
         except Exception as e:
-            logger.error(f"Error handling failed tokens: {str(e)}")
+            logger.error(f"Error recording push delivery: {str(e)}")
             self.db.session.rollback()
 
 
@@ -2,13 +2,17 @@
 Merchant Service - Full Implementation
 """
 from datetime import datetime
-from flask import current_app
-from app.extensions import db
+import uuid
+from flask import current_app, g
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, load_only, raiseload
+from app.extensions import db, cache
 from app.models.merchant import Merchant
 from app.models.region import Region
 from app.models.branch import Branch
-from app.models.merchant_user import MerchantUser
+from app.models.merchant_user import MerchantUser, ROLE_HIERARCHY
 from app.models.transaction import Transaction
+from app.utils.pagination import InvalidCursorError, decode_cursor, keyset_page
 from app.utils.role_access import (
     get_merchant_user,
     validate_branch_access,
@@ -19,38 +23,183 @@ from app.utils.role_access import (
     can_view_reports
 )
 
+# Public store views change rarely and every merchant, branch and status
+# write calls invalidate_store_cache, so the TTL is only a safety net
+STORE_CACHE_TIMEOUT = 300
 
-class MerchantService:
-    """Merchant service for all merchant-related operations"""
+_VALID_ROLES = frozenset(ROLE_HIERARCHY)
+_INVALID_ROLE_MESSAGE = f'Invalid role. Must be one of: {list(ROLE_HIERARCHY)}'
 
-    # ==================== Registration ====================
+_MERCHANT_STATUSES = ('pending', 'active', 'suspended', 'rejected')
+_VALID_MERCHANT_STATUSES = frozenset(_MERCHANT_STATUSES)
+_INVALID_STATUS_MESSAGE = f'Invalid status. Must be one of: {list(_MERCHANT_STATUSES)}'
 
-    @staticmethod
-    def register_merchant(data):
-        """Register a new merchant"""
-        # Check if commercial registration already exists
-        existing = Merchant.query.filter_by(
-            commercial_registration=data.get('commercial_registration')
-        ).first()
+# PostgreSQL SQLSTATE for unique_violation
+_PG_UNIQUE_VIOLATION = '23505'
 
-        if existing:
-            return {
-                'success': False,
-                'message': 'Commercial registration already registered',
-                'error_code': 'MERCH_002'
-            }
+# Columns projected by the admin merchant list (same fields as Merchant.to_dict)
+_MERCHANT_LIST_COLS = (
+    Merchant.id, Merchant.name_ar, Merchant.name_en, Merchant.commercial_registration,
+    Merchant.tax_number, Merchant.business_type, Merchant.email, Merchant.phone,
+    Merchant.website, Merchant.city, Merchant.district, Merchant.address_line,
+    Merchant.bank_name, Merchant.iban, Merchant.account_holder_name, Merchant.status,
+    Merchant.commission_rate, Merchant.plan_type, Merchant.created_at,
+)
 
-        # Check if email already exists
-        if Merchant.query.filter_by(email=data.get('email')).first():
+# Concatenated search text for the admin merchant search. Must match the
+# expression of the ix_merchants_search_trgm GIN index (migration 011)
+# exactly, so literals are inlined rather than bound.
+_MERCHANT_SEARCH_EXPR = db.func.coalesce(Merchant.name_ar, db.literal_column("''"))
+for _column in (Merchant.name_en, Merchant.commercial_registration, Merchant.email):
+    _MERCHANT_SEARCH_EXPR = (
+        _MERCHANT_SEARCH_EXPR.op('||')(db.literal_column("' '"))
+        .op('||')(db.func.coalesce(_column, db.literal_column("''")))
+    )
+del _column
+
+
+def _get_merchant_cached(merchant_id):
+    """
+    Get a merchant by ID, memoized for the current request.
+
+    Read paths only: mutating methods load with db.session.get so they
+    never act on a stale or negative memo entry.
+    """
+    cache = g.setdefault('_merchant_cache', {})
+    if merchant_id not in cache:
+        cache[merchant_id] = db.session.get(Merchant, merchant_id)
+    return cache[merchant_id]
+
+
+def _merchant_exists(merchant_id):
+    """Check that a merchant exists without loading the full row"""
+    cache = g.get('_merchant_cache')
+    if cache and merchant_id in cache:
+        return cache[merchant_id] is not None
+    return db.session.query(db.exists().where(Merchant.id == merchant_id)).scalar()
+
+
+def _fast_count(model, **filters):
+    """Count rows with a plain SELECT count(id) instead of a wrapped subquery"""
+    return db.session.query(db.func.count(model.id)).filter_by(**filters).scalar() or 0
+
+
+def _with_branch_counts(region_query, *branch_filters):
+    """
+    Add each region's active branch count to a Region query.
+
+    The counts come from one grouped subquery joined into the same SELECT,
+    so rows are (region, branch_count) pairs.
+    """
+    counts = db.session.query(
+        Branch.region_id, db.func.count(Branch.id).label('branch_count')
+    ).filter(Branch.is_active == True, *branch_filters).group_by(Branch.region_id).subquery()
+    return region_query.outerjoin(counts, counts.c.region_id == Region.id).add_columns(
+        db.func.coalesce(counts.c.branch_count, 0)
+    )
+
+
+def _validate_staff_scope(merchant_id, branch_id=None, region_id=None):
+    """
+    Check that a branch and/or region belong to the merchant in one round-trip.
+
+    Returns an error response for the first failed check, or None.
+    """
+    checks = []
+    if branch_id:
+        checks.append(db.exists().where(
+            Branch.id == branch_id, Branch.merchant_id == merchant_id
+        ).label('branch_ok'))
+    if region_id:
+        checks.append(db.exists().where(
+            Region.id == region_id, Region.merchant_id == merchant_id
+        ).label('region_ok'))
+
+    if not checks:
+        return None
+
+    row = db.session.execute(db.select(*checks)).one()
+
+    if branch_id and not row.branch_ok:
+        return {
+            'success': False,
+            'message': 'Branch not found',
+            'error_code': 'MERCH_005'
+        }
+    if region_id and not row.region_ok:
+        return {
+            'success': False,
+            'message': 'Region not found',
+            'error_code': 'MERCH_003'
+        }
+    return None
+
+
+def _serialize_staff(user):
+    """Serialize a staff member with their branch and region"""
+    user_dict = user.to_dict()
+    user_dict['branch'] = user.branch.to_dict() if user.branch else None
+    user_dict['region'] = user.region.to_dict() if user.region else None
+    return user_dict
+
+
+def _format_merchant_row(row):
+    """Format a projected merchant row like Merchant.to_dict"""
+    data = row._asdict()
+    data['commission_rate'] = float(row.commission_rate) if row.commission_rate else 2.5
+    data['created_at'] = row.created_at.isoformat() if row.created_at else None
+    return data
+
+
+def _violated_unique_constraint(error):
+    """
+    Identify the unique constraint an IntegrityError violated, or None.
+
+    PostgreSQL reports the constraint name in the driver diagnostics
+    (SQLSTATE 23505). SQLite only lists the columns, e.g.
+    "regions.merchant_id, regions.name_ar", which are returned instead.
+    """
+    orig = error.orig
+    if getattr(orig, 'pgcode', None) == _PG_UNIQUE_VIOLATION:
+        return orig.diag.constraint_name
+    if getattr(orig, 'sqlite_errorname', None) == 'SQLITE_CONSTRAINT_UNIQUE':
+        return str(orig).partition(': ')[2]
+    return None
+
+
+def _unique_violation_response(error, violations):
+    """
+    Map a unique-constraint IntegrityError to an API error response.
+
+    `violations` holds (constraint name, SQLite column list, message,
+    error code) entries.
+    """
+    violated = _violated_unique_constraint(error)
+    if violated is None:
+        return None
+    for constraint, columns, message, error_code in violations:
+        if violated in (constraint, columns):
             return {
                 'success': False,
-                'message': 'Email already registered',
-                'error_code': 'VAL_001'
+                'message': message,
+                'error_code': error_code
             }
+    return None
 
+
+class MerchantService:
+    """Merchant service for all merchant-related operations"""
+
+    # ==================== Registration ====================
+
+    @staticmethod
+    def register_merchant(data):
+        """Register a new merchant"""
         try:
-            # Create merchant
+            # Create merchant with a client-side ID so the owner can
+            # reference it without flushing first
             merchant = Merchant(
+                id=str(uuid.uuid4()),
                 name_ar=data.get('name_ar'),
                 name_en=data.get('name_en'),
                 commercial_registration=data.get('commercial_registration'),
@@ -69,7 +218,6 @@ class MerchantService:
             )
 
             db.session.add(merchant)
-            db.session.flush()  # Get merchant ID
 
             # Create owner user
             owner = MerchantUser(
@@ -93,6 +241,22 @@ class MerchantService:
                     'owner': owner.to_dict()
                 }
             }
+        except IntegrityError as e:
+            db.session.rollback()
+            # Duplicates are caught by the unique constraints on insert
+            violation = _unique_violation_response(e, [
+                ('ix_merchants_commercial_registration', 'merchants.commercial_registration',
+                 'Commercial registration already registered', 'MERCH_002'),
+                ('merchants_email_key', 'merchants.email', 'Email already registered', 'VAL_001'),
+                ('merchant_users_email_key', 'merchant_users.email', 'Email already registered', 'VAL_001'),
+            ])
+            if violation:
+                return violation
+            return {
+                'success': False,
+                'message': f'Failed to register merchant: {str(e)}',
+                'error_code': 'SYS_001'
+            }
         except Exception as e:
             db.session.rollback()
             return {
@@ -106,7 +270,7 @@ class MerchantService:
     @staticmethod
     def get_merchant_profile(merchant_id):
         """Get merchant profile by ID"""
-        merchant = Merchant.query.get(merchant_id)
+        merchant = _get_merchant_cached(merchant_id)
 
         if not merchant:
             return {
@@ -116,9 +280,9 @@ class MerchantService:
             }
 
         # Get counts
-        branch_count = Branch.query.filter_by(merchant_id=merchant_id, is_active=True).count()
-        staff_count = MerchantUser.query.filter_by(merchant_id=merchant_id, is_active=True).count()
-        region_count = Region.query.filter_by(merchant_id=merchant_id, is_active=True).count()
+        branch_count = _fast_count(Branch, merchant_id=merchant_id, is_active=True)
+        staff_count = _fast_count(MerchantUser, merchant_id=merchant_id, is_active=True)
+        region_count = _fast_count(Region, merchant_id=merchant_id, is_active=True)
 
         return {
             'success': True,
@@ -135,7 +299,7 @@ class MerchantService:
     @staticmethod
     def update_merchant_profile(merchant_id, data):
         """Update merchant profile"""
-        merchant = Merchant.query.get(merchant_id)
+        merchant = db.session.get(Merchant, merchant_id)
 
         if not merchant:
             return {
@@ -155,10 +319,9 @@ class MerchantService:
             if field in data:
                 setattr(merchant, field, data[field])
 
-        merchant.updated_at = datetime.utcnow()
-
         try:
             db.session.commit()
+            MerchantService.invalidate_store_cache(merchant_id)
             return {
                 'success': True,
                 'message': 'Profile updated successfully',
@@ -179,16 +342,14 @@ class MerchantService:
     @staticmethod
     def get_regions(merchant_id, staff_id=None):
         """Get regions for a merchant with role-based filtering"""
-        merchant = Merchant.query.get(merchant_id)
-
-        if not merchant:
+        if not _merchant_exists(merchant_id):
             return {
                 'success': False,
                 'message': 'Merchant not found',
                 'error_code': 'MERCH_001'
             }
 
-        query = Region.query.filter_by(merchant_id=merchant_id)
+        query = Region.query.options(raiseload('*')).filter_by(merchant_id=merchant_id)
 
         # Apply role-based filtering if staff_id is provided
         if staff_id:
@@ -218,14 +379,12 @@ class MerchantService:
                     'error_code': 'MERCH_006'
                 }
 
-        regions = query.order_by(Region.name_ar).all()
+        rows = _with_branch_counts(query, Branch.merchant_id == merchant_id).order_by(Region.name_ar).all()
 
         regions_data = []
-        for region in regions:
+        for region, branch_count in rows:
             region_dict = region.to_dict()
-            region_dict['branch_count'] = Branch.query.filter_by(
-                region_id=region.id, is_active=True
-            ).count()
+            region_dict['branch_count'] = branch_count
             regions_data.append(region_dict)
 
         return {
@@ -238,28 +397,13 @@ class MerchantService:
     @staticmethod
     def create_region(merchant_id, data):
         """Create a new region"""
-        merchant = Merchant.query.get(merchant_id)
-
-        if not merchant:
+        if not _merchant_exists(merchant_id):
             return {
                 'success': False,
                 'message': 'Merchant not found',
                 'error_code': 'MERCH_001'
             }
 
-        # Check if region name already exists for this merchant
-        existing = Region.query.filter_by(
-            merchant_id=merchant_id,
-            name_ar=data.get('name_ar')
-        ).first()
-
-        if existing:
-            return {
-                'success': False,
-                'message': 'Region with this name already exists',
-                'error_code': 'VAL_001'
-            }
-
         try:
             region = Region(
                 merchant_id=merchant_id,
@@ -280,6 +424,19 @@ class MerchantService:
                     'region': region.to_dict()
                 }
             }
+        except IntegrityError as e:
+            db.session.rollback()
+            violation = _unique_violation_response(e, [
+                ('uq_region_merchant_name', 'regions.merchant_id, regions.name_ar',
+                 'Region with this name already exists', 'VAL_001'),
+            ])
+            if violation:
+                return violation
+            return {
+                'success': False,
+                'message': f'Failed to create region: {str(e)}',
+                'error_code': 'SYS_001'
+            }
         except Exception as e:
             db.session.rollback()
             return {
@@ -320,8 +477,6 @@ class MerchantService:
             if field in data:
                 setattr(region, field, data[field])
 
-        region.updated_at = datetime.utcnow()
-
         try:
             db.session.commit()
             return {
@@ -352,7 +507,7 @@ class MerchantService:
             }
 
         # Check if region has active branches
-        active_branches = Branch.query.filter_by(region_id=region_id, is_active=True).count()
+        active_branches = _fast_count(Branch, region_id=region_id, is_active=True)
         if active_branches > 0:
             return {
                 'success': False,
@@ -362,7 +517,6 @@ class MerchantService:
 
         try:
             region.is_active = False
-            region.updated_at = datetime.utcnow()
             db.session.commit()
 
             return {
@@ -382,16 +536,21 @@ class MerchantService:
     @staticmethod
     def get_branches(merchant_id, staff_id=None, region_id=None, is_active=None):
         """Get branches for a merchant with role-based filtering"""
-        merchant = Merchant.query.get(merchant_id)
-
-        if not merchant:
+        if not _merchant_exists(merchant_id):
             return {
                 'success': False,
                 'message': 'Merchant not found',
                 'error_code': 'MERCH_001'
             }
 
-        query = Branch.query.filter_by(merchant_id=merchant_id)
+        query = Branch.query.options(
+            load_only(
+                Branch.id, Branch.merchant_id, Branch.region_id, Branch.name_ar, Branch.name_en,
+                Branch.code, Branch.city, Branch.district, Branch.latitude, Branch.longitude,
+                Branch.is_active
+            ),
+            raiseload('*')
+        ).filter_by(merchant_id=merchant_id)
 
         # Apply role-based filtering if staff_id is provided
         if staff_id:
@@ -441,16 +600,16 @@ class MerchantService:
     @staticmethod
     def create_branch(merchant_id, data):
         """Create a new branch"""
-        merchant = Merchant.query.get(merchant_id)
+        merchant_status = db.session.query(Merchant.status).filter_by(id=merchant_id).scalar()
 
-        if not merchant:
+        if merchant_status is None:
             return {
                 'success': False,
                 'message': 'Merchant not found',
                 'error_code': 'MERCH_001'
             }
 
-        if merchant.status != 'active':
+        if merchant_status != 'active':
             return {
                 'success': False,
                 'message': 'Only active merchants can create branches',
@@ -471,20 +630,6 @@ class MerchantService:
                     'error_code': 'MERCH_003'
                 }
 
-        # Check for duplicate code
-        if data.get('code'):
-            existing = Branch.query.filter_by(
-                merchant_id=merchant_id,
-                code=data['code']
-            ).first()
-
-            if existing:
-                return {
-                    'success': False,
-                    'message': 'Branch code already exists',
-                    'error_code': 'VAL_001'
-                }
-
         try:
             branch = Branch(
                 merchant_id=merchant_id,
@@ -506,6 +651,7 @@ class MerchantService:
 
             db.session.add(branch)
             db.session.commit()
+            MerchantService.invalidate_store_cache(merchant_id)
 
             return {
                 'success': True,
@@ -514,6 +660,19 @@ class MerchantService:
                     'branch': branch.to_dict()
                 }
             }
+        except IntegrityError as e:
+            db.session.rollback()
+            violation = _unique_violation_response(e, [
+                ('uq_branch_merchant_code', 'branches.merchant_id, branches.code',
+                 'Branch code already exists', 'VAL_001'),
+            ])
+            if violation:
+                return violation
+            return {
+                'success': False,
+                'message': f'Failed to create branch: {str(e)}',
+                'error_code': 'SYS_001'
+            }
         except Exception as e:
             db.session.rollback()
             return {
@@ -525,7 +684,10 @@ class MerchantService:
     @staticmethod
     def get_branch(merchant_id, branch_id):
         """Get a specific branch"""
-        branch = Branch.query.filter_by(id=branch_id, merchant_id=merchant_id).first()
+        branch = Branch.query.options(
+            joinedload(Branch.region),
+            raiseload('*')
+        ).filter_by(id=branch_id, merchant_id=merchant_id).first()
 
         if not branch:
             return {
@@ -535,7 +697,7 @@ class MerchantService:
             }
 
         # Get staff count
-        staff_count = MerchantUser.query.filter_by(branch_id=branch_id, is_active=True).count()
+        staff_count = _fast_count(MerchantUser, branch_id=branch_id, is_active=True)
 
         branch_data = branch.to_dict()
         branch_data['staff_count'] = staff_count
@@ -598,10 +760,9 @@ class MerchantService:
             if field in data:
                 setattr(branch, field, data[field])
 
-        branch.updated_at = datetime.utcnow()
-
         try:
             db.session.commit()
+            MerchantService.invalidate_store_cache(merchant_id)
             return {
                 'success': True,
                 'message': 'Branch updated successfully',
@@ -620,18 +781,27 @@ class MerchantService:
     # ==================== Staff ====================
 
     @staticmethod
-    def get_staff(merchant_id, requester_id=None, role=None, branch_id=None, page=1, per_page=20):
-        """Get staff members for a merchant with role-based filtering"""
-        merchant = Merchant.query.get(merchant_id)
+    def get_staff(merchant_id, requester_id=None, role=None, branch_id=None, page=1, per_page=20,
+                  stream=False):
+        """
+        Get staff members for a merchant with role-based filtering.
 
-        if not merchant:
+        With stream=True, returns every matching member as a lazily
+        evaluated generator (fetched in chunks) instead of a page.
+        """
+        if not _merchant_exists(merchant_id):
             return {
                 'success': False,
                 'message': 'Merchant not found',
                 'error_code': 'MERCH_001'
             }
 
-        query = MerchantUser.query.filter_by(merchant_id=merchant_id)
+        # Branch and region are many-to-one, so they join into the page SELECT
+        query = MerchantUser.query.options(
+            joinedload(MerchantUser.branch),
+            joinedload(MerchantUser.region),
+            raiseload('*')
+        ).filter_by(merchant_id=merchant_id)
 
         # Apply role-based filtering if requester_id is provided
         if requester_id:
@@ -668,16 +838,20 @@ class MerchantService:
         if role:
             query = query.filter_by(role=role)
 
-        pagination = query.order_by(MerchantUser.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        query = query.order_by(MerchantUser.created_at.desc())
+
+        if stream:
+            rows = query.execution_options(stream_results=True).yield_per(500)
+            return {
+                'success': True,
+                'data': {
+                    'staff': (_serialize_staff(user) for user in rows)
+                }
+            }
+
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
 
-        staff_data = []
-        for user in pagination.items:
-            user_dict = user.to_dict()
-            user_dict['branch'] = user.branch.to_dict() if user.branch else None
-            user_dict['region'] = user.region.to_dict() if user.region else None
-            staff_data.append(user_dict)
+        staff_data = [_serialize_staff(user) for user in pagination.items]
 
         return {
             'success': True,
@@ -695,58 +869,28 @@ class MerchantService:
     @staticmethod
     def create_staff(merchant_id, data):
         """Create a new staff member"""
-        merchant = Merchant.query.get(merchant_id)
-
-        if not merchant:
+        if not _merchant_exists(merchant_id):
             return {
                 'success': False,
                 'message': 'Merchant not found',
                 'error_code': 'MERCH_001'
             }
 
-        # Check if email already exists
-        if MerchantUser.query.filter_by(email=data.get('email')).first():
-            return {
-                'success': False,
-                'message': 'Email already registered',
-                'error_code': 'VAL_001'
-            }
-
-        # Validate branch if provided
-        if data.get('branch_id'):
-            branch = Branch.query.filter_by(
-                id=data['branch_id'],
-                merchant_id=merchant_id
-            ).first()
-
-            if not branch:
-                return {
-                    'success': False,
-                    'message': 'Branch not found',
-                    'error_code': 'MERCH_005'
-                }
-
-        # Validate region if provided
-        if data.get('region_id'):
-            region = Region.query.filter_by(
-                id=data['region_id'],
-                merchant_id=merchant_id
-            ).first()
-
-            if not region:
-                return {
-                    'success': False,
-                    'message': 'Region not found',
-                    'error_code': 'MERCH_003'
-                }
+        # Validate branch and region if provided
+        scope_error = _validate_staff_scope(
+            merchant_id,
+            branch_id=data.get('branch_id'),
+            region_id=data.get('region_id')
+        )
+        if scope_error:
+            return scope_error
 
         # Validate role
-        valid_roles = ['owner', 'executive_manager', 'region_manager', 'branch_manager', 'cashier']
         role = data.get('role', 'cashier')
-        if role not in valid_roles:
+        if role not in _VALID_ROLES:
             return {
                 'success': False,
-                'message': f'Invalid role. Must be one of: {valid_roles}',
+                'message': _INVALID_ROLE_MESSAGE,
                 'error_code': 'VAL_001'
             }
 
@@ -775,6 +919,18 @@ class MerchantService:
                     'staff': user.to_dict()
                 }
             }
+        except IntegrityError as e:
+            db.session.rollback()
+            violation = _unique_violation_response(e, [
+                ('merchant_users_email_key', 'merchant_users.email', 'Email already registered', 'VAL_001'),
+            ])
+            if violation:
+                return violation
+            return {
+                'success': False,
+                'message': f'Failed to create staff member: {str(e)}',
+                'error_code': 'SYS_001'
+            }
         except Exception as e:
             db.session.rollback()
             return {
@@ -786,7 +942,11 @@ class MerchantService:
     @staticmethod
     def get_staff_member(merchant_id, staff_id, requester_id=None):
         """Get a single staff member's details with role-based access"""
-        user = MerchantUser.query.filter_by(id=staff_id, merchant_id=merchant_id).first()
+        user = MerchantUser.query.options(
+            joinedload(MerchantUser.branch),
+            joinedload(MerchantUser.region),
+            raiseload('*')
+        ).filter_by(id=staff_id, merchant_id=merchant_id).first()
 
         if not user:
             return {
@@ -854,41 +1014,21 @@ class MerchantService:
                     'error_code': 'MERCH_006'
                 }
 
-        # Validate branch if changing
-        if 'branch_id' in data and data['branch_id']:
-            branch = Branch.query.filter_by(
-                id=data['branch_id'],
-                merchant_id=merchant_id
-            ).first()
-
-            if not branch:
-                return {
-                    'success': False,
-                    'message': 'Branch not found',
-                    'error_code': 'MERCH_005'
-                }
-
-        # Validate region if changing
-        if 'region_id' in data and data['region_id']:
-            region = Region.query.filter_by(
-                id=data['region_id'],
-                merchant_id=merchant_id
-            ).first()
-
-            if not region:
-                return {
-                    'success': False,
-                    'message': 'Region not found',
-                    'error_code': 'MERCH_003'
-                }
+        # Validate branch and region if changing
+        scope_error = _validate_staff_scope(
+            merchant_id,
+            branch_id=data.get('branch_id'),
+            region_id=data.get('region_id')
+        )
+        if scope_error:
+            return scope_error
 
         # Validate role if changing
         if 'role' in data:
-            valid_roles = ['owner', 'executive_manager', 'region_manager', 'branch_manager', 'cashier']
-            if data['role'] not in valid_roles:
+            if data['role'] not in _VALID_ROLES:
                 return {
                     'success': False,
-                    'message': f'Invalid role. Must be one of: {valid_roles}',
+                    'message': _INVALID_ROLE_MESSAGE,
                     'error_code': 'VAL_001'
                 }
 
@@ -905,8 +1045,6 @@ class MerchantService:
         if 'password' in data and data['password']:
             user.set_password(data['password'])
 
-        user.updated_at = datetime.utcnow()
-
         try:
             db.session.commit()
             return {
@@ -964,7 +1102,6 @@ class MerchantService:
 
         try:
             user.is_active = False
-            user.updated_at = datetime.utcnow()
             db.session.commit()
 
             return {
@@ -984,206 +1121,98 @@ class MerchantService:
     @staticmethod
     def get_merchant_statistics(merchant_id):
         """Get merchant statistics for dashboard"""
-        merchant = Merchant.query.get(merchant_id)
-
-        if not merchant:
+        if not _merchant_exists(merchant_id):
             return {
                 'success': False,
                 'message': 'Merchant not found',
                 'error_code': 'MERCH_001'
             }
 
-        # Total transactions
-        total_transactions = Transaction.query.filter_by(merchant_id=merchant_id).count()
-
-        # Total sales (confirmed + paid)
-        total_sales = db.session.query(
-            db.func.coalesce(db.func.sum(Transaction.total_amount), 0)
-        ).filter(
-            Transaction.merchant_id == merchant_id,
-            Transaction.status.in_(['confirmed', 'paid'])
-        ).scalar()
-
-        # Pending settlement amount
-        pending_settlement = db.session.query(
-            db.func.coalesce(
-                db.func.sum(Transaction.total_amount - Transaction.paid_amount),
-                0
-            )
-        ).filter(
-            Transaction.merchant_id == merchant_id,
-            Transaction.status == 'confirmed'
-        ).scalar()
-
-        # Active branches
-        active_branches = Branch.query.filter_by(
-            merchant_id=merchant_id, is_active=True
-        ).count()
-
-        # Active staff
-        active_staff = MerchantUser.query.filter_by(
-            merchant_id=merchant_id, is_active=True
-        ).count()
+        # Transaction totals in one conditional-aggregate pass, with the
+        # active branch and staff counts as scalar subqueries of the same SELECT
+        stats = db.session.query(
+            db.func.count(Transaction.id).label('total_transactions'),
+            db.func.coalesce(db.func.sum(db.case(
+                (Transaction.status.in_(['confirmed', 'paid']), Transaction.total_amount)
+            )), 0).label('total_sales'),
+            db.func.coalesce(db.func.sum(db.case(
+                (Transaction.status == 'confirmed', Transaction.total_amount - Transaction.paid_amount)
+            )), 0).label('pending_settlement'),
+            db.select(db.func.count(Branch.id)).where(
+                Branch.merchant_id == merchant_id, Branch.is_active == True
+            ).scalar_subquery().label('active_branches'),
+            db.select(db.func.count(MerchantUser.id)).where(
+                MerchantUser.merchant_id == merchant_id, MerchantUser.is_active == True
+            ).scalar_subquery().label('active_staff')
+        ).filter(Transaction.merchant_id == merchant_id).one()
 
         return {
             'success': True,
             'data': {
                 'statistics': {
-                    'total_transactions': total_transactions,
-                    'total_sales': float(total_sales) if total_sales else 0,
-                    'pending_settlement': float(pending_settlement) if pending_settlement else 0,
-                    'active_branches': active_branches,
-                    'active_staff': active_staff
+                    'total_transactions': stats.total_transactions,
+                    'total_sales': float(stats.total_sales) if stats.total_sales else 0,
+                    'pending_settlement': float(stats.pending_settlement) if stats.pending_settlement else 0,
+                    'active_branches': stats.active_branches,
+                    'active_staff': stats.active_staff
                 }
             }
         }
 
     # ==================== Public Store Listing ====================
 
-    @staticmethod
-    def get_stores_for_customer(city=None, search=None, page=1, per_page=20):
-        """Get approved stores for customer browsing"""
-        query = Merchant.query.filter_by(status='active')
-
-        if city:
-            # Filter by merchants with branches in this city
-            merchant_ids = db.session.query(Branch.merchant_id).filter(
-                Branch.city == city,
-                Branch.is_active == True
-            ).distinct()
-            query = query.filter(Merchant.id.in_(merchant_ids))
-
-        if search:
-            search_term = f'%{search}%'
-            query = query.filter(
-                db.or_(
-                    Merchant.name_ar.ilike(search_term),
-                    Merchant.name_en.ilike(search_term)
-                )
-            )
-
-        pagination = query.order_by(Merchant.name_ar).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-
-        merchants_data = []
-        for merchant in pagination.items:
-            merchant_dict = {
-                'id': merchant.id,
-                'name_ar': merchant.name_ar,
-                'name_en': merchant.name_en,
-                'business_type': merchant.business_type,
-                'city': merchant.city,
-                'branch_count': Branch.query.filter_by(
-                    merchant_id=merchant.id, is_active=True
-                ).count()
-            }
-            merchants_data.append(merchant_dict)
-
-        return {
-            'success': True,
-            'data': {
-                'merchants': merchants_data
-            },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
-        }
-
-    @staticmethod
-    def get_store_details(merchant_id):
-        """Get store details for customer view"""
-        merchant = Merchant.query.filter_by(id=merchant_id, status='active').first()
-
-        if not merchant:
-            return {
-                'success': False,
-                'message': 'Store not found',
-                'error_code': 'MERCH_001'
-            }
-
-        # Get active branches
-        branches = Branch.query.filter_by(
-            merchant_id=merchant_id, is_active=True
-        ).all()
-
-        return {
-            'success': True,
-            'data': {
-                'merchant': {
-                    'id': merchant.id,
-                    'name_ar': merchant.name_ar,
-                    'name_en': merchant.name_en,
-                    'business_type': merchant.business_type,
-                    'city': merchant.city,
-                    'phone': merchant.phone,
-                    'website': merchant.website
-                },
-                'branches': [
-                    {
-                        'id': b.id,
-                        'name_ar': b.name_ar,
-                        'name_en': b.name_en,
-                        'city': b.city,
-                        'district': b.district,
-                        'address_line': b.address_line,
-                        'phone': b.phone,
-                        'latitude': float(b.latitude) if b.latitude else None,
-                        'longitude': float(b.longitude) if b.longitude else None,
-                        'operating_hours': b.operating_hours
-                    }
-                    for b in branches
-                ]
-            }
-        }
-
     # ==================== Admin Functions ====================
 
     @staticmethod
-    def search_merchants(status=None, search=None, city=None, page=1, per_page=20):
-        """Search merchants (admin only)"""
-        query = Merchant.query
+    def search_merchants(status=None, search=None, city=None, cursor=None, per_page=20):
+        """
+        Search merchants (admin only)
+
+        Uses keyset pagination on (created_at, id): pass the `next_cursor`
+        from the previous page's meta to fetch the next one.
+        """
+        query = db.select(*_MERCHANT_LIST_COLS)
 
         if status:
-            query = query.filter(Merchant.status == status)
+            query = query.where(Merchant.status == status)
 
         if city:
-            query = query.filter(Merchant.city == city)
+            query = query.where(Merchant.city == city)
 
         if search:
             search_term = f'%{search}%'
-            query = query.filter(
-                db.or_(
-                    Merchant.name_ar.ilike(search_term),
-                    Merchant.name_en.ilike(search_term),
-                    Merchant.commercial_registration.ilike(search_term),
-                    Merchant.email.ilike(search_term)
-                )
+            query = query.where(_MERCHANT_SEARCH_EXPR.ilike(search_term))
+
+        if cursor:
+            try:
+                last_created_at, last_id = decode_cursor(cursor)
+            except InvalidCursorError as e:
+                return {
+                    'success': False,
+                    'message': str(e),
+                    'error_code': 'VAL_001'
+                }
+            query = query.where(
+                db.tuple_(Merchant.created_at, Merchant.id) < db.tuple_(last_created_at, last_id)
             )
 
-        query = query.order_by(Merchant.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        rows = db.session.execute(
+            query.order_by(Merchant.created_at.desc(), Merchant.id.desc()).limit(per_page + 1)
+        ).all()
+        merchants, meta = keyset_page(rows, per_page)
 
         return {
             'success': True,
             'data': {
-                'merchants': [m.to_dict() for m in pagination.items]
+                'merchants': [_format_merchant_row(m) for m in merchants]
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': meta
         }
 
     @staticmethod
     def update_merchant_status(merchant_id, status, reason=None, admin_id=None):
         """Update merchant status (admin only)"""
-        merchant = Merchant.query.get(merchant_id)
+        merchant = db.session.get(Merchant, merchant_id)
 
         if not merchant:
             return {
@@ -1192,27 +1221,23 @@ class MerchantService:
                 'error_code': 'MERCH_001'
             }
 
-        valid_statuses = ['pending', 'active', 'suspended', 'rejected']
-        if status not in valid_statuses:
+        if status not in _VALID_MERCHANT_STATUSES:
             return {
                 'success': False,
-                'message': f'Invalid status. Must be one of: {valid_statuses}',
+                'message': _INVALID_STATUS_MESSAGE,
                 'error_code': 'VAL_001'
             }
 
         old_status = merchant.status
         merchant.status = status
         merchant.status_reason = reason
-        merchant.updated_at = datetime.utcnow()
 
         if status == 'active' and old_status == 'pending':
             merchant.approved_by = admin_id
             merchant.approved_at = datetime.utcnow()
 
         try:
-            db.session.commit()
-
-            # Log the action
+            # Commit the audit entry in the same transaction as the change
             from app.services.audit_service import AuditService
             AuditService.log_action(
                 actor_type='admin_user',
@@ -1221,8 +1246,11 @@ class MerchantService:
                 entity_type='merchant',
                 entity_id=merchant_id,
                 old_values={'status': old_status},
-                new_values={'status': status, 'reason': reason}
+                new_values={'status': status, 'reason': reason},
+                commit=False
             )
+            db.session.commit()
+            MerchantService.invalidate_store_cache(merchant_id)
 
             return {
                 'success': True,
@@ -1242,7 +1270,7 @@ class MerchantService:
     @staticmethod
     def update_merchant_commission(merchant_id, commission_rate, admin_id=None):
         """Update merchant commission rate (admin only)"""
-        merchant = Merchant.query.get(merchant_id)
+        merchant = db.session.get(Merchant, merchant_id)
 
         if not merchant:
             return {
@@ -1260,12 +1288,9 @@ class MerchantService:
 
         old_rate = float(merchant.commission_rate)
         merchant.commission_rate = commission_rate
-        merchant.updated_at = datetime.utcnow()
 
         try:
-            db.session.commit()
-
-            # Log the action
+            # Commit the audit entry in the same transaction as the change
             from app.services.audit_service import AuditService
             AuditService.log_action(
                 actor_type='admin_user',
@@ -1274,8 +1299,10 @@ class MerchantService:
                 entity_type='merchant',
                 entity_id=merchant_id,
                 old_values={'commission_rate': old_rate},
-                new_values={'commission_rate': commission_rate}
+                new_values={'commission_rate': commission_rate},
+                commit=False
             )
+            db.session.commit()
 
             return {
                 'success': True,
@@ -1295,13 +1322,28 @@ class MerchantService:
     # ==================== Public API for Mobile App ====================
 
     @staticmethod
-    def get_public_merchants(category=None, search=None, page=1, per_page=20):
+    def get_public_merchants(category=None, search=None, city=None, page=1, per_page=20):
         """Get list of active merchants for mobile app (public endpoint)"""
-        query = Merchant.query.filter(Merchant.status == 'active')
+        query = Merchant.query.options(
+            load_only(
+                Merchant.id, Merchant.name_ar, Merchant.name_en,
+                Merchant.business_type, Merchant.city
+            )
+        ).filter(Merchant.status == 'active')
 
         if category:
             query = query.filter(Merchant.business_type == category)
 
+        if city:
+            # Filter by merchants with an active branch in this city
+            query = query.filter(
+                db.session.query(Branch.id).filter(
+                    Branch.merchant_id == Merchant.id,
+                    Branch.city == city,
+                    Branch.is_active == True
+                ).exists()
+            )
+
         if search:
             search_term = f'%{search}%'
             query = query.filter(
@@ -1317,10 +1359,7 @@ class MerchantService:
         merchants_data = []
         for merchant in pagination.items:
             # Get branch count
-            branch_count = Branch.query.filter_by(
-                merchant_id=merchant.id,
-                is_active=True
-            ).count()
+            branch_count = _fast_count(Branch, merchant_id=merchant.id, is_active=True)
 
             merchants_data.append({
                 'id': merchant.id,
@@ -1347,19 +1386,28 @@ class MerchantService:
         }
 
     @staticmethod
+    @cache.memoize(timeout=STORE_CACHE_TIMEOUT)
     def get_stores_for_customer(city=None, search=None, page=1, per_page=20):
         """Get stores for customer app"""
         return MerchantService.get_public_merchants(
             category=None,
             search=search,
+            city=city,
             page=page,
             per_page=per_page
         )
 
     @staticmethod
+    @cache.memoize(timeout=STORE_CACHE_TIMEOUT)
     def get_store_details(merchant_id):
         """Get store details for customer app"""
-        merchant = Merchant.query.get(merchant_id)
+        merchant = Merchant.query.options(
+            load_only(
+                Merchant.id, Merchant.name_ar, Merchant.name_en,
+                Merchant.business_type, Merchant.city, Merchant.status
+            ),
+            raiseload('*')
+        ).filter_by(id=merchant_id).first()
 
         if not merchant:
             return {
@@ -1375,8 +1423,16 @@ class MerchantService:
                 'error_code': 'MERCH_003'
             }
 
-        # Get branches
-        branches = Branch.query.filter_by(
+        # Merchant.branches is a dynamic relationship and cannot be eager
+        # loaded; one filtered SELECT is the equivalent of a selectinload and
+        # is skipped entirely for unavailable stores
+        branches = Branch.query.options(
+            load_only(
+                Branch.id, Branch.name_ar, Branch.name_en, Branch.city, Branch.district,
+                Branch.address_line, Branch.phone, Branch.latitude, Branch.longitude
+            ),
+            raiseload('*')
+        ).filter_by(
             merchant_id=merchant_id,
             is_active=True
         ).all()
@@ -1402,14 +1458,20 @@ class MerchantService:
                         'district': b.district,
                         'address_line': b.address_line,
                         'phone': b.phone,
-                        'latitude': float(b.latitude) if b.latitude else None,
-                        'longitude': float(b.longitude) if b.longitude else None
+                        'latitude': b.latitude,
+                        'longitude': b.longitude
                     }
                     for b in branches
                 ]
             }
         }
 
+    @staticmethod
+    def invalidate_store_cache(merchant_id):
+        """Drop cached customer store views after a merchant or branch change"""
+        cache.delete_memoized(MerchantService.get_store_details, merchant_id)
+        cache.delete_memoized(MerchantService.get_stores_for_customer)
+
     # ==================== Mobile App Staff Methods ====================
 
     @staticmethod
@@ -1417,7 +1479,7 @@ class MerchantService:
         """Get staff member's own profile for mobile app"""
         from app.models.merchant_user import ROLE_NAMES_AR, ROLE_NAMES_EN
 
-        user = MerchantUser.query.get(staff_id)
+        user = db.session.get(MerchantUser, staff_id)
 
         if not user:
             return {
@@ -1426,7 +1488,7 @@ class MerchantService:
                 'error_code': 'MERCH_006'
             }
 
-        merchant = Merchant.query.get(user.merchant_id)
+        merchant = _get_merchant_cached(user.merchant_id)
 
         profile_data = user.to_dict()
         profile_data['branch'] = user.branch.to_dict() if user.branch else None
@@ -1458,7 +1520,7 @@ class MerchantService:
     @staticmethod
     def update_staff_profile(staff_id, data):
         """Update staff member's own profile"""
-        user = MerchantUser.query.get(staff_id)
+        user = db.session.get(MerchantUser, staff_id)
 
         if not user:
             return {
@@ -1474,8 +1536,6 @@ class MerchantService:
             if field in data:
                 setattr(user, field, data[field])
 
-        user.updated_at = datetime.utcnow()
-
         try:
             db.session.commit()
             return {
@@ -1496,7 +1556,7 @@ class MerchantService:
     @staticmethod
     def change_staff_password(staff_id, current_password, new_password):
         """Change staff member's password"""
-        user = MerchantUser.query.get(staff_id)
+        user = db.session.get(MerchantUser, staff_id)
 
         if not user:
             return {
@@ -1523,7 +1583,6 @@ class MerchantService:
 
         try:
             user.set_password(new_password)
-            user.updated_at = datetime.utcnow()
             db.session.commit()
 
             return {
@@ -1544,8 +1603,8 @@ class MerchantService:
         from datetime import date, timedelta
         from app.models.merchant_user import ROLE_NAMES_AR, ROLE_NAMES_EN
 
-        user = MerchantUser.query.get(staff_id)
-        merchant = Merchant.query.get(merchant_id)
+        user = db.session.get(MerchantUser, staff_id)
+        merchant = _get_merchant_cached(merchant_id)
 
         if not user or not merchant:
             return {
@@ -1648,15 +1707,15 @@ class MerchantService:
         # Add role-specific data
         if user.is_top_level():
             # Owner/Executive Manager sees more stats
-            dashboard_data['stats']['active_branches'] = Branch.query.filter_by(
-                merchant_id=merchant_id, is_active=True
-            ).count()
-            dashboard_data['stats']['active_staff'] = MerchantUser.query.filter_by(
-                merchant_id=merchant_id, is_active=True
-            ).count()
-            dashboard_data['stats']['regions'] = Region.query.filter_by(
-                merchant_id=merchant_id, is_active=True
-            ).count()
+            dashboard_data['stats']['active_branches'] = _fast_count(
+                Branch, merchant_id=merchant_id, is_active=True
+            )
+            dashboard_data['stats']['active_staff'] = _fast_count(
+                MerchantUser, merchant_id=merchant_id, is_active=True
+            )
+            dashboard_data['stats']['regions'] = _fast_count(
+                Region, merchant_id=merchant_id, is_active=True
+            )
 
         return {
             'success': True,
@@ -1668,7 +1727,7 @@ class MerchantService:
         """Get quick stats based on staff role"""
         from datetime import date, timedelta
 
-        user = MerchantUser.query.get(staff_id)
+        user = db.session.get(MerchantUser, staff_id)
 
         if not user:
             return {
@@ -1757,7 +1816,7 @@ class MerchantService:
     @staticmethod
     def get_accessible_branches(staff_id):
         """Get branches accessible by staff member"""
-        user = MerchantUser.query.get(staff_id)
+        user = db.session.get(MerchantUser, staff_id)
 
         if not user:
             return {
@@ -1767,7 +1826,9 @@ class MerchantService:
             }
 
         branch_ids = user.get_accessible_branch_ids()
-        branches = Branch.query.filter(Branch.id.in_(branch_ids)).all() if branch_ids else []
+        branches = Branch.query.options(raiseload('*')).filter(
+            Branch.id.in_(branch_ids)
+        ).all() if branch_ids else []
 
         return {
             'success': True,
@@ -1779,7 +1840,7 @@ class MerchantService:
     @staticmethod
     def get_accessible_regions(staff_id):
         """Get regions accessible by staff member"""
-        user = MerchantUser.query.get(staff_id)
+        user = db.session.get(MerchantUser, staff_id)
 
         if not user:
             return {
@@ -1789,14 +1850,15 @@ class MerchantService:
             }
 
         region_ids = user.get_accessible_region_ids()
-        regions = Region.query.filter(Region.id.in_(region_ids)).all() if region_ids else []
+        rows = _with_branch_counts(
+            Region.query.options(raiseload('*')).filter(Region.id.in_(region_ids)),
+            Branch.region_id.in_(region_ids)
+        ).all() if region_ids else []
 
         regions_data = []
-        for region in regions:
+        for region, branch_count in rows:
             region_dict = region.to_dict()
-            region_dict['branch_count'] = Branch.query.filter_by(
-                region_id=region.id, is_active=True
-            ).count()
+            region_dict['branch_count'] = branch_count
             regions_data.append(region_dict)
 
         return {
@@ -1811,7 +1873,7 @@ class MerchantService:
         """Get staff members that the user can manage"""
         from app.models.merchant_user import ROLE_NAMES_AR, ROLE_NAMES_EN
 
-        user = MerchantUser.query.get(staff_id)
+        user = db.session.get(MerchantUser, staff_id)
 
         if not user:
             return {
@@ -1842,7 +1904,7 @@ class MerchantService:
         """Get today's activity for cashier/branch manager"""
         from datetime import date
 
-        user = MerchantUser.query.get(staff_id)
+        user = db.session.get(MerchantUser, staff_id)
 
         if not user:
             return {
@@ -1,71 +1,435 @@
 """
 Notification Service - Full Implementation for Mobile App
 """
-from datetime import datetime
-from app.extensions import db
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import logging
+import uuid
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.extensions import db, cache
+from app.models.customer import Customer
 from app.models.notification import Notification
 from app.models.device import CustomerDevice, MerchantUserDevice
+from app.services.firebase_service import push_manager
 from app.utils.realtime import (
     emit_to_customer,
     emit_to_staff,
-    build_notification_event_data
+    build_notification_event_data,
+    build_unread_count_event_data
 )
+from app.utils.pagination import InvalidCursorError, decode_cursor, keyset_page
+
+logger = logging.getLogger(__name__)
+
+_VALID_DEVICE_TYPES = frozenset({'ios', 'android'})
+
+# Devices with no push delivered for this many days are deactivated by
+# prune_stale_devices (last_used_at is stamped on registration and delivery)
+DEVICE_STALE_DAYS = 30
+
+# Rows updated per transaction by mark_all_as_read
+_MARK_READ_BATCH_SIZE = 1000
+
+# Staff unread badge counts are cached and dropped on every write
+UNREAD_COUNT_CACHE_TIMEOUT = 300
+
+# Rows per INSERT executemany in the bulk create paths
+_BULK_INSERT_CHUNK_SIZE = 1000
+_REQUIRED_NOTIFICATION_FIELDS = ('title_ar', 'body_ar', 'type')
+
+# IDs bound per UPDATE by mark_many_as_read, to stay within parameter limits
+_MARK_MANY_CHUNK_SIZE = 500
+
+# Columns projected by the customer notification feed (same fields as Notification.to_dict)
+_NOTIF_LIST_COLS = (
+    Notification.id, Notification.title_ar, Notification.title_en,
+    Notification.body_ar, Notification.body_en, Notification.type,
+    Notification.is_read, Notification.read_at, Notification.created_at,
+)
+
+# Customer notification templates, filled with str.format_map
+_TPL_NEW_TRANSACTION_AR = 'لديك معاملة جديدة بقيمة {amount} ريال تحتاج للتأكيد'
+_TPL_NEW_TRANSACTION_EN = 'You have a new transaction of {amount} SAR pending confirmation'
+_TPL_PAYMENT_DUE_TODAY_AR = 'لديك دفعة بقيمة {amount} ريال مستحقة اليوم'
+_TPL_PAYMENT_DUE_SOON_AR = 'لديك دفعة بقيمة {amount} ريال مستحقة خلال {days} أيام'
+_TPL_PAYMENT_DUE_EN = 'You have a payment of {amount} SAR due in {days} days'
+_TPL_PAYMENT_DUE_TODAY_PUSH_AR = 'لديك دفعة مستحقة اليوم'
+_TPL_PAYMENT_DUE_SOON_PUSH_AR = 'لديك دفعة مستحقة خلال {days} أيام'
+_TPL_PAYMENT_SUCCESS_AR = 'تم استلام دفعتك بقيمة {amount} ريال بنجاح'
+_TPL_PAYMENT_SUCCESS_EN = 'Your payment of {amount} SAR has been received successfully'
+
+# Merchant staff notification templates, filled with str.format_map
+_TPL_STAFF_TXN_CONFIRMED_AR = 'تم تأكيد المعاملة رقم {reference} بقيمة {amount} ريال'
+_TPL_STAFF_TXN_CONFIRMED_EN = 'Transaction {reference} for {amount} SAR has been confirmed'
+_TPL_STAFF_TXN_REJECTED_AR = 'تم رفض المعاملة رقم {reference}'
+_TPL_STAFF_TXN_REJECTED_REASON_AR = 'تم رفض المعاملة رقم {reference} - السبب: {reason}'
+_TPL_STAFF_TXN_REJECTED_EN = 'Transaction {reference} has been rejected'
+_TPL_STAFF_PAYMENT_AR = 'تم استلام دفعة بقيمة {amount} ريال'
+_TPL_STAFF_PAYMENT_EN = 'Payment of {amount} SAR has been received'
+_TPL_STAFF_SETTLEMENT_AR = 'تسوية بقيمة {amount} ريال جاهزة للصرف'
+_TPL_STAFF_SETTLEMENT_EN = 'Settlement of {amount} SAR is ready for payout'
+
+# Credit alert templates: alert_type -> (title_ar, title_en, body_ar, body_en)
+_CREDIT_ALERT_TEMPLATES = {
+    'low_credit': (
+        'تنبيه الرصيد', 'Low Credit',
+        'رصيدك المتاح منخفض: {available} ريال',
+        'Your available credit is low: {available} SAR'
+    ),
+    'limit_increased': (
+        'زيادة حد الشراء', 'Credit Limit Increased',
+        'تم زيادة حد الشراء الخاص بك إلى {new_limit} ريال',
+        'Your credit limit has been increased to {new_limit} SAR'
+    ),
+}
+_DEFAULT_CREDIT_ALERT_TEMPLATE = (
+    'تحديث الائتمان', 'Credit Alert',
+    'تم تحديث معلومات الائتمان الخاصة بك',
+    'Your credit information has been updated'
+)
+
+
+def _format_notification_row(row):
+    """Format a projected notification row like Notification.to_dict"""
+    data = row._asdict()
+    data['title'] = row.title_ar  # Default to Arabic for mobile app
+    data['body'] = row.body_ar
+    data['read_at'] = row.read_at.isoformat() if row.read_at else None
+    data['created_at'] = row.created_at.isoformat() if row.created_at else None
+    return data
+
+
+def _device_list_cols(model):
+    """Columns needed to render a device list entry"""
+    return (
+        model.id, model.device_type, model.device_name,
+        model.is_active, model.created_at, model.last_used_at,
+    )
+
+
+def _format_device_row(row):
+    """Format a projected device row like CustomerDevice.to_dict"""
+    data = row._asdict()
+    data['created_at'] = row.created_at.isoformat() if row.created_at else None
+    data['last_used_at'] = row.last_used_at.isoformat() if row.last_used_at else None
+    return data
+
+
+def _notification_page(query, cursor, per_page):
+    """
+    Run a projected notification query as one keyset page, newest first.
+
+    Raises InvalidCursorError for a bad cursor.
+    """
+    if cursor:
+        last_created_at, last_id = decode_cursor(cursor)
+        query = query.where(
+            db.tuple_(Notification.created_at, Notification.id) < db.tuple_(last_created_at, last_id)
+        )
+
+    rows = db.session.execute(
+        query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(per_page + 1)
+    ).all()
+    return keyset_page(rows, per_page)
+
+
+@contextmanager
+def _write_scope(commit):
+    """
+    Transaction scope for a single notification-side write.
+
+    With commit=True the write is committed, or rolled back on error. With
+    commit=False it runs in a SAVEPOINT inside the caller's transaction, so
+    a failure undoes only this write and the caller still decides whether
+    to commit its own changes.
+
+    Any exception is re-raised after the rollback. Callers handle
+    SQLAlchemyError as a failed write and let other exceptions propagate,
+    since those are programming errors rather than database failures.
+    """
+    if not commit:
+        with db.session.begin_nested():
+            yield
+        return
+
+    try:
+        yield
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+# Session.info key holding callbacks deferred until the transaction commits
+_AFTER_COMMIT_KEY = 'notification_after_commit'
+
+
+def _after_commit(callback):
+    """
+    Run `callback` once the current transaction commits.
+
+    Used by the commit=False paths so real-time events and cache
+    invalidation only follow writes that were actually committed; the
+    callback is dropped if the transaction rolls back. The callback runs
+    outside any transaction, so it must not load from the database.
+    """
+    db.session.info.setdefault(_AFTER_COMMIT_KEY, []).append(callback)
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_after_commit(session):
+    for callback in session.info.pop(_AFTER_COMMIT_KEY, ()):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Post-commit notification callback failed: {e}")
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _drop_after_commit(session, previous_transaction):
+    # Savepoint rollbacks leave the outer transaction's callbacks pending
+    if previous_transaction.parent is None:
+        session.info.pop(_AFTER_COMMIT_KEY, None)
+
+
+def _emit_unread_delta(customer_id, delta, notification_id=None):
+    """Push an unread badge change to the customer's connected clients"""
+    if delta:
+        emit_to_customer(customer_id, 'unread_count_changed',
+                         build_unread_count_event_data(delta, notification_id))
+
+
+def _unread_key(kind, owner_id):
+    """Cache key for an unread notification count"""
+    return f'notif:unread:{kind}:{owner_id}'
+
+
+def _bulk_insert_notifications(rows, owner_field):
+    """
+    Validate and insert notification rows in chunks; does not commit.
+
+    Returns an error response for malformed rows, or None.
+    """
+    required = _REQUIRED_NOTIFICATION_FIELDS + (owner_field,)
+    for row in rows:
+        if not isinstance(row, dict) or any(not row.get(field) for field in required):
+            return {
+                'success': False,
+                'message': f'Each notification requires: {", ".join(required)}',
+                'error_code': 'VAL_001'
+            }
+
+    for i in range(0, len(rows), _BULK_INSERT_CHUNK_SIZE):
+        db.session.bulk_insert_mappings(Notification, rows[i:i + _BULK_INSERT_CHUNK_SIZE])
+    return None
+
+
+def _mark_ids_read(owner_column, owner_id, notification_ids):
+    """
+    Mark the given unread notifications of one owner as read, in chunks.
+
+    Returns the number of rows updated; does not commit.
+    """
+    read_at = datetime.utcnow()
+    updated = 0
+    for i in range(0, len(notification_ids), _MARK_MANY_CHUNK_SIZE):
+        chunk = notification_ids[i:i + _MARK_MANY_CHUNK_SIZE]
+        updated += Notification.query.filter(
+            owner_column == owner_id,
+            Notification.id.in_(chunk),
+            Notification.is_read == False
+        ).update({
+            'is_read': True,
+            'read_at': read_at
+        }, synchronize_session=False)
+    return updated
+
+
+def _invalid_ids_response(notification_ids):
+    """Validate a list of notification IDs; returns an error response or None"""
+    if not isinstance(notification_ids, list) or not all(isinstance(i, str) for i in notification_ids):
+        return {
+            'success': False,
+            'message': 'notification_ids must be a list of IDs',
+            'error_code': 'VAL_001'
+        }
+    return None
+
+
+def _upsert_device(model, owner_field, owner_id, fcm_token, device_type, device_name, device_id):
+    """
+    Insert or refresh a device by (owner, fcm_token) in a single statement.
+
+    Returns the device and whether it already existed. PostgreSQL reports
+    that from the upsert itself (xmax is 0 only on a freshly inserted row);
+    SQLite has no equivalent, so it is checked beforehand there.
+    """
+    dialect = db.session.get_bind().dialect.name
+    insert = sqlite_insert if dialect == 'sqlite' else pg_insert
+
+    now = datetime.utcnow()
+    stmt = insert(model).values(
+        id=str(uuid.uuid4()),
+        fcm_token=fcm_token,
+        device_type=device_type,
+        device_name=device_name,
+        device_id=device_id,
+        is_active=True,
+        last_used_at=now,
+        created_at=now,
+        updated_at=now,
+        **{owner_field: owner_id}
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[owner_field, 'fcm_token'],
+        set_={
+            'device_type': stmt.excluded.device_type,
+            'device_name': stmt.excluded.device_name,
+            'device_id': stmt.excluded.device_id,
+            'is_active': True,
+            'last_used_at': stmt.excluded.last_used_at,
+            'updated_at': stmt.excluded.updated_at,
+        }
+    )
+
+    if dialect == 'sqlite':
+        existed = db.session.query(db.exists().where(
+            getattr(model, owner_field) == owner_id,
+            model.fcm_token == fcm_token
+        )).scalar()
+        device = db.session.scalars(
+            stmt.returning(model), execution_options={'populate_existing': True}
+        ).one()
+        return device, existed
+
+    device, inserted = db.session.execute(
+        stmt.returning(model, db.literal_column('xmax = 0').label('inserted')),
+        execution_options={'populate_existing': True}
+    ).one()
+    return device, not inserted
+
+
+def _prune_devices(model, cutoff):
+    """
+    Deactivate idle devices and drop duplicate FCM tokens; does not commit.
+
+    A token registered by several owners (device resold, account switched)
+    is kept only on its most recently used row. Returns
+    (deactivated, removed) row counts.
+    """
+    deactivated = db.session.execute(
+        db.update(model).where(
+            model.is_active == True,
+            model.last_used_at < cutoff
+        ).values(is_active=False, updated_at=datetime.utcnow()),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+
+    ranked = db.select(
+        model.id,
+        db.func.row_number().over(
+            partition_by=model.fcm_token,
+            order_by=(model.last_used_at.desc().nulls_last(), model.created_at.desc())
+        ).label('rn')
+    ).subquery()
+    removed = db.session.execute(
+        db.delete(model).where(
+            model.id.in_(db.select(ranked.c.id).where(ranked.c.rn > 1))
+        ),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+
+    return deactivated, removed
 
 
 class NotificationService:
     """Notification service for customer notifications"""
 
     @staticmethod
-    def get_customer_notifications(customer_id, unread_only=False, page=1, per_page=20):
-        """Get customer notifications"""
-        query = Notification.query.filter_by(customer_id=customer_id)
+    def adjust_unread_count(customer_id, delta):
+        """
+        Shift a customer's cached unread notification count by `delta`.
+
+        Issues an atomic UPDATE in the caller's transaction; does not commit.
+        """
+        if not customer_id or not delta:
+            return
+        Customer.query.filter_by(id=customer_id).update(
+            {'unread_notification_count': Customer.unread_notification_count + delta},
+            synchronize_session=False
+        )
+
+    @staticmethod
+    def get_customer_notifications(customer_id, unread_only=False, cursor=None, per_page=20):
+        """
+        Get customer notifications
+
+        Uses keyset pagination on (created_at, id): pass the `next_cursor`
+        from the previous page's meta to fetch the next one.
+        """
+        query = db.select(*_NOTIF_LIST_COLS).where(Notification.customer_id == customer_id)
 
         if unread_only:
-            query = query.filter_by(is_read=False)
+            query = query.where(Notification.is_read == False)
 
-        query = query.order_by(Notification.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        try:
+            notifications, meta = _notification_page(query, cursor, per_page)
+        except InvalidCursorError as e:
+            return {
+                'success': False,
+                'message': str(e),
+                'error_code': 'VAL_001'
+            }
 
-        # Get unread count
-        unread_count = Notification.query.filter_by(
-            customer_id=customer_id,
-            is_read=False
-        ).count()
+        unread_count = db.session.scalar(
+            db.select(Customer.unread_notification_count).where(Customer.id == customer_id)
+        )
 
         return {
             'success': True,
             'data': {
-                'notifications': [n.to_dict() for n in pagination.items],
-                'unread_count': unread_count
+                'notifications': [_format_notification_row(n) for n in notifications],
+                'unread_count': unread_count or 0
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': meta
         }
 
     @staticmethod
     def mark_as_read(customer_id, notification_id):
         """Mark a notification as read"""
-        notification = Notification.query.filter_by(
-            id=notification_id,
-            customer_id=customer_id
-        ).first()
-
-        if not notification:
-            return {
-                'success': False,
-                'message': 'Notification not found',
-                'error_code': 'NOTIF_001'
-            }
-
-        notification.is_read = True
-        notification.read_at = datetime.utcnow()
-
         try:
+            # Conditional UPDATE: only an unread row matches, so concurrent
+            # requests cannot decrement the unread counter twice
+            updated = db.session.execute(
+                db.update(Notification).where(
+                    Notification.id == notification_id,
+                    Notification.customer_id == customer_id,
+                    Notification.is_read == False
+                ).values(is_read=True, read_at=datetime.utcnow())
+            ).rowcount
+
+            if updated:
+                NotificationService.adjust_unread_count(customer_id, -1)
+            else:
+                exists = db.session.query(db.exists().where(
+                    Notification.id == notification_id,
+                    Notification.customer_id == customer_id
+                )).scalar()
+                if not exists:
+                    db.session.rollback()
+                    return {
+                        'success': False,
+                        'message': 'Notification not found',
+                        'error_code': 'NOTIF_001'
+                    }
+
             db.session.commit()
+            _emit_unread_delta(customer_id, -updated, notification_id)
             return {
                 'success': True,
                 'message': 'Notification marked as read'
@@ -80,17 +444,34 @@ class NotificationService:
 
     @staticmethod
     def mark_all_as_read(customer_id):
-        """Mark all notifications as read"""
+        """
+        Mark all notifications as read
+
+        Updates in batches of _MARK_READ_BATCH_SIZE, committing each one, so
+        row locks stay short even for customers with a large unread backlog.
+        """
+        # One statement and one timestamp for every batch
+        batch_ids = db.select(Notification.id).where(
+            Notification.customer_id == customer_id,
+            Notification.is_read == False
+        ).order_by(Notification.id).limit(_MARK_READ_BATCH_SIZE)
+        stmt = db.update(Notification).where(
+            Notification.id.in_(batch_ids.scalar_subquery())
+        ).values(is_read=True, read_at=datetime.utcnow())
+
+        total = 0
         try:
-            Notification.query.filter_by(
-                customer_id=customer_id,
-                is_read=False
-            ).update({
-                'is_read': True,
-                'read_at': datetime.utcnow()
-            })
+            while True:
+                updated = db.session.execute(stmt).rowcount
+                NotificationService.adjust_unread_count(customer_id, -updated)
+                db.session.commit()
+                total += updated
+
+                if updated < _MARK_READ_BATCH_SIZE:
+                    break
+
+            _emit_unread_delta(customer_id, -total)
 
-            db.session.commit()
             return {
                 'success': True,
                 'message': 'All notifications marked as read'
@@ -103,48 +484,144 @@ class NotificationService:
                 'error_code': 'SYS_001'
             }
 
+    @staticmethod
+    def mark_many_as_read(customer_id, notification_ids):
+        """Mark a batch of notifications as read in one round-trip per chunk"""
+        error = _invalid_ids_response(notification_ids)
+        if error:
+            return error
+
+        if not notification_ids:
+            return {
+                'success': True,
+                'data': {'updated': 0}
+            }
+
+        try:
+            updated = _mark_ids_read(Notification.customer_id, customer_id, notification_ids)
+            NotificationService.adjust_unread_count(customer_id, -updated)
+            db.session.commit()
+            _emit_unread_delta(customer_id, -updated)
+            return {
+                'success': True,
+                'data': {'updated': updated}
+            }
+        except Exception as e:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f'Failed to mark notifications: {str(e)}',
+                'error_code': 'SYS_001'
+            }
+
     @staticmethod
     def create_notification(customer_id, title_ar, body_ar, notification_type,
                            title_en=None, body_en=None, related_entity_type=None,
-                           related_entity_id=None):
-        """Create a new notification"""
+                           related_entity_id=None, commit=True):
+        """
+        Create a new notification
+
+        Pass commit=False to write it in a SAVEPOINT of the caller's
+        transaction; the real-time events are emitted when that commits.
+        """
+        notification = Notification(
+            customer_id=customer_id,
+            title_ar=title_ar,
+            title_en=title_en,
+            body_ar=body_ar,
+            body_en=body_en,
+            type=notification_type,
+            related_entity_type=related_entity_type,
+            related_entity_id=related_entity_id
+        )
+
         try:
-            notification = Notification(
-                customer_id=customer_id,
-                title_ar=title_ar,
-                title_en=title_en,
-                body_ar=body_ar,
-                body_en=body_en,
-                type=notification_type,
-                related_entity_type=related_entity_type,
-                related_entity_id=related_entity_id
-            )
+            with _write_scope(commit):
+                db.session.add(notification)
+                NotificationService.adjust_unread_count(customer_id, 1)
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to create notification for customer {customer_id}: {e}")
+            return {
+                'success': False,
+                'message': f'Failed to create notification: {str(e)}',
+                'error_code': 'SYS_001'
+            }
 
-            db.session.add(notification)
-            db.session.commit()
+        # Emit real-time notification to customer, once it is committed
+        event_data = build_notification_event_data(notification)
 
-            # Emit real-time notification to customer
-            emit_to_customer(customer_id, 'notification_new', build_notification_event_data(notification))
+        def emit():
+            emit_to_customer(customer_id, 'notification_new', event_data)
+            _emit_unread_delta(customer_id, 1, event_data['notification_id'])
 
+        if commit:
+            emit()
+        else:
+            _after_commit(emit)
+
+        return {
+            'success': True,
+            'data': {
+                'notification': notification.to_dict()
+            }
+        }
+
+    @staticmethod
+    def create_notifications_bulk(rows):
+        """
+        Create many customer notifications in a single transaction.
+
+        `rows` are dicts of Notification column values (customer_id, title_ar,
+        body_ar, type, ...). Inserts them with one executemany per chunk and
+        bumps each customer's unread counter, then commits once. Intended for
+        scheduled fan-out jobs; no real-time events are emitted.
+        """
+        if not rows:
             return {
                 'success': True,
-                'data': {
-                    'notification': notification.to_dict()
-                }
+                'data': {'created': 0}
+            }
+
+        try:
+            error = _bulk_insert_notifications(rows, 'customer_id')
+            if error:
+                return error
+
+            # One UPDATE per distinct increment, usually just one
+            per_customer = Counter(row['customer_id'] for row in rows if row.get('customer_id'))
+            by_increment = defaultdict(list)
+            for customer_id, increment in per_customer.items():
+                by_increment[increment].append(customer_id)
+            for increment, customer_ids in by_increment.items():
+                Customer.query.filter(Customer.id.in_(customer_ids)).update(
+                    {'unread_notification_count': Customer.unread_notification_count + increment},
+                    synchronize_session=False
+                )
+
+            db.session.commit()
+            return {
+                'success': True,
+                'data': {'created': len(rows)}
             }
         except Exception as e:
             db.session.rollback()
             return {
                 'success': False,
-                'message': f'Failed to create notification: {str(e)}',
+                'message': f'Failed to create notifications: {str(e)}',
                 'error_code': 'SYS_001'
             }
 
     # ==================== Device Registration for Push Notifications ====================
 
     @staticmethod
-    def register_device(customer_id, fcm_token, device_type, device_name=None, device_id=None):
-        """Register device for push notifications (FCM)"""
+    def register_device(customer_id, fcm_token, device_type, device_name=None, device_id=None,
+                        commit=True):
+        """
+        Register device for push notifications (FCM)
+
+        Pass commit=False to run the upsert in a SAVEPOINT of the caller's
+        transaction.
+        """
         if not fcm_token:
             return {
                 'success': False,
@@ -152,7 +629,7 @@ class NotificationService:
                 'error_code': 'VAL_001'
             }
 
-        if device_type not in ['ios', 'android']:
+        if device_type not in _VALID_DEVICE_TYPES:
             return {
                 'success': False,
                 'message': 'Device type must be ios or android',
@@ -160,70 +637,45 @@ class NotificationService:
             }
 
         try:
-            # Check if device already exists (by token)
-            existing = CustomerDevice.query.filter_by(
-                customer_id=customer_id,
-                fcm_token=fcm_token
-            ).first()
-
-            if existing:
-                # Update existing device
-                existing.device_type = device_type
-                existing.device_name = device_name
-                existing.device_id = device_id
-                existing.is_active = True
-                existing.last_used_at = datetime.utcnow()
-                db.session.commit()
-                return {
-                    'success': True,
-                    'message': 'Device updated successfully',
-                    'data': existing.to_dict()
-                }
-
-            # Create new device
-            device = CustomerDevice(
-                customer_id=customer_id,
-                fcm_token=fcm_token,
-                device_type=device_type,
-                device_name=device_name,
-                device_id=device_id,
-                is_active=True,
-                last_used_at=datetime.utcnow()
-            )
-            db.session.add(device)
-            db.session.commit()
-
-            return {
-                'success': True,
-                'message': 'Device registered successfully',
-                'data': device.to_dict()
-            }
-
-        except Exception as e:
-            db.session.rollback()
+            with _write_scope(commit):
+                device, existed = _upsert_device(
+                    CustomerDevice, 'customer_id', customer_id, fcm_token,
+                    device_type, device_name, device_id
+                )
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to register device for customer {customer_id}: {e}")
             return {
                 'success': False,
                 'message': f'Failed to register device: {str(e)}',
                 'error_code': 'SYS_001'
             }
 
+        return {
+            'success': True,
+            'message': 'Device updated successfully' if existed else 'Device registered successfully',
+            'data': device.to_dict()
+        }
+
     @staticmethod
     def unregister_device(customer_id, device_id):
         """Unregister device from push notifications"""
         try:
-            device = CustomerDevice.query.filter_by(
-                id=device_id,
-                customer_id=customer_id
-            ).first()
-
-            if not device:
+            deleted = db.session.execute(
+                db.delete(CustomerDevice).where(
+                    CustomerDevice.id == device_id,
+                    CustomerDevice.customer_id == customer_id
+                ),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+
+            if not deleted:
+                db.session.rollback()
                 return {
                     'success': False,
                     'message': 'Device not found',
                     'error_code': 'DEV_001'
                 }
 
-            db.session.delete(device)
             db.session.commit()
 
             return {
@@ -241,15 +693,17 @@ class NotificationService:
     @staticmethod
     def get_customer_devices(customer_id):
         """Get all devices for a customer"""
-        devices = CustomerDevice.query.filter_by(
-            customer_id=customer_id,
-            is_active=True
+        rows = db.session.execute(
+            db.select(*_device_list_cols(CustomerDevice)).where(
+                CustomerDevice.customer_id == customer_id,
+                CustomerDevice.is_active == True
+            )
         ).all()
 
         return {
             'success': True,
             'data': {
-                'devices': [d.to_dict() for d in devices]
+                'devices': [_format_device_row(r) for r in rows]
             }
         }
 
@@ -258,10 +712,10 @@ class NotificationService:
     @staticmethod
     def send_push_notification(customer_id, title, body, data=None, notification_type='push',
                                related_entity_type=None, related_entity_id=None):
-        """Send push notification to customer's devices via Firebase FCM"""
-        from app.services.firebase_service import push_manager
+        """Queue a push notification to the customer's devices via Firebase FCM"""
+        from app.tasks.notifications import send_customer_push
 
-        return push_manager.send_to_customer(
+        send_customer_push.delay(
             customer_id=customer_id,
             title_ar=title,
             body_ar=body,
@@ -273,17 +727,73 @@ class NotificationService:
             related_entity_id=related_entity_id
         )
 
+        return {
+            'success': True,
+            'message': 'Push notification queued'
+        }
+
+    @staticmethod
+    def send_push_broadcast(customer_ids, title, body, data=None):
+        """
+        Push one message to the active devices of many customers
+
+        Loads every token in one query and sends them through FCM in
+        batched multicast requests. No in-app notifications are created.
+        """
+        tokens = db.session.scalars(
+            db.select(CustomerDevice.fcm_token).where(
+                CustomerDevice.customer_id.in_(customer_ids),
+                CustomerDevice.is_active == True
+            )
+        ).all() if customer_ids else []
+
+        result = push_manager.send_to_tokens(tokens, title, body, data, 'customer')
+
+        return {
+            'success': True,
+            'data': {
+                'devices_reached': result.get('success_count', 0),
+                'devices_failed': result.get('failure_count', 0)
+            }
+        }
+
     # ==================== Notification Templates ====================
 
+    @staticmethod
+    def build_reminder_row(customer_id, transaction_id, amount_due, days_until_due):
+        """Build the Notification column values for a payment reminder"""
+        values = {
+            'amount': amount_due,
+            'days': days_until_due
+        }
+        if days_until_due == 0:
+            title_ar = 'دفعة مستحقة اليوم'
+            body_ar = _TPL_PAYMENT_DUE_TODAY_AR.format_map(values)
+        else:
+            title_ar = 'تذكير بالدفع'
+            body_ar = _TPL_PAYMENT_DUE_SOON_AR.format_map(values)
+
+        return {
+            'customer_id': customer_id,
+            'title_ar': title_ar,
+            'title_en': 'Payment Reminder',
+            'body_ar': body_ar,
+            'body_en': _TPL_PAYMENT_DUE_EN.format_map(values),
+            'type': 'payment_reminder',
+            'related_entity_type': 'transaction',
+            'related_entity_id': transaction_id
+        }
+
     @staticmethod
     def notify_new_transaction(customer_id, transaction):
         """Notify customer about new transaction pending confirmation"""
+        values = {'amount': transaction.total_amount}
         return NotificationService.create_notification(
             customer_id=customer_id,
             title_ar='معاملة جديدة',
             title_en='New Transaction',
-            body_ar=f'لديك معاملة جديدة بقيمة {transaction.total_amount} ريال تحتاج للتأكيد',
-            body_en=f'You have a new transaction of {transaction.total_amount} SAR pending confirmation',
+            body_ar=_TPL_NEW_TRANSACTION_AR.format_map(values),
+            body_en=_TPL_NEW_TRANSACTION_EN.format_map(values),
             notification_type='transaction_pending',
             related_entity_type='transaction',
             related_entity_id=transaction.id
@@ -292,33 +802,68 @@ class NotificationService:
     @staticmethod
     def notify_payment_reminder(customer_id, transaction, days_until_due):
         """Notify customer about upcoming payment"""
-        if days_until_due == 0:
-            title_ar = 'دفعة مستحقة اليوم'
-            body_ar = f'لديك دفعة بقيمة {transaction.total_amount - transaction.paid_amount} ريال مستحقة اليوم'
-        else:
-            title_ar = 'تذكير بالدفع'
-            body_ar = f'لديك دفعة بقيمة {transaction.total_amount - transaction.paid_amount} ريال مستحقة خلال {days_until_due} أيام'
-
+        row = NotificationService.build_reminder_row(
+            customer_id, transaction.id,
+            transaction.total_amount - transaction.paid_amount, days_until_due
+        )
         return NotificationService.create_notification(
             customer_id=customer_id,
-            title_ar=title_ar,
-            title_en='Payment Reminder',
-            body_ar=body_ar,
-            body_en=f'You have a payment of {transaction.total_amount - transaction.paid_amount} SAR due in {days_until_due} days',
-            notification_type='payment_reminder',
-            related_entity_type='transaction',
-            related_entity_id=transaction.id
+            title_ar=row['title_ar'],
+            title_en=row['title_en'],
+            body_ar=row['body_ar'],
+            body_en=row['body_en'],
+            notification_type=row['type'],
+            related_entity_type=row['related_entity_type'],
+            related_entity_id=row['related_entity_id']
         )
 
+    @staticmethod
+    def notify_payment_reminders_bulk(due_rows, today=None):
+        """
+        Send payment reminders for many transactions at once
+
+        `due_rows` are (customer_id, transaction_id, amount_due, due_date)
+        rows, e.g. straight from a projected Transaction query. All in-app
+        notifications are inserted in one commit, then each due-in group
+        gets a single push broadcast.
+        """
+        today = today or datetime.utcnow().date()
+
+        rows = []
+        customers_by_days = defaultdict(set)
+        for customer_id, transaction_id, amount_due, due_date in due_rows:
+            days = (due_date - today).days
+            rows.append(NotificationService.build_reminder_row(customer_id, transaction_id, amount_due, days))
+            customers_by_days[days].add(customer_id)
+
+        result = NotificationService.create_notifications_bulk(rows)
+        if not result['success']:
+            return result
+
+        for days, customer_ids in customers_by_days.items():
+            if days == 0:
+                title, body = 'دفعة مستحقة اليوم', _TPL_PAYMENT_DUE_TODAY_PUSH_AR
+            else:
+                title, body = 'تذكير بالدفع', _TPL_PAYMENT_DUE_SOON_PUSH_AR.format(days=days)
+            NotificationService.send_push_broadcast(
+                list(customer_ids), title, body, data={'type': 'payment_reminder'}
+            )
+
+        return {
+            'success': True,
+            'data': {'count': len(rows)}
+        }
+
     @staticmethod
     def notify_payment_success(customer_id, payment):
         """Notify customer about successful payment"""
+        values = {'amount': payment.amount}
         return NotificationService.create_notification(
             customer_id=customer_id,
             title_ar='تم الدفع بنجاح',
             title_en='Payment Successful',
-            body_ar=f'تم استلام دفعتك بقيمة {payment.amount} ريال بنجاح',
-            body_en=f'Your payment of {payment.amount} SAR has been received successfully',
+            body_ar=_TPL_PAYMENT_SUCCESS_AR.format_map(values),
+            body_en=_TPL_PAYMENT_SUCCESS_EN.format_map(values),
             notification_type='payment_success',
             related_entity_type='payment',
             related_entity_id=payment.id
@@ -327,78 +872,89 @@ class NotificationService:
     @staticmethod
     def notify_credit_alert(customer_id, alert_type, details):
         """Notify customer about credit alerts"""
-        if alert_type == 'low_credit':
-            title_ar = 'تنبيه الرصيد'
-            body_ar = f'رصيدك المتاح منخفض: {details["available"]} ريال'
-        elif alert_type == 'limit_increased':
-            title_ar = 'زيادة حد الشراء'
-            body_ar = f'تم زيادة حد الشراء الخاص بك إلى {details["new_limit"]} ريال'
-        else:
-            title_ar = 'تحديث الائتمان'
-            body_ar = 'تم تحديث معلومات الائتمان الخاصة بك'
+        title_ar, title_en, body_ar, body_en = _CREDIT_ALERT_TEMPLATES.get(
+            alert_type, _DEFAULT_CREDIT_ALERT_TEMPLATE
+        )
+        details = details or {}
 
         return NotificationService.create_notification(
             customer_id=customer_id,
             title_ar=title_ar,
-            title_en='Credit Alert',
-            body_ar=body_ar,
-            body_en='Your credit information has been updated',
+            title_en=title_en,
+            body_ar=body_ar.format_map(details),
+            body_en=body_en.format_map(details),
             notification_type='credit_alert'
         )
 
     # ==================== Merchant Staff Notifications ====================
 
     @staticmethod
-    def get_merchant_staff_notifications(staff_id, unread_only=False, page=1, per_page=20):
-        """Get notifications for merchant staff member"""
-        query = Notification.query.filter_by(merchant_user_id=staff_id)
+    def get_merchant_staff_notifications(staff_id, unread_only=False, cursor=None, per_page=20):
+        """
+        Get notifications for merchant staff member
+
+        Uses keyset pagination on (created_at, id), like the customer feed.
+        """
+        query = db.select(*_NOTIF_LIST_COLS).where(Notification.merchant_user_id == staff_id)
 
         if unread_only:
-            query = query.filter_by(is_read=False)
+            query = query.where(Notification.is_read == False)
 
-        query = query.order_by(Notification.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        try:
+            notifications, meta = _notification_page(query, cursor, per_page)
+        except InvalidCursorError as e:
+            return {
+                'success': False,
+                'message': str(e),
+                'error_code': 'VAL_001'
+            }
 
-        # Get unread count
-        unread_count = Notification.query.filter_by(
-            merchant_user_id=staff_id,
-            is_read=False
-        ).count()
+        cache_key = _unread_key('staff', staff_id)
+        unread_count = cache.get(cache_key)
+        if unread_count is None:
+            unread_count = db.session.query(db.func.count(Notification.id)).filter(
+                Notification.merchant_user_id == staff_id,
+                Notification.is_read == False
+            ).scalar()
+            cache.set(cache_key, unread_count, timeout=UNREAD_COUNT_CACHE_TIMEOUT)
 
         return {
             'success': True,
             'data': {
-                'notifications': [n.to_dict() for n in pagination.items],
+                'notifications': [_format_notification_row(n) for n in notifications],
                 'unread_count': unread_count
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': meta
         }
 
     @staticmethod
     def mark_staff_notification_read(staff_id, notification_id):
         """Mark a staff notification as read"""
-        notification = Notification.query.filter_by(
-            id=notification_id,
-            merchant_user_id=staff_id
-        ).first()
-
-        if not notification:
-            return {
-                'success': False,
-                'message': 'Notification not found',
-                'error_code': 'NOTIF_001'
-            }
-
-        notification.is_read = True
-        notification.read_at = datetime.utcnow()
-
         try:
+            updated = Notification.query.filter_by(
+                id=notification_id,
+                merchant_user_id=staff_id,
+                is_read=False
+            ).update({
+                'is_read': True,
+                'read_at': datetime.utcnow()
+            }, synchronize_session=False)
+
+            if not updated:
+                exists = db.session.query(db.exists().where(
+                    Notification.id == notification_id,
+                    Notification.merchant_user_id == staff_id
+                )).scalar()
+                if not exists:
+                    db.session.rollback()
+                    return {
+                        'success': False,
+                        'message': 'Notification not found',
+                        'error_code': 'NOTIF_001'
+                    }
+
             db.session.commit()
+            cache.delete(_unread_key('staff', staff_id))
             return {
                 'success': True,
                 'message': 'Notification marked as read'
@@ -421,9 +977,10 @@ class NotificationService:
             ).update({
                 'is_read': True,
                 'read_at': datetime.utcnow()
-            })
+            }, synchronize_session=False)
 
             db.session.commit()
+            cache.delete(_unread_key('staff', staff_id))
             return {
                 'success': True,
                 'message': 'All notifications marked as read'
@@ -436,43 +993,132 @@ class NotificationService:
                 'error_code': 'SYS_001'
             }
 
+    @staticmethod
+    def mark_many_staff_notifications_read(staff_id, notification_ids):
+        """Mark a batch of staff notifications as read in one round-trip per chunk"""
+        error = _invalid_ids_response(notification_ids)
+        if error:
+            return error
+
+        if not notification_ids:
+            return {
+                'success': True,
+                'data': {'updated': 0}
+            }
+
+        try:
+            updated = _mark_ids_read(Notification.merchant_user_id, staff_id, notification_ids)
+            db.session.commit()
+            cache.delete(_unread_key('staff', staff_id))
+            return {
+                'success': True,
+                'data': {'updated': updated}
+            }
+        except Exception as e:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f'Failed to mark notifications: {str(e)}',
+                'error_code': 'SYS_001'
+            }
+
     @staticmethod
     def create_staff_notification(staff_id, title_ar, body_ar, notification_type,
                                   title_en=None, body_en=None, related_entity_type=None,
-                                  related_entity_id=None):
-        """Create a notification for merchant staff"""
+                                  related_entity_id=None, commit=True):
+        """
+        Create a notification for merchant staff
+
+        Pass commit=False to write it in a SAVEPOINT of the caller's
+        transaction; the unread cache is dropped and the real-time event
+        emitted when that commits.
+        """
+        notification = Notification(
+            merchant_user_id=staff_id,
+            title_ar=title_ar,
+            title_en=title_en,
+            body_ar=body_ar,
+            body_en=body_en,
+            type=notification_type,
+            related_entity_type=related_entity_type,
+            related_entity_id=related_entity_id
+        )
+
         try:
-            notification = Notification(
-                merchant_user_id=staff_id,
-                title_ar=title_ar,
-                title_en=title_en,
-                body_ar=body_ar,
-                body_en=body_en,
-                type=notification_type,
-                related_entity_type=related_entity_type,
-                related_entity_id=related_entity_id
-            )
+            with _write_scope(commit):
+                db.session.add(notification)
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to create notification for staff {staff_id}: {e}")
+            return {
+                'success': False,
+                'message': f'Failed to create notification: {str(e)}',
+                'error_code': 'SYS_001'
+            }
 
-            db.session.add(notification)
-            db.session.commit()
+        # Drop the cached badge and emit to staff, once the row is committed
+        event_data = build_notification_event_data(notification)
 
-            # Emit real-time notification to staff
-            emit_to_staff(staff_id, 'notification_new', build_notification_event_data(notification))
+        def publish():
+            cache.delete(_unread_key('staff', staff_id))
+            emit_to_staff(staff_id, 'notification_new', event_data)
+
+        if commit:
+            publish()
+        else:
+            _after_commit(publish)
 
+        return {
+            'success': True,
+            'data': {
+                'notification': notification.to_dict()
+            }
+        }
+
+    @staticmethod
+    def create_staff_notifications_bulk(rows):
+        """
+        Create many staff notifications in a single transaction.
+
+        `rows` are dicts of Notification column values (merchant_user_id,
+        title_ar, body_ar, type, ...). Commits once, then emits the usual
+        real-time event to each recipient.
+        """
+        if not rows:
             return {
                 'success': True,
-                'data': {
-                    'notification': notification.to_dict()
-                }
+                'data': {'created': 0}
             }
+
+        now = datetime.utcnow()
+        for row in rows:
+            # Assign keys up front so the events can be built without a reload
+            row.setdefault('id', str(uuid.uuid4()))
+            row.setdefault('created_at', now)
+            row.setdefault('is_read', False)
+
+        try:
+            error = _bulk_insert_notifications(rows, 'merchant_user_id')
+            if error:
+                return error
+            db.session.commit()
         except Exception as e:
             db.session.rollback()
             return {
                 'success': False,
-                'message': f'Failed to create notification: {str(e)}',
+                'message': f'Failed to create notifications: {str(e)}',
                 'error_code': 'SYS_001'
             }
 
+        for row in rows:
+            staff_id = row['merchant_user_id']
+            cache.delete(_unread_key('staff', staff_id))
+            emit_to_staff(staff_id, 'notification_new', build_notification_event_data(Notification(**row)))
+
+        return {
+            'success': True,
+            'data': {'created': len(rows)}
+        }
+
     # ==================== Merchant Device Registration ====================
 
     @staticmethod
@@ -485,7 +1131,7 @@ class NotificationService:
                 'error_code': 'VAL_001'
             }
 
-        if device_type not in ['ios', 'android']:
+        if device_type not in _VALID_DEVICE_TYPES:
             return {
                 'success': False,
                 'message': 'Device type must be ios or android',
@@ -493,41 +1139,15 @@ class NotificationService:
             }
 
         try:
-            # Check if device already exists
-            existing = MerchantUserDevice.query.filter_by(
-                merchant_user_id=staff_id,
-                fcm_token=fcm_token
-            ).first()
-
-            if existing:
-                existing.device_type = device_type
-                existing.device_name = device_name
-                existing.device_id = device_id
-                existing.is_active = True
-                existing.last_used_at = datetime.utcnow()
-                db.session.commit()
-                return {
-                    'success': True,
-                    'message': 'Device updated successfully',
-                    'data': existing.to_dict()
-                }
-
-            # Create new device
-            device = MerchantUserDevice(
-                merchant_user_id=staff_id,
-                fcm_token=fcm_token,
-                device_type=device_type,
-                device_name=device_name,
-                device_id=device_id,
-                is_active=True,
-                last_used_at=datetime.utcnow()
+            device, existed = _upsert_device(
+                MerchantUserDevice, 'merchant_user_id', staff_id, fcm_token,
+                device_type, device_name, device_id
             )
-            db.session.add(device)
             db.session.commit()
 
             return {
                 'success': True,
-                'message': 'Device registered successfully',
+                'message': 'Device updated successfully' if existed else 'Device registered successfully',
                 'data': device.to_dict()
             }
 
@@ -543,19 +1163,22 @@ class NotificationService:
     def unregister_merchant_device(staff_id, device_id):
         """Unregister merchant staff device from push notifications"""
         try:
-            device = MerchantUserDevice.query.filter_by(
-                id=device_id,
-                merchant_user_id=staff_id
-            ).first()
-
-            if not device:
+            deleted = db.session.execute(
+                db.delete(MerchantUserDevice).where(
+                    MerchantUserDevice.id == device_id,
+                    MerchantUserDevice.merchant_user_id == staff_id
+                ),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+
+            if not deleted:
+                db.session.rollback()
                 return {
                     'success': False,
                     'message': 'Device not found',
                     'error_code': 'DEV_001'
                 }
 
-            db.session.delete(device)
             db.session.commit()
 
             return {
@@ -573,26 +1196,28 @@ class NotificationService:
     @staticmethod
     def get_merchant_devices(staff_id):
         """Get all devices for a merchant staff"""
-        devices = MerchantUserDevice.query.filter_by(
-            merchant_user_id=staff_id,
-            is_active=True
+        rows = db.session.execute(
+            db.select(*_device_list_cols(MerchantUserDevice)).where(
+                MerchantUserDevice.merchant_user_id == staff_id,
+                MerchantUserDevice.is_active == True
+            )
         ).all()
 
         return {
             'success': True,
             'data': {
-                'devices': [d.to_dict() for d in devices]
+                'devices': [_format_device_row(r) for r in rows]
             }
         }
 
     @staticmethod
     def send_merchant_push_notification(staff_id, title, body, data=None, notification_type='push',
                                         related_entity_type=None, related_entity_id=None):
-        """Send push notification to merchant staff's devices via Firebase FCM"""
-        from app.services.firebase_service import push_manager
+        """Queue a push notification to the merchant staff's devices via Firebase FCM"""
+        from app.tasks.notifications import send_staff_push
 
-        return push_manager.send_to_merchant_user(
-            merchant_user_id=staff_id,
+        send_staff_push.delay(
+            staff_id=staff_id,
             title_ar=title,
             body_ar=body,
             title_en=title,
@@ -603,17 +1228,60 @@ class NotificationService:
             related_entity_id=related_entity_id
         )
 
+        return {
+            'success': True,
+            'message': 'Push notification queued'
+        }
+
+    # ==================== Device Maintenance ====================
+
+    @staticmethod
+    def prune_stale_devices(max_idle_days=DEVICE_STALE_DAYS):
+        """
+        Deactivate customer and staff devices idle for `max_idle_days` and
+        remove FCM tokens duplicated across owners.
+
+        Keeps push fan-out from targeting dead tokens; run daily.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=max_idle_days)
+        try:
+            customer_deactivated, customer_removed = _prune_devices(CustomerDevice, cutoff)
+            staff_deactivated, staff_removed = _prune_devices(MerchantUserDevice, cutoff)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f'Failed to prune devices: {str(e)}',
+                'error_code': 'SYS_001'
+            }
+
+        return {
+            'success': True,
+            'data': {
+                'customer_devices': {
+                    'deactivated': customer_deactivated,
+                    'removed': customer_removed
+                },
+                'merchant_devices': {
+                    'deactivated': staff_deactivated,
+                    'removed': staff_removed
+                }
+            }
+        }
+
     # ==================== Merchant Staff Notification Templates ====================
 
     @staticmethod
     def notify_staff_transaction_confirmed(staff_id, transaction):
         """Notify staff when customer confirms transaction"""
+        values = {'reference': transaction.reference_number, 'amount': transaction.total_amount}
         return NotificationService.create_staff_notification(
             staff_id=staff_id,
             title_ar='تأكيد معاملة',
             title_en='Transaction Confirmed',
-            body_ar=f'تم تأكيد المعاملة رقم {transaction.reference_number} بقيمة {transaction.total_amount} ريال',
-            body_en=f'Transaction {transaction.reference_number} for {transaction.total_amount} SAR has been confirmed',
+            body_ar=_TPL_STAFF_TXN_CONFIRMED_AR.format_map(values),
+            body_en=_TPL_STAFF_TXN_CONFIRMED_EN.format_map(values),
             notification_type='transaction_confirmed',
             related_entity_type='transaction',
             related_entity_id=transaction.id
@@ -622,16 +1290,15 @@ class NotificationService:
     @staticmethod
     def notify_staff_transaction_rejected(staff_id, transaction, reason=None):
         """Notify staff when customer rejects transaction"""
-        body_ar = f'تم رفض المعاملة رقم {transaction.reference_number}'
-        if reason:
-            body_ar += f' - السبب: {reason}'
+        values = {'reference': transaction.reference_number, 'reason': reason}
+        body_ar_tpl = _TPL_STAFF_TXN_REJECTED_REASON_AR if reason else _TPL_STAFF_TXN_REJECTED_AR
 
         return NotificationService.create_staff_notification(
             staff_id=staff_id,
             title_ar='رفض معاملة',
             title_en='Transaction Rejected',
-            body_ar=body_ar,
-            body_en=f'Transaction {transaction.reference_number} has been rejected',
+            body_ar=body_ar_tpl.format_map(values),
+            body_en=_TPL_STAFF_TXN_REJECTED_EN.format_map(values),
             notification_type='transaction_rejected',
             related_entity_type='transaction',
             related_entity_id=transaction.id
@@ -640,12 +1307,13 @@ class NotificationService:
     @staticmethod
     def notify_staff_payment_received(staff_id, payment):
         """Notify staff when payment is received"""
+        values = {'amount': payment.amount}
         return NotificationService.create_staff_notification(
             staff_id=staff_id,
             title_ar='دفعة جديدة',
             title_en='Payment Received',
-            body_ar=f'تم استلام دفعة بقيمة {payment.amount} ريال',
-            body_en=f'Payment of {payment.amount} SAR has been received',
+            body_ar=_TPL_STAFF_PAYMENT_AR.format_map(values),
+            body_en=_TPL_STAFF_PAYMENT_EN.format_map(values),
             notification_type='payment_received',
             related_entity_type='payment',
             related_entity_id=payment.id
@@ -654,12 +1322,13 @@ class NotificationService:
     @staticmethod
     def notify_staff_settlement_ready(staff_id, settlement):
         """Notify staff when settlement is ready"""
+        values = {'amount': settlement.amount}
         return NotificationService.create_staff_notification(
             staff_id=staff_id,
             title_ar='تسوية جاهزة',
             title_en='Settlement Ready',
-            body_ar=f'تسوية بقيمة {settlement.amount} ريال جاهزة للصرف',
-            body_en=f'Settlement of {settlement.amount} SAR is ready for payout',
+            body_ar=_TPL_STAFF_SETTLEMENT_AR.format_map(values),
+            body_en=_TPL_STAFF_SETTLEMENT_EN.format_map(values),
             notification_type='settlement_ready',
             related_entity_type='settlement',
             related_entity_id=settlement.id
@@ -1,13 +1,19 @@
 """
 Payment Service - Full Implementation
 """
-from datetime import datetime
+from datetime import datetime, timedelta
+import logging
+import uuid
 from flask import current_app
+from sqlalchemy.orm import joinedload
 from app.extensions import db
 from app.models.payment import Payment
 from app.models.transaction import Transaction
 from app.models.customer import Customer
-from app.models.notification import Notification
+from app.models.mixins import generate_reference
+from app.services.notification_service import NotificationService
+from app.tasks.notifications import create_customer_notification
+from app.utils.pagination import InvalidCursorError, decode_cursor, keyset_page
 from app.utils.realtime import (
     emit_to_customer,
     emit_to_merchant,
@@ -17,30 +23,62 @@ from app.utils.realtime import (
     build_credit_event_data
 )
 
+logger = logging.getLogger(__name__)
+
+_VALID_PAYMENT_METHODS = frozenset({'cash', 'bank_transfer', 'card', 'mada', 'apple_pay', 'stc_pay'})
+
+# Transaction statuses that still carry an outstanding balance
+_OUTSTANDING_STATUSES = ('confirmed', 'overdue')
+
+_TXN = Transaction.__table__
+_TXN_PAID_AFTER = _TXN.c.paid_amount + db.bindparam('amount', type_=db.Numeric(10, 2))
+_TXN_FULLY_PAID = _TXN_PAID_AFTER >= _TXN.c.total_amount - _TXN.c.returned_amount
+
+# Atomic payment against one transaction. The WHERE clause rejects a payment
+# that would exceed the balance as it is at write time, so concurrent payers
+# cannot overpay; callers check the rowcount. Run with one parameter set per
+# transaction: txn_id, amount, now.
+_APPLY_TXN_PAYMENT = db.update(_TXN).where(
+    _TXN.c.id == db.bindparam('txn_id'),
+    # OR rather than IN: expanding IN parameters cannot be used with executemany
+    db.or_(*(_TXN.c.status == status for status in _OUTSTANDING_STATUSES)),
+    _TXN_PAID_AFTER <= _TXN.c.total_amount - _TXN.c.returned_amount
+).values(
+    paid_amount=_TXN_PAID_AFTER,
+    status=db.case((_TXN_FULLY_PAID, 'paid'), else_=_TXN.c.status),
+    paid_at=db.case((_TXN_FULLY_PAID, db.bindparam('now')), else_=_TXN.c.paid_at),
+    updated_at=db.bindparam('now')
+)
+
 
 class PaymentService:
     """Payment service for all payment-related operations"""
 
+    @staticmethod
+    def _customer_exists(customer_id):
+        """Existence probe used only on empty-result paths"""
+        return db.session.query(db.exists().where(Customer.id == customer_id)).scalar()
+
     # ==================== Customer Debt Overview ====================
 
     @staticmethod
     def get_customer_debt(customer_id):
         """Get customer's outstanding debt summary"""
-        customer = Customer.query.get(customer_id)
+        # Get outstanding transactions (confirmed and overdue)
+        outstanding_transactions = Transaction.query.options(
+            joinedload(Transaction.merchant)
+        ).filter(
+            Transaction.customer_id == customer_id,
+            Transaction.status.in_(_OUTSTANDING_STATUSES)
+        ).order_by(Transaction.due_date.asc()).all()
 
-        if not customer:
+        if not outstanding_transactions and not PaymentService._customer_exists(customer_id):
             return {
                 'success': False,
                 'message': 'Customer not found',
                 'error_code': 'CUST_001'
             }
 
-        # Get outstanding transactions (confirmed and overdue)
-        outstanding_transactions = Transaction.query.filter(
-            Transaction.customer_id == customer_id,
-            Transaction.status.in_(['confirmed', 'overdue'])
-        ).order_by(Transaction.due_date.asc()).all()
-
         # Calculate totals
         total_debt = 0
         overdue_amount = 0
@@ -81,19 +119,19 @@ class PaymentService:
     @staticmethod
     def get_customer_payments(customer_id, page=1, per_page=20):
         """Get customer's payment history"""
-        customer = Customer.query.get(customer_id)
+        query = Payment.query.options(
+            joinedload(Payment.transaction).joinedload(Transaction.merchant)
+        ).filter_by(customer_id=customer_id)
+        query = query.order_by(Payment.created_at.desc())
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
 
-        if not customer:
+        if not pagination.total and not PaymentService._customer_exists(customer_id):
             return {
                 'success': False,
                 'message': 'Customer not found',
                 'error_code': 'CUST_001'
             }
 
-        query = Payment.query.filter_by(customer_id=customer_id)
-        query = query.order_by(Payment.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-
         payments_data = []
         for payment in pagination.items:
             payment_dict = payment.to_dict()
@@ -122,7 +160,9 @@ class PaymentService:
     @staticmethod
     def make_payment(customer_id, transaction_id, amount, payment_method='cash'):
         """Process a payment for a transaction"""
-        customer = Customer.query.get(customer_id)
+        # Row lock on the customer serializes concurrent payments by the same
+        # customer; transaction rows are always locked after it
+        customer = db.session.get(Customer, customer_id, with_for_update=True, populate_existing=True)
 
         if not customer:
             return {
@@ -134,7 +174,7 @@ class PaymentService:
         transaction = Transaction.query.filter_by(
             id=transaction_id,
             customer_id=customer_id
-        ).first()
+        ).with_for_update().populate_existing().first()
 
         if not transaction:
             return {
@@ -167,12 +207,13 @@ class PaymentService:
                 'error_code': 'VAL_001'
             }
 
-        # Valid payment methods
-        valid_methods = ['cash', 'bank_transfer', 'card', 'mada', 'apple_pay', 'stc_pay']
-        if payment_method not in valid_methods:
+        if payment_method not in _VALID_PAYMENT_METHODS:
             payment_method = 'cash'
 
         try:
+            # One timestamp for every row this payment touches
+            now = datetime.utcnow()
+
             # Create payment record
             payment = Payment(
                 transaction_id=transaction_id,
@@ -180,28 +221,33 @@ class PaymentService:
                 amount=amount,
                 payment_method=payment_method,
                 status='completed',
-                completed_at=datetime.utcnow()
+                completed_at=now
             )
 
             db.session.add(payment)
 
             # Update transaction
-            transaction.paid_amount = float(transaction.paid_amount) + amount
-            transaction.updated_at = datetime.utcnow()
-
-            # Check if fully paid
-            if transaction.remaining_amount <= 0:
-                transaction.status = 'paid'
-                transaction.paid_at = datetime.utcnow()
+            updated = db.session.execute(_APPLY_TXN_PAYMENT, {
+                'txn_id': transaction.id,
+                'amount': amount,
+                'now': now
+            }).rowcount
+
+            if not updated:
+                # Another payment reduced the balance since it was read
+                db.session.rollback()
+                return {
+                    'success': False,
+                    'message': 'Payment amount exceeds the current remaining balance',
+                    'error_code': 'VAL_001'
+                }
 
             # Update customer credit
-            customer.available_credit = float(customer.available_credit) + amount
-            customer.used_credit = float(customer.used_credit) - amount
-            customer.updated_at = datetime.utcnow()
+            PaymentService._release_credit(customer_id, amount, now)
 
             db.session.commit()
 
-            # Send notification
+            # The in-app notification is written by a worker, off the payment commit
             PaymentService._notify_payment_received(customer, transaction, payment)
 
             # Emit real-time events
@@ -236,12 +282,116 @@ class PaymentService:
                 'error_code': 'SYS_001'
             }
 
+    @staticmethod
+    def _release_credit(customer_id, amount, now):
+        """Give `amount` of used credit back to the customer with an atomic UPDATE"""
+        db.session.execute(
+            db.update(Customer).where(Customer.id == customer_id).values(
+                available_credit=Customer.available_credit + amount,
+                used_credit=Customer.used_credit - amount,
+                updated_at=now
+            ),
+            execution_options={'synchronize_session': False}
+        )
+
+    @staticmethod
+    def _apply_transaction_payments(txn_updates):
+        """
+        Apply `{'txn_id', 'amount', 'now'}` payment rows in one executemany UPDATE
+
+        Returns False if any transaction could no longer take its amount; the
+        caller must roll back the rows that did apply.
+        """
+        updated = db.session.execute(_APPLY_TXN_PAYMENT, txn_updates).rowcount
+        return updated == len(txn_updates)
+
+    @staticmethod
+    def _outstanding_total(customer_id, transaction_ids=None):
+        """
+        Sum the remaining balance of a customer's outstanding transactions in SQL
+
+        Mirrors Transaction.remaining_amount. Returns None when no
+        transaction matches.
+        """
+        query = db.session.query(
+            db.func.sum(Transaction.total_amount - Transaction.paid_amount - Transaction.returned_amount)
+        ).filter(
+            Transaction.customer_id == customer_id,
+            Transaction.status.in_(_OUTSTANDING_STATUSES)
+        )
+        if transaction_ids is not None:
+            query = query.filter(Transaction.id.in_(transaction_ids))
+
+        total = query.scalar()
+        return float(total) if total is not None else None
+
+    @staticmethod
+    def _allocate_payments(customer_id, transactions, total_amount, payment_method, now):
+        """
+        Spread `total_amount` over `transactions` in order, oldest first
+
+        Writes every Payment with one INSERT and every transaction update with
+        one executemany UPDATE; does not commit. Returns the inserted payment
+        rows and the per-transaction summaries, or None if a balance changed
+        concurrently and a transaction could no longer take its share.
+        """
+        remaining_payment = total_amount
+        payment_rows = []
+        txn_updates = []
+        payments_made = []
+
+        for txn in transactions:
+            if remaining_payment <= 0:
+                break
+
+            txn_remaining = txn.remaining_amount
+            payment_for_txn = min(remaining_payment, txn_remaining)
+            fully_paid = txn_remaining - payment_for_txn <= 0
+            status = 'paid' if fully_paid else txn.status
+
+            payment_row = {
+                'id': str(uuid.uuid4()),
+                'reference_number': generate_reference('PAY'),
+                'transaction_id': txn.id,
+                'customer_id': customer_id,
+                'amount': payment_for_txn,
+                'payment_method': payment_method,
+                'status': 'completed',
+                'completed_at': now
+            }
+            payment_rows.append(payment_row)
+
+            txn_updates.append({
+                'txn_id': txn.id,
+                'amount': payment_for_txn,
+                'now': now
+            })
+
+            payments_made.append({
+                'payment_id': payment_row['id'],
+                'transaction_id': txn.id,
+                'reference_number': txn.reference_number,
+                'amount': payment_for_txn,
+                'transaction_status': status
+            })
+
+            remaining_payment -= payment_for_txn
+
+        if payment_rows:
+            if not PaymentService._apply_transaction_payments(txn_updates):
+                return None
+            db.session.execute(db.insert(Payment), payment_rows)
+
+        return payment_rows, payments_made
+
     # ==================== Pay Multiple Transactions ====================
 
     @staticmethod
     def make_multi_transaction_payment(customer_id, transaction_ids, total_amount, payment_method='card'):
         """Pay for specific transactions (by IDs)"""
-        customer = Customer.query.get(customer_id)
+        # Row lock on the customer serializes concurrent payments by the same
+        # customer; transaction rows are always locked after it
+        customer = db.session.get(Customer, customer_id, with_for_update=True, populate_existing=True)
 
         if not customer:
             return {
@@ -266,23 +416,16 @@ class PaymentService:
                 'error_code': 'VAL_001'
             }
 
-        # Get specified transactions
-        transactions = Transaction.query.filter(
-            Transaction.id.in_(transaction_ids),
-            Transaction.customer_id == customer_id,
-            Transaction.status.in_(['confirmed', 'overdue'])
-        ).order_by(Transaction.due_date.asc()).all()
+        # Validate against the aggregate before loading any rows
+        total_remaining = PaymentService._outstanding_total(customer_id, transaction_ids)
 
-        if not transactions:
+        if total_remaining is None:
             return {
                 'success': False,
                 'message': 'No valid transactions found',
                 'error_code': 'TXN_001'
             }
 
-        # Calculate total remaining for selected transactions
-        total_remaining = sum(t.remaining_amount for t in transactions)
-
         if total_amount > total_remaining:
             return {
                 'success': False,
@@ -290,59 +433,33 @@ class PaymentService:
                 'error_code': 'VAL_001'
             }
 
-        # Valid payment methods
-        valid_methods = ['cash', 'bank_transfer', 'card', 'mada', 'apple_pay', 'stc_pay']
-        if payment_method not in valid_methods:
+        # Get specified transactions
+        transactions = Transaction.query.filter(
+            Transaction.id.in_(transaction_ids),
+            Transaction.customer_id == customer_id,
+            Transaction.status.in_(_OUTSTANDING_STATUSES)
+        ).order_by(Transaction.due_date.asc()).with_for_update().populate_existing().all()
+
+        if payment_method not in _VALID_PAYMENT_METHODS:
             payment_method = 'card'
 
         try:
-            remaining_payment = total_amount
-            payments_made = []
-            main_payment_ref = None
-
-            for txn in transactions:
-                if remaining_payment <= 0:
-                    break
-
-                txn_remaining = txn.remaining_amount
-                payment_for_txn = min(remaining_payment, txn_remaining)
-
-                # Create payment
-                payment = Payment(
-                    transaction_id=txn.id,
-                    customer_id=customer_id,
-                    amount=payment_for_txn,
-                    payment_method=payment_method,
-                    status='completed',
-                    completed_at=datetime.utcnow()
-                )
-                db.session.add(payment)
-
-                if not main_payment_ref:
-                    main_payment_ref = payment.reference_number
-
-                # Update transaction
-                txn.paid_amount = float(txn.paid_amount) + payment_for_txn
-                txn.updated_at = datetime.utcnow()
-
-                if txn.remaining_amount <= 0:
-                    txn.status = 'paid'
-                    txn.paid_at = datetime.utcnow()
-
-                payments_made.append({
-                    'payment_id': payment.id,
-                    'transaction_id': txn.id,
-                    'reference_number': txn.reference_number,
-                    'amount': payment_for_txn,
-                    'transaction_status': txn.status
-                })
-
-                remaining_payment -= payment_for_txn
+            now = datetime.utcnow()
+            allocation = PaymentService._allocate_payments(
+                customer_id, transactions, total_amount, payment_method, now
+            )
+            if allocation is None:
+                db.session.rollback()
+                return {
+                    'success': False,
+                    'message': 'Payment amount exceeds the current remaining balance',
+                    'error_code': 'VAL_001'
+                }
+            payment_rows, payments_made = allocation
+            main_payment_ref = payment_rows[0]['reference_number'] if payment_rows else None
 
             # Update customer credit
-            customer.available_credit = float(customer.available_credit) + total_amount
-            customer.used_credit = float(customer.used_credit) - total_amount
-            customer.updated_at = datetime.utcnow()
+            PaymentService._release_credit(customer_id, total_amount, now)
 
             db.session.commit()
 
@@ -388,7 +505,9 @@ class PaymentService:
     @staticmethod
     def make_bulk_payment(customer_id, total_amount, payment_method='cash'):
         """Pay multiple transactions at once (oldest first)"""
-        customer = Customer.query.get(customer_id)
+        # Row lock on the customer serializes concurrent payments by the same
+        # customer; transaction rows are always locked after it
+        customer = db.session.get(Customer, customer_id, with_for_update=True, populate_existing=True)
 
         if not customer:
             return {
@@ -406,22 +525,19 @@ class PaymentService:
                 'error_code': 'VAL_001'
             }
 
-        # Get outstanding transactions ordered by due date (oldest first)
-        outstanding = Transaction.query.filter(
-            Transaction.customer_id == customer_id,
-            Transaction.status.in_(['confirmed', 'overdue'])
-        ).order_by(Transaction.due_date.asc()).all()
+        if payment_method not in _VALID_PAYMENT_METHODS:
+            payment_method = 'cash'
+
+        # Validate against the aggregate before loading any rows
+        total_outstanding = PaymentService._outstanding_total(customer_id)
 
-        if not outstanding:
+        if total_outstanding is None:
             return {
                 'success': False,
                 'message': 'No outstanding transactions to pay',
                 'error_code': 'TXN_001'
             }
 
-        # Calculate total outstanding
-        total_outstanding = sum(t.remaining_amount for t in outstanding)
-
         if total_amount > total_outstanding:
             return {
                 'success': False,
@@ -429,52 +545,28 @@ class PaymentService:
                 'error_code': 'VAL_001'
             }
 
-        try:
-            remaining_payment = total_amount
-            payments_made = []
-
-            for txn in outstanding:
-                if remaining_payment <= 0:
-                    break
-
-                txn_remaining = txn.remaining_amount
-
-                # Determine how much to pay for this transaction
-                payment_for_txn = min(remaining_payment, txn_remaining)
-
-                # Create payment
-                payment = Payment(
-                    transaction_id=txn.id,
-                    customer_id=customer_id,
-                    amount=payment_for_txn,
-                    payment_method=payment_method,
-                    status='completed',
-                    completed_at=datetime.utcnow()
-                )
-                db.session.add(payment)
-
-                # Update transaction
-                txn.paid_amount = float(txn.paid_amount) + payment_for_txn
-                txn.updated_at = datetime.utcnow()
-
-                if txn.remaining_amount <= 0:
-                    txn.status = 'paid'
-                    txn.paid_at = datetime.utcnow()
-
-                payments_made.append({
-                    'payment_id': payment.id,
-                    'transaction_id': txn.id,
-                    'reference_number': txn.reference_number,
-                    'amount': payment_for_txn,
-                    'transaction_status': txn.status
-                })
+        # Get outstanding transactions ordered by due date (oldest first)
+        outstanding = Transaction.query.filter(
+            Transaction.customer_id == customer_id,
+            Transaction.status.in_(_OUTSTANDING_STATUSES)
+        ).order_by(Transaction.due_date.asc()).with_for_update().populate_existing().all()
 
-                remaining_payment -= payment_for_txn
+        try:
+            now = datetime.utcnow()
+            allocation = PaymentService._allocate_payments(
+                customer_id, outstanding, total_amount, payment_method, now
+            )
+            if allocation is None:
+                db.session.rollback()
+                return {
+                    'success': False,
+                    'message': 'Payment amount exceeds the current remaining balance',
+                    'error_code': 'VAL_001'
+                }
+            _, payments_made = allocation
 
             # Update customer credit
-            customer.available_credit = float(customer.available_credit) + total_amount
-            customer.used_credit = float(customer.used_credit) - total_amount
-            customer.updated_at = datetime.utcnow()
+            PaymentService._release_credit(customer_id, total_amount, now)
 
             db.session.commit()
 
@@ -520,27 +612,29 @@ class PaymentService:
     @staticmethod
     def send_payment_reminders():
         """Send payment reminders for due transactions (called by scheduler)"""
-        from datetime import timedelta
-
         today = datetime.utcnow().date()
         reminder_days = current_app.config.get('PAYMENT_REMINDER_DAYS', [3, 1, 0])
-
-        count = 0
-        for days in reminder_days:
-            due_date = today + timedelta(days=days)
-
-            transactions = Transaction.query.filter(
+        due_dates = [today + timedelta(days=days) for days in reminder_days]
+
+        due_rows = db.session.execute(
+            db.select(
+                Transaction.customer_id,
+                Transaction.id,
+                (Transaction.total_amount - Transaction.paid_amount).label('amount_due'),
+                Transaction.due_date
+            ).where(
                 Transaction.status == 'confirmed',
-                Transaction.due_date == due_date
-            ).all()
+                Transaction.due_date.in_(due_dates)
+            )
+        ).all()
 
-            for txn in transactions:
-                PaymentService._send_reminder(txn.customer, txn, days)
-                count += 1
+        result = NotificationService.notify_payment_reminders_bulk(due_rows, today=today)
+        if not result['success']:
+            return result
 
         return {
             'success': True,
-            'message': f'Sent {count} payment reminders'
+            'message': f"Sent {result['data']['count']} payment reminders"
         }
 
     # ==================== Admin/Report Functions ====================
@@ -548,45 +642,30 @@ class PaymentService:
     @staticmethod
     def get_payment_statistics(from_date=None, to_date=None):
         """Get payment statistics for admin dashboard"""
-        query = Payment.query.filter_by(status='completed')
-
-        if from_date:
-            query = query.filter(Payment.completed_at >= from_date)
-
-        if to_date:
-            query = query.filter(Payment.completed_at <= to_date)
-
-        total_count = query.count()
-        total_amount = db.session.query(
-            db.func.coalesce(db.func.sum(Payment.amount), 0)
-        ).filter(Payment.status == 'completed')
-
+        date_filters = []
         if from_date:
-            total_amount = total_amount.filter(Payment.completed_at >= from_date)
+            date_filters.append(Payment.completed_at >= from_date)
         if to_date:
-            total_amount = total_amount.filter(Payment.completed_at <= to_date)
+            date_filters.append(Payment.completed_at <= to_date)
 
-        total_amount = total_amount.scalar()
-
-        # By payment method
+        # One grouped scan; the overall totals are the sum of the groups
         by_method = db.session.query(
             Payment.payment_method,
             db.func.count(Payment.id).label('count'),
             db.func.sum(Payment.amount).label('amount')
-        ).filter(Payment.status == 'completed')
-
-        if from_date:
-            by_method = by_method.filter(Payment.completed_at >= from_date)
-        if to_date:
-            by_method = by_method.filter(Payment.completed_at <= to_date)
+        ).filter(
+            Payment.status == 'completed',
+            *date_filters
+        ).group_by(Payment.payment_method).all()
 
-        by_method = by_method.group_by(Payment.payment_method).all()
+        total_count = sum(m.count for m in by_method)
+        total_amount = sum(float(m.amount) for m in by_method if m.amount)
 
         return {
             'success': True,
             'data': {
                 'total_count': total_count,
-                'total_amount': float(total_amount) if total_amount else 0,
+                'total_amount': total_amount,
                 'by_method': [
                     {
                         'method': m[0] or 'unknown',
@@ -599,9 +678,19 @@ class PaymentService:
         }
 
     @staticmethod
-    def get_all_payments(status=None, from_date=None, to_date=None, page=1, per_page=20):
-        """Get all payments for admin"""
-        query = Payment.query
+    def get_all_payments(status=None, from_date=None, to_date=None, page=None, per_page=20,
+                         cursor=None):
+        """
+        Get all payments for admin
+
+        Uses keyset pagination on (created_at, id): pass the `next_cursor`
+        from the previous page's meta to fetch the next one. The `page`
+        argument selects the old OFFSET pagination and is deprecated.
+        """
+        query = Payment.query.options(
+            joinedload(Payment.customer),
+            joinedload(Payment.transaction)
+        )
 
         if status:
             query = query.filter_by(status=status)
@@ -612,11 +701,35 @@ class PaymentService:
         if to_date:
             query = query.filter(Payment.created_at <= to_date)
 
-        query = query.order_by(Payment.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        query = query.order_by(Payment.created_at.desc(), Payment.id.desc())
+
+        if page is not None and not cursor:
+            # Deprecated: OFFSET pagination scans every skipped row
+            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            payments = pagination.items
+            meta = {
+                'page': page,
+                'per_page': per_page,
+                'total': pagination.total,
+                'total_pages': pagination.pages
+            }
+        else:
+            if cursor:
+                try:
+                    last_created_at, last_id = decode_cursor(cursor)
+                except InvalidCursorError as e:
+                    return {
+                        'success': False,
+                        'message': str(e),
+                        'error_code': 'VAL_001'
+                    }
+                query = query.filter(
+                    db.tuple_(Payment.created_at, Payment.id) < db.tuple_(last_created_at, last_id)
+                )
+            payments, meta = keyset_page(query.limit(per_page + 1).all(), per_page)
 
         payments_data = []
-        for payment in pagination.items:
+        for payment in payments:
             payment_dict = payment.to_dict()
             payment_dict['customer'] = {
                 'id': payment.customer.id,
@@ -634,59 +747,24 @@ class PaymentService:
             'data': {
                 'payments': payments_data
             },
-            'meta': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages
-            }
+            'meta': meta
         }
 
     # ==================== Notifications ====================
 
     @staticmethod
     def _notify_payment_received(customer, transaction, payment):
-        """Send notification for payment received"""
+        """Queue the payment received notification (best-effort)"""
         try:
-            notification = Notification(
+            create_customer_notification.delay(
                 customer_id=customer.id,
                 title_ar='تم استلام الدفعة',
                 title_en='Payment Received',
                 body_ar=f'تم استلام {payment.amount} ريال للمعاملة رقم {transaction.reference_number}',
                 body_en=f'Received {payment.amount} SAR for transaction {transaction.reference_number}',
-                type='payment',
-                reference_id=payment.id
+                notification_type='payment',
+                related_entity_type='payment',
+                related_entity_id=payment.id
             )
-            db.session.add(notification)
-            db.session.commit()
-        except Exception:
-            pass
-
-    @staticmethod
-    def _send_reminder(customer, transaction, days_until_due):
-        """Send payment reminder notification"""
-        try:
-            if days_until_due == 0:
-                title_ar = 'تذكير: موعد السداد اليوم'
-                title_en = 'Reminder: Payment Due Today'
-                body_ar = f'موعد سداد المعاملة رقم {transaction.reference_number} اليوم. المبلغ المتبقي: {transaction.remaining_amount} ريال'
-                body_en = f'Payment for transaction {transaction.reference_number} is due today. Remaining: {transaction.remaining_amount} SAR'
-            else:
-                title_ar = f'تذكير: موعد السداد بعد {days_until_due} أيام'
-                title_en = f'Reminder: Payment Due in {days_until_due} Days'
-                body_ar = f'موعد سداد المعاملة رقم {transaction.reference_number} بعد {days_until_due} أيام. المبلغ المتبقي: {transaction.remaining_amount} ريال'
-                body_en = f'Payment for transaction {transaction.reference_number} is due in {days_until_due} days. Remaining: {transaction.remaining_amount} SAR'
-
-            notification = Notification(
-                customer_id=customer.id,
-                title_ar=title_ar,
-                title_en=title_en,
-                body_ar=body_ar,
-                body_en=body_en,
-                type='payment_reminder',
-                reference_id=transaction.id
-            )
-            db.session.add(notification)
-            db.session.commit()
-        except Exception:
-            pass
+        except Exception as e:
+            logger.error(f"Failed to queue payment notification: {e}")
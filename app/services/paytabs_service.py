@@ -5,14 +5,71 @@ Handles all payment gateway operations with PayTabs
 import requests
 import hashlib
 import hmac
-import json
 from datetime import datetime
+from decimal import Decimal
 from flask import current_app
-from app.extensions import db
+from sqlalchemy.orm import defer, load_only
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.extensions import cache, db
 from app.models.payment import Payment
 from app.models.transaction import Transaction
 from app.models.customer import Customer
-from app.models.notification import Notification
+from app.services.payment_service import PaymentService
+from app.tasks.notifications import create_customer_notification
+
+_REGION_URLS = {
+    'saudi': 'https://secure.paytabs.sa',
+    'egypt': 'https://secure-egypt.paytabs.com',
+    'uae': 'https://secure.paytabs.com',
+    'global': 'https://secure-global.paytabs.com'
+}
+
+# (connect, read) timeouts in seconds: an unreachable gateway fails fast
+# instead of holding the request for the full read timeout
+_REQUEST_TIMEOUT = (3.05, 15)
+
+# Payment statuses a webhook can no longer change
+_FINAL_PAYMENT_STATUSES = ('completed', 'failed', 'declined')
+
+# How long a finished webhook is remembered to short-circuit gateway retries
+WEBHOOK_DONE_CACHE_TIMEOUT = 3600
+
+
+def _webhook_done_key(tran_ref):
+    """Cache key for the final status of a processed webhook"""
+    return f'paytabs:webhook:{tran_ref}'
+
+
+# Static response for the payment methods endpoint (shared, do not modify)
+_PAYMENT_METHODS_RESPONSE = {
+    'success': True,
+    'data': {
+        'methods': [
+            {
+                'code': 'all',
+                'name_ar': 'جميع الطرق',
+                'name_en': 'All Methods',
+                'description_ar': 'بطاقة ائتمان أو Apple Pay',
+                'description_en': 'Credit Card or Apple Pay'
+            },
+            {
+                'code': 'creditcard',
+                'name_ar': 'بطاقة ائتمان',
+                'name_en': 'Credit Card',
+                'description_ar': 'فيزا أو ماستركارد',
+                'description_en': 'Visa or Mastercard'
+            },
+            {
+                'code': 'applepay',
+                'name_ar': 'Apple Pay',
+                'name_en': 'Apple Pay',
+                'description_ar': 'الدفع عبر Apple Pay',
+                'description_en': 'Pay with Apple Pay'
+            }
+        ]
+    }
+}
 
 
 class PayTabsService:
@@ -28,47 +85,84 @@ class PayTabsService:
         'D': 'declined',       # Declined
     }
 
+    # Shared HTTP session, reused across calls for keep-alive and TLS reuse
+    _session = None
+    _session_server_key = None
+
     # ==================== Configuration ====================
 
+    @staticmethod
+    def _settings():
+        """
+        Build the PayTabs settings once per app and keep them on the app.
+
+        Config is fixed once the app is created, so the config dict, base URL
+        and headers are computed on first use and shared read-only after.
+        """
+        app = current_app._get_current_object()
+        settings = app.extensions.get('paytabs')
+        if settings is None:
+            config = app.config
+            paytabs_config = {
+                'profile_id': config.get('PAYTABS_PROFILE_ID'),
+                'server_key': config.get('PAYTABS_SERVER_KEY'),
+                'client_key': config.get('PAYTABS_CLIENT_KEY'),
+                'currency': config.get('PAYTABS_CURRENCY', 'SAR'),
+                'region': config.get('PAYTABS_REGION', 'saudi'),  # Default to Saudi Arabia
+                'sandbox': config.get('PAYTABS_SANDBOX', True),
+                'return_url': config.get('PAYMENT_RETURN_URL'),
+                'callback_url': config.get('PAYMENT_CALLBACK_URL'),
+                'expiry_minutes': config.get('PAYMENT_EXPIRY_MINUTES', 30),
+                'min_amount': config.get('MIN_PAYMENT_AMOUNT', 10),
+            }
+            settings = {
+                'config': paytabs_config,
+                'base_url': _REGION_URLS.get(paytabs_config['region'].lower(), _REGION_URLS['saudi']),
+                'headers': {
+                    'Authorization': paytabs_config['server_key'],
+                    'Content-Type': 'application/json'
+                }
+            }
+            app.extensions['paytabs'] = settings
+        return settings
+
     @staticmethod
     def get_config():
-        """Get PayTabs configuration"""
-        config = current_app.config
-        return {
-            'profile_id': config.get('PAYTABS_PROFILE_ID'),
-            'server_key': config.get('PAYTABS_SERVER_KEY'),
-            'client_key': config.get('PAYTABS_CLIENT_KEY'),
-            'currency': config.get('PAYTABS_CURRENCY', 'SAR'),
-            'region': config.get('PAYTABS_REGION', 'saudi'),  # Default to Saudi Arabia
-            'sandbox': config.get('PAYTABS_SANDBOX', True),
-            'return_url': config.get('PAYMENT_RETURN_URL'),
-            'callback_url': config.get('PAYMENT_CALLBACK_URL'),
-            'expiry_minutes': config.get('PAYMENT_EXPIRY_MINUTES', 30),
-            'min_amount': config.get('MIN_PAYMENT_AMOUNT', 10),
-        }
+        """Get PayTabs configuration (shared, do not modify)"""
+        return PayTabsService._settings()['config']
 
     @staticmethod
     def get_base_url():
         """Get PayTabs API base URL based on region"""
-        config = PayTabsService.get_config()
-        region = config['region'].lower()
-
-        region_urls = {
-            'saudi': 'https://secure.paytabs.sa',
-            'egypt': 'https://secure-egypt.paytabs.com',
-            'uae': 'https://secure.paytabs.com',
-            'global': 'https://secure-global.paytabs.com'
-        }
-        return region_urls.get(region, region_urls['saudi'])
+        return PayTabsService._settings()['base_url']
 
     @staticmethod
     def get_headers():
-        """Get API request headers"""
-        config = PayTabsService.get_config()
-        return {
-            'Authorization': config['server_key'],
-            'Content-Type': 'application/json'
-        }
+        """Get API request headers (shared, do not modify)"""
+        return PayTabsService._settings()['headers']
+
+    @classmethod
+    def _get_session(cls):
+        """
+        Get the pooled HTTP session for PayTabs API calls.
+
+        Built once per server key so the Authorization header lives on the
+        session. Retries only cover connection failures; POSTs that reached
+        the gateway are never replayed.
+        """
+        headers = cls.get_headers()
+        if cls._session is None or cls._session_server_key != headers['Authorization']:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=10,
+                pool_maxsize=50,
+                max_retries=Retry(total=2, backoff_factor=0.2)
+            )
+            session.mount('https://', adapter)
+            session.headers.update(headers)
+            cls._session = session
+            cls._session_server_key = headers['Authorization']
+        return cls._session
 
     # ==================== Create Payment Page ====================
 
@@ -103,8 +197,11 @@ class PayTabsService:
                 'error_code': 'PAY_001'
             }
 
-        # Get customer
-        customer = Customer.query.get(customer_id)
+        # Get customer, loading only the fields sent to the gateway
+        customer = db.session.get(Customer, customer_id, options=[load_only(
+            Customer.bariq_id, Customer.full_name_ar, Customer.full_name_en,
+            Customer.email, Customer.phone, Customer.address_line, Customer.city
+        )])
         if not customer:
             return {
                 'success': False,
@@ -112,11 +209,20 @@ class PayTabsService:
                 'error_code': 'CUST_001'
             }
 
-        # Validate transactions
-        transactions = Transaction.query.filter(
-            Transaction.id.in_(transaction_ids),
-            Transaction.customer_id == customer_id,
-            Transaction.status.in_(['confirmed', 'overdue'])
+        # Validate transactions: ids, references and the total remaining
+        # balance in one projected query, oldest due first
+        transactions = db.session.execute(
+            db.select(
+                Transaction.id,
+                Transaction.reference_number,
+                db.func.sum(
+                    Transaction.total_amount - Transaction.paid_amount - Transaction.returned_amount
+                ).over().label('total_remaining')
+            ).where(
+                Transaction.id.in_(transaction_ids),
+                Transaction.customer_id == customer_id,
+                Transaction.status.in_(['confirmed', 'overdue'])
+            ).order_by(Transaction.due_date.asc())
         ).all()
 
         if not transactions:
@@ -127,7 +233,7 @@ class PayTabsService:
             }
 
         # Calculate total remaining
-        total_remaining = sum(t.remaining_amount for t in transactions)
+        total_remaining = float(transactions[0].total_remaining)
         if amount > total_remaining:
             return {
                 'success': False,
@@ -136,10 +242,12 @@ class PayTabsService:
             }
 
         # Generate unique cart ID
-        cart_id = f"BARIQ-{customer.bariq_id}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+        now = datetime.utcnow()
+        cart_id = f"BARIQ-{customer.bariq_id}-{now.strftime('%Y%m%d%H%M%S')}"
 
         # Build transaction IDs string for reference
-        txn_refs = ','.join([str(t.id) for t in transactions])
+        valid_transaction_ids = [t.id for t in transactions]
+        txn_refs = ','.join(valid_transaction_ids)
 
         # Default description
         if not description:
@@ -148,6 +256,8 @@ class PayTabsService:
             else:
                 description = f"Payment for {len(transactions)} transactions"
 
+        city = customer.city or 'Riyadh'
+
         # Build payment request
         payload = {
             'profile_id': config['profile_id'],
@@ -164,8 +274,8 @@ class PayTabsService:
                 'email': customer.email or f"{customer.bariq_id}@bariq.sa",
                 'phone': customer.phone or '',
                 'street1': customer.address_line or 'Saudi Arabia',
-                'city': customer.city or 'Riyadh',
-                'state': customer.city or 'Riyadh',
+                'city': city,
+                'state': city,
                 'country': 'SA',
                 'zip': '00000'
             },
@@ -175,7 +285,7 @@ class PayTabsService:
                 'udf2': txn_refs,                   # Transaction IDs
                 'udf3': str(amount),                # Original amount
                 'udf4': 'bariq_payment',            # Payment type identifier
-                'udf5': datetime.utcnow().isoformat()  # Timestamp
+                'udf5': now.isoformat()  # Timestamp
             }
         }
 
@@ -189,11 +299,10 @@ class PayTabsService:
         try:
             # Make API request
             base_url = PayTabsService.get_base_url()
-            response = requests.post(
+            response = PayTabsService._get_session().post(
                 f"{base_url}/payment/request",
-                headers=PayTabsService.get_headers(),
                 json=payload,
-                timeout=30
+                timeout=_REQUEST_TIMEOUT
             )
 
             response_data = response.json()
@@ -207,9 +316,9 @@ class PayTabsService:
                     payment_method='paytabs',
                     status='pending',
                     gateway_reference=response_data.get('tran_ref'),
-                    gateway_response=json.dumps({
+                    gateway_response=current_app.json.dumps({
                         'cart_id': cart_id,
-                        'transaction_ids': [t.id for t in transactions],
+                        'transaction_ids': valid_transaction_ids,
                         'redirect_url': response_data.get('redirect_url')
                     })
                 )
@@ -282,13 +391,26 @@ class PayTabsService:
             response_message = payload.get('payment_result', {}).get('response_message', '')
             payment_method = payload.get('payment_info', {}).get('payment_method', '')
 
+            # Gateway retries of a finished webhook are answered from the cache
+            if tran_ref:
+                done_status = cache.get(_webhook_done_key(tran_ref))
+                if done_status:
+                    return {
+                        'success': True,
+                        'message': 'Payment already processed',
+                        'data': {'status': done_status}
+                    }
+
             # Get user defined fields
             customer_id = payload.get('user_defined', {}).get('udf1')
             transaction_ids_str = payload.get('user_defined', {}).get('udf2', '')
             original_amount = payload.get('user_defined', {}).get('udf3')
 
-            # Find the pending payment with row-level lock (FOR UPDATE)
-            payment = Payment.query.filter_by(gateway_reference=tran_ref).with_for_update().first()
+            # Find the pending payment with row-level lock (FOR UPDATE).
+            # gateway_response is only overwritten here, so it is not fetched.
+            payment = Payment.query.options(
+                defer(Payment.gateway_response)
+            ).filter_by(gateway_reference=tran_ref).with_for_update().first()
 
             if not payment:
                 return {
@@ -298,7 +420,8 @@ class PayTabsService:
                 }
 
             # Already processed (idempotency check)
-            if payment.status in ['completed', 'failed', 'declined']:
+            if payment.status in _FINAL_PAYMENT_STATUSES:
+                cache.set(_webhook_done_key(tran_ref), payment.status, timeout=WEBHOOK_DONE_CACHE_TIMEOUT)
                 return {
                     'success': True,
                     'message': 'Payment already processed',
@@ -332,40 +455,66 @@ class PayTabsService:
             # Update payment record
             payment.status = internal_status
             payment.payment_method = payment_method or 'paytabs'
-            payment.gateway_response = json.dumps(payload)
-            payment.updated_at = datetime.utcnow()
+            payment.gateway_response = current_app.json.dumps(payload)
+            now = datetime.utcnow()
+            payment.updated_at = now
 
             if internal_status == 'completed':
-                payment.completed_at = datetime.utcnow()
+                payment.completed_at = now
+
+                # Process the actual payment - update transactions. The customer
+                # is locked before its transactions, in the same order as
+                # PaymentService.make_payment, so the two paths cannot deadlock.
+                customer = db.session.get(
+                    Customer, customer_id or payment.customer_id,
+                    with_for_update=True, populate_existing=True
+                )
 
-                # Process the actual payment - update transactions
                 result = PayTabsService._process_successful_payment(
                     payment=payment,
-                    customer_id=customer_id if customer_id else payment.customer_id,
+                    customer=customer,
                     transaction_ids_str=transaction_ids_str,
-                    amount=cart_amount
+                    amount=cart_amount,
+                    now=now
                 )
 
                 if not result['success']:
-                    # Rollback payment status if transaction update fails
+                    # Undo every write of this webhook, then record the error
+                    # on the still-pending payment
+                    db.session.rollback()
                     payment.status = 'pending'
                     payment.release_lock()
-                    payment.gateway_response = json.dumps({
+                    payment.gateway_response = current_app.json.dumps({
                         **payload,
                         'processing_error': result['message']
                     })
                     db.session.commit()
                     return result
 
-            # Release lock after successful processing
+            # Release lock after successful processing; the payment and its
+            # transaction and credit updates land in this one commit. Ids are
+            # read first so nothing is reloaded after the commit expires them.
             payment.release_lock()
+            payment_id = payment.id
+            payment_customer_id = payment.customer_id
             db.session.commit()
 
+            if internal_status in _FINAL_PAYMENT_STATUSES:
+                cache.set(_webhook_done_key(tran_ref), internal_status, timeout=WEBHOOK_DONE_CACHE_TIMEOUT)
+
+            if internal_status == 'completed':
+                # The in-app notification is written by a worker, off the payment commit
+                PayTabsService._notify_payment_success(
+                    customer_id if customer_id else payment_customer_id,
+                    payment_id,
+                    result['data']['payments']
+                )
+
             return {
                 'success': True,
                 'message': f'Payment {internal_status}',
                 'data': {
-                    'payment_id': payment.id,
+                    'payment_id': payment_id,
                     'status': internal_status,
                     'tran_ref': tran_ref,
                     'amount': cart_amount,
@@ -385,10 +534,9 @@ class PayTabsService:
     # ==================== Process Successful Payment ====================
 
     @staticmethod
-    def _process_successful_payment(payment, customer_id, transaction_ids_str, amount):
-        """Process a successful payment - update transactions and credit"""
+    def _process_successful_payment(payment, customer, transaction_ids_str, amount, now):
+        """Process a successful payment - update transactions and credit; does not commit"""
         try:
-            customer = Customer.query.get(customer_id)
             if not customer:
                 return {
                     'success': False,
@@ -402,11 +550,16 @@ class PayTabsService:
             if not transaction_ids:
                 transaction_ids = [payment.transaction_id]
 
-            # Get transactions
-            transactions = Transaction.query.filter(
+            # Get transactions, locked in the same SELECT
+            transactions = Transaction.query.options(
+                load_only(
+                    Transaction.reference_number, Transaction.status, Transaction.total_amount,
+                    Transaction.paid_amount, Transaction.returned_amount
+                )
+            ).filter(
                 Transaction.id.in_(transaction_ids),
-                Transaction.customer_id == customer_id
-            ).order_by(Transaction.due_date.asc()).all()
+                Transaction.customer_id == customer.id
+            ).order_by(Transaction.due_date.asc()).with_for_update().populate_existing().all()
 
             if not transactions:
                 return {
@@ -416,8 +569,11 @@ class PayTabsService:
                 }
 
             # Distribute payment across transactions
-            remaining_payment = float(amount)
+            # Money arithmetic stays in Decimal; float only for the response
+            total_amount = Decimal(str(amount))
+            remaining_payment = total_amount
             payments_made = []
+            txn_updates = []
 
             for txn in transactions:
                 if remaining_payment <= 0:
@@ -426,47 +582,44 @@ class PayTabsService:
                 if txn.status not in ['confirmed', 'overdue']:
                     continue
 
-                txn_remaining = txn.remaining_amount
+                txn_remaining = txn.total_amount - txn.paid_amount - txn.returned_amount
                 payment_for_txn = min(remaining_payment, txn_remaining)
 
-                # Update transaction
-                txn.paid_amount = float(txn.paid_amount) + payment_for_txn
-                txn.updated_at = datetime.utcnow()
-
-                if txn.remaining_amount <= 0:
-                    txn.status = 'paid'
-                    txn.paid_at = datetime.utcnow()
+                txn_updates.append({
+                    'txn_id': txn.id,
+                    'amount': payment_for_txn,
+                    'now': now
+                })
 
                 payments_made.append({
                     'transaction_id': txn.id,
                     'reference_number': txn.reference_number,
-                    'amount': payment_for_txn,
-                    'new_status': txn.status
+                    'amount': float(payment_for_txn),
+                    'new_status': 'paid' if txn_remaining - payment_for_txn <= 0 else txn.status
                 })
 
                 remaining_payment -= payment_for_txn
 
-            # Update customer credit
-            total_paid = float(amount) - remaining_payment
-            customer.available_credit = float(customer.available_credit) + total_paid
-            customer.used_credit = float(customer.used_credit) - total_paid
-            customer.updated_at = datetime.utcnow()
+            total_paid = total_amount - remaining_payment
 
-            # Send notification
-            PayTabsService._notify_payment_success(customer, payment, payments_made)
+            # All transaction updates in one statement, guarded against
+            # concurrent payments; the caller rolls back a partial apply
+            if txn_updates and not PaymentService._apply_transaction_payments(txn_updates):
+                return {
+                    'success': False,
+                    'message': 'Transaction balance changed during payment processing',
+                    'error_code': 'VAL_001'
+                }
 
-            db.session.commit()
+            # Update customer credit
+            PaymentService._release_credit(customer.id, total_paid, now)
 
             return {
                 'success': True,
                 'message': 'Payment processed successfully',
                 'data': {
-                    'total_paid': total_paid,
-                    'payments': payments_made,
-                    'credit': {
-                        'available_credit': float(customer.available_credit),
-                        'used_credit': float(customer.used_credit)
-                    }
+                    'total_paid': float(total_paid),
+                    'payments': payments_made
                 }
             }
 
@@ -491,11 +644,10 @@ class PayTabsService:
 
         try:
             base_url = PayTabsService.get_base_url()
-            response = requests.post(
+            response = PayTabsService._get_session().post(
                 f"{base_url}/payment/query",
-                headers=PayTabsService.get_headers(),
                 json=payload,
-                timeout=30
+                timeout=_REQUEST_TIMEOUT
             )
 
             response_data = response.json()
@@ -538,7 +690,9 @@ class PayTabsService:
         config = PayTabsService.get_config()
 
         # Find the original payment
-        payment = Payment.query.filter_by(gateway_reference=tran_ref).first()
+        payment = Payment.query.options(
+            defer(Payment.gateway_response)
+        ).filter_by(gateway_reference=tran_ref).first()
 
         if not payment:
             return {
@@ -574,11 +728,10 @@ class PayTabsService:
 
         try:
             base_url = PayTabsService.get_base_url()
-            response = requests.post(
+            response = PayTabsService._get_session().post(
                 f"{base_url}/payment/request",
-                headers=PayTabsService.get_headers(),
                 json=payload,
-                timeout=30
+                timeout=_REQUEST_TIMEOUT
             )
 
             response_data = response.json()
@@ -627,15 +780,15 @@ class PayTabsService:
     # ==================== Verify Webhook Signature ====================
 
     @staticmethod
-    def verify_signature(payload, signature):
-        """Verify PayTabs webhook signature"""
+    def verify_signature(raw_body, signature):
+        """Verify PayTabs webhook signature over the raw request body"""
         config = PayTabsService.get_config()
         server_key = config['server_key']
 
         # PayTabs uses HMAC-SHA256 for signature
         computed_signature = hmac.new(
             server_key.encode('utf-8'),
-            json.dumps(payload, separators=(',', ':')).encode('utf-8'),
+            raw_body,
             hashlib.sha256
         ).hexdigest()
 
@@ -644,8 +797,8 @@ class PayTabsService:
     # ==================== Notifications ====================
 
     @staticmethod
-    def _notify_payment_success(customer, payment, payments_made):
-        """Send notification for successful payment"""
+    def _notify_payment_success(customer_id, payment_id, payments_made):
+        """Queue the notification for a successful payment (best-effort)"""
         try:
             total_amount = sum(p['amount'] for p in payments_made)
             txn_count = len(payments_made)
@@ -657,16 +810,16 @@ class PayTabsService:
                 body_ar = f'تم استلام دفعة بمبلغ {total_amount} ريال لعدد {txn_count} معاملات'
                 body_en = f'Payment of {total_amount} SAR received for {txn_count} transactions'
 
-            notification = Notification(
-                customer_id=customer.id,
+            create_customer_notification.delay(
+                customer_id=customer_id,
                 title_ar='تم استلام الدفعة بنجاح',
                 title_en='Payment Received Successfully',
                 body_ar=body_ar,
                 body_en=body_en,
-                type='payment',
-                reference_id=payment.id
+                notification_type='payment',
+                related_entity_type='payment',
+                related_entity_id=payment_id
             )
-            db.session.add(notification)
         except Exception:
             pass  # Don't fail the payment if notification fails
 
@@ -675,31 +828,4 @@ class PayTabsService:
     @staticmethod
     def get_available_payment_methods():
         """Get list of available payment methods"""
-        return {
-            'success': True,
-            'data': {
-                'methods': [
-                    {
-                        'code': 'all',
-                        'name_ar': 'جميع الطرق',
-                        'name_en': 'All Methods',
-                        'description_ar': 'بطاقة ائتمان أو Apple Pay',
-                        'description_en': 'Credit Card or Apple Pay'
-                    },
-                    {
-                        'code': 'creditcard',
-                        'name_ar': 'بطاقة ائتمان',
-                        'name_en': 'Credit Card',
-                        'description_ar': 'فيزا أو ماستركارد',
-                        'description_en': 'Visa or Mastercard'
-                    },
-                    {
-                        'code': 'applepay',
-                        'name_ar': 'Apple Pay',
-                        'name_en': 'Apple Pay',
-                        'description_ar': 'الدفع عبر Apple Pay',
-                        'description_en': 'Pay with Apple Pay'
-                    }
-                ]
-            }
-        }
+        return _PAYMENT_METHODS_RESPONSE
@@ -1,9 +1,11 @@
 """
 Report Service - Full Implementation
 """
+from collections import Counter
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case
 from app import db
+from app.extensions import cache
 from app.models.customer import Customer
 from app.models.merchant import Merchant
 from app.models.transaction import Transaction
@@ -15,6 +17,35 @@ from app.utils.role_access import (
     can_view_reports
 )
 
+# Admin reports scan a whole date window; dashboard refreshes within the TTL
+# are served from the cache. Only successful results are cached.
+REPORT_CACHE_TIMEOUT = 300
+
+
+def _is_success(result):
+    """Cache filter: keep only successful report results"""
+    return result.get('success', False)
+
+
+# Report period labels; also the SQLite strftime formats for each bucket
+_PERIOD_FORMATS = {
+    'day': '%Y-%m-%d',
+    'week': '%Y-W%W',
+    'month': '%Y-%m',
+}
+
+
+def _period_bucket(column, group_by):
+    """SQL expression bucketing a timestamp column by day, week or month"""
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return func.strftime(_PERIOD_FORMATS[group_by], column)
+    return func.date_trunc(group_by, column)
+
+
+def _period_label(bucket, group_by):
+    """Format a bucket from _period_bucket as its report label"""
+    return bucket if isinstance(bucket, str) else bucket.strftime(_PERIOD_FORMATS[group_by])
+
 
 class ReportService:
     """Report service with full database implementation"""
@@ -77,20 +108,26 @@ class ReportService:
             if to_date:
                 query = query.filter(Transaction.created_at <= to_date)
 
-            transactions = query.all()
+            # Aggregate in SQL: one row back instead of every transaction
+            is_cancelled = Transaction.status == 'cancelled'
+            total_count, total_amount, paid_amount, cancelled_count, returns_amount = query.with_entities(
+                func.count(Transaction.id),
+                func.sum(Transaction.total_amount),
+                func.sum(Transaction.paid_amount),
+                func.sum(case((is_cancelled, 1), else_=0)),
+                func.sum(case((is_cancelled, Transaction.total_amount), else_=0))
+            ).one()
 
-            total_amount = sum(float(t.total_amount or 0) for t in transactions)
-            paid_amount = sum(float(t.paid_amount or 0) for t in transactions)
-            cancelled = [t for t in transactions if t.status == 'cancelled']
-            returns_amount = sum(float(t.total_amount or 0) for t in cancelled)
+            total_amount = float(total_amount or 0)
+            returns_amount = float(returns_amount or 0)
 
             return {
                 'success': True,
                 'data': {
-                    'total_transactions': len(transactions),
+                    'total_transactions': total_count,
                     'total_amount': total_amount,
-                    'paid_amount': paid_amount,
-                    'total_returns': len(cancelled),
+                    'paid_amount': float(paid_amount or 0),
+                    'total_returns': int(cancelled_count or 0),
                     'returns_amount': returns_amount,
                     'net_amount': total_amount - returns_amount,
                 }
@@ -149,36 +186,36 @@ class ReportService:
             if to_date:
                 query = query.filter(Transaction.created_at <= to_date)
 
-            transactions = query.order_by(Transaction.created_at).all()
-
-            # Group by date
-            grouped = {}
-            for t in transactions:
-                if group_by == 'day':
-                    key = t.created_at.strftime('%Y-%m-%d')
-                elif group_by == 'week':
-                    key = t.created_at.strftime('%Y-W%W')
-                elif group_by == 'month':
-                    key = t.created_at.strftime('%Y-%m')
-                else:
-                    key = t.created_at.strftime('%Y-%m-%d')
-
-                if key not in grouped:
-                    grouped[key] = {'date': key, 'count': 0, 'amount': 0, 'paid': 0}
-                grouped[key]['count'] += 1
-                grouped[key]['amount'] += float(t.total_amount or 0)
-                grouped[key]['paid'] += float(t.paid_amount or 0)
+            # Group by period in SQL
+            if group_by not in _PERIOD_FORMATS:
+                group_by = 'day'
+            bucket = _period_bucket(Transaction.created_at, group_by).label('bucket')
+            rows = query.with_entities(
+                bucket,
+                func.count(Transaction.id),
+                func.sum(Transaction.total_amount),
+                func.sum(Transaction.paid_amount)
+            ).group_by(bucket).order_by(bucket).all()
 
             return {
                 'success': True,
                 'data': {
-                    'data': list(grouped.values())
+                    'data': [
+                        {
+                            'date': _period_label(period, group_by),
+                            'count': count,
+                            'amount': float(amount or 0),
+                            'paid': float(paid or 0)
+                        }
+                        for period, count, amount, paid in rows
+                    ]
                 }
             }
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
     @staticmethod
+    @cache.memoize(timeout=REPORT_CACHE_TIMEOUT, response_filter=_is_success)
     def get_admin_overview(from_date=None, to_date=None, report_type='overview'):
         """Get admin overview report"""
         try:
@@ -193,27 +230,38 @@ class ReportService:
             else:
                 to_date = datetime.utcnow()
 
-            # Query transactions in range
-            transactions = Transaction.query.filter(
-                Transaction.created_at >= from_date,
-                Transaction.created_at <= to_date
-            ).all()
+            # Customer and merchant reports query their own data
+            if report_type == 'customers':
+                return ReportService._build_customers_report(from_date, to_date)
+            elif report_type == 'merchants':
+                return ReportService._build_merchants_report(from_date, to_date)
 
-            # Query payments in range
-            payments = Payment.query.filter(
-                Payment.created_at >= from_date,
-                Payment.created_at <= to_date
+            # Transactions in range, as plain rows of the columns the builders use
+            transactions = db.session.execute(
+                db.select(
+                    Transaction.status,
+                    Transaction.total_amount,
+                    Transaction.created_at,
+                    (Transaction.total_amount - Transaction.paid_amount - Transaction.returned_amount)
+                    .label('remaining_amount')
+                ).where(
+                    Transaction.created_at >= from_date,
+                    Transaction.created_at <= to_date
+                )
             ).all()
 
-            # Build report based on type
             if report_type == 'transactions':
                 return ReportService._build_transactions_report(transactions, from_date, to_date)
-            elif report_type == 'customers':
-                return ReportService._build_customers_report(from_date, to_date)
-            elif report_type == 'merchants':
-                return ReportService._build_merchants_report(from_date, to_date)
-            else:
-                return ReportService._build_overview_report(transactions, payments, from_date, to_date)
+
+            # Payments in range
+            payments = db.session.execute(
+                db.select(Payment.status, Payment.amount).where(
+                    Payment.created_at >= from_date,
+                    Payment.created_at <= to_date
+                )
+            ).all()
+
+            return ReportService._build_overview_report(transactions, payments, from_date, to_date)
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
@@ -225,9 +273,7 @@ class ReportService:
         total_payments = sum(float(p.amount or 0) for p in payments if p.status == 'completed')
 
         # Status breakdown
-        status_counts = {}
-        for t in transactions:
-            status_counts[t.status] = status_counts.get(t.status, 0) + 1
+        status_counts = Counter(t.status for t in transactions)
 
         return {
             'success': True,
@@ -245,14 +291,15 @@ class ReportService:
     @staticmethod
     def _build_transactions_report(transactions, from_date, to_date):
         """Build transactions report"""
-        # Status breakdown
-        status_counts = {}
+        # Status breakdown, totals and daily breakdown in one pass
+        status_counts = Counter()
+        daily = {}
         overdue_amount = 0
         max_transaction = 0
         total_amount = 0
 
         for t in transactions:
-            status_counts[t.status] = status_counts.get(t.status, 0) + 1
+            status_counts[t.status] += 1
             amount = float(t.total_amount or 0)
             total_amount += amount
             if amount > max_transaction:
@@ -260,16 +307,14 @@ class ReportService:
             if t.status == 'overdue':
                 overdue_amount += float(t.remaining_amount or 0)
 
-        avg_transaction = total_amount / len(transactions) if transactions else 0
-
-        # Daily breakdown
-        daily = {}
-        for t in transactions:
             day = t.created_at.strftime('%Y-%m-%d')
-            if day not in daily:
-                daily[day] = {'date': day, 'count': 0, 'amount': 0}
-            daily[day]['count'] += 1
-            daily[day]['amount'] += float(t.total_amount or 0)
+            bucket = daily.get(day)
+            if bucket is None:
+                bucket = daily[day] = {'date': day, 'count': 0, 'amount': 0}
+            bucket['count'] += 1
+            bucket['amount'] += amount
+
+        avg_transaction = total_amount / len(transactions) if transactions else 0
 
         return {
             'success': True,
@@ -289,17 +334,22 @@ class ReportService:
     @staticmethod
     def _build_customers_report(from_date, to_date):
         """Build customers report"""
-        # Total customers
-        total_customers = Customer.query.count()
-        active_customers = Customer.query.filter_by(status='active').count()
-        pending_customers = Customer.query.filter_by(status='pending').count()
-        suspended_customers = Customer.query.filter_by(status='suspended').count()
-
-        # New customers in range
-        new_customers = Customer.query.filter(
-            Customer.created_at >= from_date,
-            Customer.created_at <= to_date
-        ).count()
+        # Customers by status in one grouped query
+        status_counts = dict(
+            db.session.query(Customer.status, func.count(Customer.id)).group_by(Customer.status).all()
+        )
+        total_customers = sum(status_counts.values())
+
+        # New customers in range, per day; their sum is the new customer count
+        day = _period_bucket(Customer.created_at, 'day').label('day')
+        growth = [
+            {'date': _period_label(period, 'day'), 'count': count}
+            for period, count in db.session.query(day, func.count(Customer.id)).filter(
+                Customer.created_at >= from_date,
+                Customer.created_at <= to_date
+            ).group_by(day).order_by(day).all()
+        ]
+        new_customers = sum(g['count'] for g in growth)
 
         # Credit utilization
         total_credit = db.session.query(func.sum(Customer.credit_limit)).scalar() or 0
@@ -310,7 +360,8 @@ class ReportService:
 
         # Top customers
         top_customers = db.session.query(
-            Customer,
+            Customer.bariq_id,
+            Customer.full_name_ar,
             func.count(Transaction.id).label('transactions_count'),
             func.sum(Transaction.total_amount).label('total_amount'),
             func.sum(Transaction.paid_amount).label('paid_amount')
@@ -321,49 +372,37 @@ class ReportService:
          .limit(10).all()
 
         top_customers_data = []
-        for c, count, total, paid in top_customers:
+        for bariq_id, full_name_ar, count, total, paid in top_customers:
             payment_rate = (float(paid or 0) / float(total or 1)) * 100
             top_customers_data.append({
-                'bariq_id': c.bariq_id,
-                'full_name_ar': c.full_name_ar,
+                'bariq_id': bariq_id,
+                'full_name_ar': full_name_ar,
                 'transactions_count': count,
                 'total_amount': float(total or 0),
                 'payment_rate': payment_rate
             })
 
-        # Customer growth
-        growth = {}
-        new_custs = Customer.query.filter(
-            Customer.created_at >= from_date,
-            Customer.created_at <= to_date
-        ).all()
-        for c in new_custs:
-            day = c.created_at.strftime('%Y-%m-%d')
-            if day not in growth:
-                growth[day] = {'date': day, 'count': 0}
-            growth[day]['count'] += 1
-
         return {
             'success': True,
             'data': {
                 'total_customers': total_customers,
-                'active_customers': active_customers,
-                'pending_customers': pending_customers,
-                'suspended_customers': suspended_customers,
+                'active_customers': status_counts.get('active', 0),
+                'pending_customers': status_counts.get('pending', 0),
+                'suspended_customers': status_counts.get('suspended', 0),
                 'new_customers': new_customers,
                 'credit_utilization': credit_utilization,
                 'top_customers': top_customers_data,
-                'customer_growth': sorted(growth.values(), key=lambda x: x['date'])
+                'customer_growth': growth
             }
         }
 
     @staticmethod
     def _build_merchants_report(from_date, to_date):
         """Build merchants report"""
-        # Total merchants
-        total_merchants = Merchant.query.count()
-        active_merchants = Merchant.query.filter_by(status='active').count()
-        pending_merchants = Merchant.query.filter_by(status='pending').count()
+        # Merchants by status in one grouped query
+        status_counts = dict(
+            db.session.query(Merchant.status, func.count(Merchant.id)).group_by(Merchant.status).all()
+        )
 
         # Total branches
         from app.models.branch import Branch
@@ -371,7 +410,9 @@ class ReportService:
 
         # Top merchants
         top_merchants = db.session.query(
-            Merchant,
+            Merchant.name_ar,
+            Merchant.business_type,
+            Merchant.commission_rate,
             func.count(Transaction.id).label('transactions_count'),
             func.sum(Transaction.total_amount).label('total_sales')
         ).join(Transaction, Merchant.id == Transaction.merchant_id)\
@@ -381,11 +422,11 @@ class ReportService:
          .limit(10).all()
 
         top_merchants_data = []
-        for m, count, sales in top_merchants:
-            commission = float(sales or 0) * float(m.commission_rate or 2.5) / 100
+        for name_ar, business_type, commission_rate, count, sales in top_merchants:
+            commission = float(sales or 0) * float(commission_rate or 2.5) / 100
             top_merchants_data.append({
-                'name_ar': m.name_ar,
-                'business_type': m.business_type,
+                'name_ar': name_ar,
+                'business_type': business_type,
                 'transactions_count': count,
                 'total_sales': float(sales or 0),
                 'total_commission': commission
@@ -401,9 +442,9 @@ class ReportService:
         return {
             'success': True,
             'data': {
-                'total_merchants': total_merchants,
-                'active_merchants': active_merchants,
-                'pending_merchants': pending_merchants,
+                'total_merchants': sum(status_counts.values()),
+                'active_merchants': status_counts.get('active', 0),
+                'pending_merchants': status_counts.get('pending', 0),
                 'total_branches': total_branches,
                 'top_merchants': top_merchants_data,
                 'business_types': business_types_dict
@@ -411,6 +452,7 @@ class ReportService:
         }
 
     @staticmethod
+    @cache.memoize(timeout=REPORT_CACHE_TIMEOUT, response_filter=_is_success)
     def get_financial_report(from_date=None, to_date=None):
         """Get financial report"""
         try:
@@ -425,34 +467,58 @@ class ReportService:
             else:
                 to_date = datetime.utcnow()
 
-            # Query transactions
-            transactions = Transaction.query.filter(
+            # Daily transaction totals with per-merchant commission, in SQL
+            day_bucket = _period_bucket(Transaction.created_at, 'day').label('day')
+            commission_rate = func.coalesce(Merchant.commission_rate, 2.5)
+            transaction_days = db.session.query(
+                day_bucket,
+                func.count(Transaction.id),
+                func.sum(Transaction.total_amount),
+                func.sum(Transaction.paid_amount * commission_rate / 100)
+            ).outerjoin(Merchant, Merchant.id == Transaction.merchant_id).filter(
                 Transaction.created_at >= from_date,
                 Transaction.created_at <= to_date
-            ).all()
-
-            # Query completed payments
-            payments = Payment.query.filter(
+            ).group_by(day_bucket).all()
+
+            # Completed payments summed per day and method in one grouped query
+            payment_day = _period_bucket(Payment.created_at, 'day').label('day')
+            payment_days = db.session.query(
+                payment_day,
+                Payment.payment_method,
+                func.sum(Payment.amount)
+            ).filter(
                 Payment.created_at >= from_date,
                 Payment.created_at <= to_date,
                 Payment.status == 'completed'
-            ).all()
+            ).group_by(payment_day, Payment.payment_method).all()
 
-            # Calculate totals
-            total_revenue = sum(float(t.total_amount or 0) for t in transactions)
-            total_paid = sum(float(p.amount or 0) for p in payments)
+            # Daily breakdown; commission is calculated on paid amount
+            daily = {}
+            for period, count, revenue, commission in transaction_days:
+                label = _period_label(period, 'day')
+                daily[label] = {
+                    'date': label,
+                    'transactions_count': count,
+                    'revenue': float(revenue or 0),
+                    'payments': 0,
+                    'commission': float(commission or 0)
+                }
 
-            # Calculate commission
-            commission_by_merchant = {}
-            for t in transactions:
-                if t.merchant_id not in commission_by_merchant:
-                    merchant = Merchant.query.get(t.merchant_id)
-                    rate = float(merchant.commission_rate or 2.5) if merchant else 2.5
-                    commission_by_merchant[t.merchant_id] = rate
-                rate = commission_by_merchant[t.merchant_id]
-                # Commission is calculated on paid amount
+            # Calculate totals
+            total_revenue = sum(d['revenue'] for d in daily.values())
+            total_commission = sum(d['commission'] for d in daily.values())
 
-            total_commission = sum(float(t.paid_amount or 0) * 0.025 for t in transactions)  # Simplified
+            # Daily payments and payment method breakdown
+            total_paid = 0
+            payment_methods = {}
+            for period, method, amount in payment_days:
+                amount = float(amount or 0)
+                total_paid += amount
+                label = _period_label(period, 'day')
+                if label in daily:
+                    daily[label]['payments'] += amount
+                method = method or 'other'
+                payment_methods[method] = payment_methods.get(method, 0) + amount
 
             # Outstanding debt
             outstanding = Transaction.query.filter(
@@ -461,27 +527,6 @@ class ReportService:
 
             collection_rate = (total_paid / total_revenue * 100) if total_revenue > 0 else 0
 
-            # Daily breakdown
-            daily = {}
-            for t in transactions:
-                day = t.created_at.strftime('%Y-%m-%d')
-                if day not in daily:
-                    daily[day] = {'date': day, 'transactions_count': 0, 'revenue': 0, 'payments': 0, 'commission': 0}
-                daily[day]['transactions_count'] += 1
-                daily[day]['revenue'] += float(t.total_amount or 0)
-                daily[day]['commission'] += float(t.paid_amount or 0) * 0.025
-
-            for p in payments:
-                day = p.created_at.strftime('%Y-%m-%d')
-                if day in daily:
-                    daily[day]['payments'] += float(p.amount or 0)
-
-            # Payment method breakdown
-            payment_methods = {}
-            for p in payments:
-                method = p.payment_method or 'other'
-                payment_methods[method] = payment_methods.get(method, 0) + float(p.amount or 0)
-
             return {
                 'success': True,
                 'data': {
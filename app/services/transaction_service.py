@@ -1028,15 +1028,15 @@ class TransactionService:
     def _notify_customer_new_transaction(customer, transaction, merchant, branch):
         """Send notification for new transaction (in-app + push)"""
         try:
-            from app.services.firebase_service import push_manager
+            from app.tasks.notifications import send_customer_push
 
             title_ar = 'معاملة جديدة'
             title_en = 'New Transaction'
             body_ar = f'لديك معاملة جديدة من {merchant.name_ar} بمبلغ {transaction.total_amount} ريال. الرجاء التأكيد.'
             body_en = f'New transaction from {merchant.name_en or merchant.name_ar} for {transaction.total_amount} SAR. Please confirm.'
 
-            # Send push notification + create in-app notification
-            push_manager.send_to_customer(
+            # Queue push notification + in-app notification
+            send_customer_push.delay(
                 customer_id=customer.id,
                 title_ar=title_ar,
                 body_ar=body_ar,
@@ -1061,9 +1061,9 @@ class TransactionService:
     def _notify_customer_cancelled(customer, transaction, reason):
         """Send notification for cancelled transaction (in-app + push)"""
         try:
-            from app.services.firebase_service import push_manager
+            from app.tasks.notifications import send_customer_push
 
-            push_manager.send_to_customer(
+            send_customer_push.delay(
                 customer_id=customer.id,
                 title_ar='تم إلغاء المعاملة',
                 body_ar=f'تم إلغاء المعاملة رقم {transaction.reference_number}',
@@ -1085,9 +1085,9 @@ class TransactionService:
     def _notify_customer_return(customer, transaction, return_amount):
         """Send notification for processed return (in-app + push)"""
         try:
-            from app.services.firebase_service import push_manager
+            from app.tasks.notifications import send_customer_push
 
-            push_manager.send_to_customer(
+            send_customer_push.delay(
                 customer_id=customer.id,
                 title_ar='تم استرداد مبلغ',
                 body_ar=f'تم استرداد {return_amount} ريال من المعاملة رقم {transaction.reference_number}',
@@ -1110,9 +1110,9 @@ class TransactionService:
     def _notify_customer_overdue(customer, transaction):
         """Send notification for overdue transaction (in-app + push)"""
         try:
-            from app.services.firebase_service import push_manager
+            from app.tasks.notifications import send_customer_push
 
-            push_manager.send_to_customer(
+            send_customer_push.delay(
                 customer_id=customer.id,
                 title_ar='معاملة متأخرة',
                 body_ar=f'المعاملة رقم {transaction.reference_number} متأخرة عن موعد السداد. الرجاء السداد في أقرب وقت.',
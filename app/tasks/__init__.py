@@ -1,3 +1,84 @@
 """
 Celery Tasks Package
+
+Background jobs executed by Celery workers. Celery is optional: when it is
+not installed, or no broker is configured, tasks run inline in the caller.
 """
+import functools
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Celery - optional import
+try:
+    from celery import Celery, Task, shared_task
+    CELERY_AVAILABLE = True
+except ImportError:
+    CELERY_AVAILABLE = False
+    logger.warning("celery not installed. Background tasks will run inline.")
+
+
+def init_celery(app):
+    """Create the Celery app bound to the Flask app config and context"""
+    if not CELERY_AVAILABLE:
+        return None
+
+    class FlaskTask(Task):
+        def __call__(self, *args, **kwargs):
+            with app.app_context():
+                return self.run(*args, **kwargs)
+
+    broker_url = app.config.get('CELERY_BROKER_URL')
+    celery_app = Celery(app.name, task_cls=FlaskTask)
+    celery_app.conf.update(
+        broker_url=broker_url,
+        task_ignore_result=True,
+        # Without a broker, .delay() executes the task synchronously
+        task_always_eager=not broker_url,
+        beat_schedule={
+            'prune-stale-devices': {
+                'task': 'app.tasks.maintenance.prune_stale_devices',
+                'schedule': 24 * 60 * 60,
+            },
+        },
+    )
+    celery_app.set_default()
+    app.extensions['celery'] = celery_app
+    return celery_app
+
+
+class _InlineRetry(Exception):
+    """Raised by a task running inline that asked to be retried"""
+
+
+class _InlineTask:
+    """Stand-in for the bound task when running inline: retries are not possible"""
+
+    def retry(self, exc=None, **kwargs):
+        return _InlineRetry(exc)
+
+
+def background_task(**options):
+    """
+    Declare a background task.
+
+    With Celery this is a shared task; without it the function is returned
+    with a `.delay` alias that calls it inline. Bound tasks (bind=True)
+    receive an inline stand-in; a retry request is logged and dropped.
+    """
+    def decorator(func):
+        if CELERY_AVAILABLE:
+            return shared_task(**options)(func)
+        if options.get('bind'):
+            @functools.wraps(func)
+            def run_inline(*args, **kwargs):
+                try:
+                    return func(_InlineTask(), *args, **kwargs)
+                except _InlineRetry as retry:
+                    logger.warning(f"Task {func.__name__} failed and was not retried: {retry.args[0]}")
+                    return None
+            run_inline.delay = run_inline
+            return run_inline
+        func.delay = func
+        return func
+    return decorator
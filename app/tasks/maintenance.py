@@ -0,0 +1,12 @@
+"""
+Maintenance Tasks
+"""
+from app.tasks import background_task
+
+
+@background_task(ignore_result=True)
+def prune_stale_devices():
+    """Deactivate idle push devices and drop duplicated FCM tokens"""
+    from app.services.notification_service import NotificationService
+
+    return NotificationService.prune_stale_devices()
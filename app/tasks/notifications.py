@@ -0,0 +1,98 @@
+"""
+Push Notification Tasks
+
+Tasks are acknowledged only after they finish and retried on transient
+database or FCM failures. Push retries never re-create the in-app
+notification; they only redeliver to the devices.
+"""
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from app.services.firebase_service import push_manager
+from app.services.notification_service import NotificationService
+from app.tasks import background_task
+
+_RETRY_OPTIONS = {
+    'bind': True,
+    'acks_late': True,
+    'max_retries': 5,
+    'default_retry_delay': 60,
+    'ignore_result': True,
+}
+
+
+def _retry_push(task, send, **kwargs):
+    """Run a push send, retrying without the in-app record on transient failure"""
+    try:
+        result = send(**kwargs)
+    except SQLAlchemyError as error:
+        db.session.rollback()
+        exc = error
+    else:
+        if not result.get('retryable'):
+            return result
+        exc = RuntimeError('FCM unavailable, no device reached')
+    raise task.retry(exc=exc, args=(), kwargs={**kwargs, 'create_in_app': False})
+
+
+@background_task(**_RETRY_OPTIONS)
+def send_customer_push(self, customer_id, title_ar, body_ar, title_en=None, body_en=None, data=None,
+                       notification_type=None, related_entity_type=None, related_entity_id=None,
+                       create_in_app=True):
+    """Create the in-app notification and push it to the customer's devices"""
+    return _retry_push(
+        self,
+        push_manager.send_to_customer,
+        customer_id=customer_id,
+        title_ar=title_ar,
+        body_ar=body_ar,
+        title_en=title_en,
+        body_en=body_en,
+        data=data,
+        notification_type=notification_type,
+        related_entity_type=related_entity_type,
+        related_entity_id=related_entity_id,
+        create_in_app=create_in_app
+    )
+
+
+@background_task(**_RETRY_OPTIONS)
+def send_staff_push(self, staff_id, title_ar, body_ar, title_en=None, body_en=None, data=None,
+                    notification_type=None, related_entity_type=None, related_entity_id=None,
+                    create_in_app=True):
+    """Create the in-app notification and push it to the staff member's devices"""
+    return _retry_push(
+        self,
+        lambda staff_id, **kwargs: push_manager.send_to_merchant_user(merchant_user_id=staff_id, **kwargs),
+        staff_id=staff_id,
+        title_ar=title_ar,
+        body_ar=body_ar,
+        title_en=title_en,
+        body_en=body_en,
+        data=data,
+        notification_type=notification_type,
+        related_entity_type=related_entity_type,
+        related_entity_id=related_entity_id,
+        create_in_app=create_in_app
+    )
+
+
+@background_task(**_RETRY_OPTIONS)
+def create_customer_notification(self, customer_id, title_ar, body_ar, notification_type,
+                                 title_en=None, body_en=None, related_entity_type=None,
+                                 related_entity_id=None):
+    """Create an in-app notification for the customer without a device push"""
+    result = NotificationService.create_notification(
+        customer_id=customer_id,
+        title_ar=title_ar,
+        body_ar=body_ar,
+        notification_type=notification_type,
+        title_en=title_en,
+        body_en=body_en,
+        related_entity_type=related_entity_type,
+        related_entity_id=related_entity_id
+    )
+    if result.get('error_code') == 'SYS_001':
+        # The write was rolled back, so a retry cannot duplicate it
+        raise self.retry(exc=RuntimeError(result['message']))
+    return result
@@ -0,0 +1,57 @@
+"""
+Keyset Pagination Utilities
+
+Opaque, signed cursors for `(created_at, id)` keyset pagination. A cursor
+encodes the sort key of the last row on a page, so the next page is a
+single index seek instead of an OFFSET scan.
+"""
+from datetime import datetime
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+
+_CURSOR_SALT = 'pagination-cursor'
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor is malformed or has been tampered with"""
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=_CURSOR_SALT)
+
+
+def encode_cursor(created_at, row_id):
+    """Encode the `(created_at, id)` sort key of a row into an opaque cursor"""
+    return _serializer().dumps([created_at.isoformat(), row_id])
+
+
+def decode_cursor(token):
+    """
+    Decode a cursor back into a `(created_at, id)` tuple.
+
+    Raises InvalidCursorError if the token is invalid.
+    """
+    try:
+        created_at, row_id = _serializer().loads(token)
+        return datetime.fromisoformat(created_at), row_id
+    except (BadSignature, TypeError, ValueError) as e:
+        raise InvalidCursorError('Invalid pagination cursor') from e
+
+
+def keyset_page(rows, per_page):
+    """
+    Split a `LIMIT per_page + 1` result into the page and its cursor meta.
+
+    Rows must expose `created_at` and `id` attributes.
+    """
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = None
+    if has_next:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, {
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'has_next': has_next
+    }
@@ -0,0 +1,63 @@
+"""
+Query Counting Utilities
+
+Helpers for catching N+1 query regressions by counting executed SQL statements.
+"""
+import logging
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """
+    Collect the SQL statements executed inside the block.
+
+    Usage:
+        with count_queries() as queries:
+            MerchantService.get_staff(merchant_id, per_page=100)
+        assert len(queries) <= 3
+    """
+    engine = engine or db.engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def register_query_count_warning(app):
+    """
+    Log a warning for requests that execute more than
+    QUERY_COUNT_WARNING_THRESHOLD statements (disabled when unset).
+    """
+    threshold = app.config.get('QUERY_COUNT_WARNING_THRESHOLD')
+    if not threshold:
+        return
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g._query_count = g.get('_query_count', 0) + 1
+
+    @app.after_request
+    def warn_on_query_count(response):
+        query_count = g.get('_query_count', 0)
+        if query_count > threshold:
+            logger.warning(
+                "%s %s executed %d SQL queries (threshold %d)",
+                request.method, request.path, query_count, threshold
+            )
+        return response
@@ -219,6 +219,23 @@ def build_notification_event_data(notification):
     }
 
 
+def build_unread_count_event_data(delta, notification_id=None):
+    """
+    Build unread badge delta event data.
+
+    Args:
+        delta: Change in the unread notification count (+1 new, -n read)
+        notification_id: Notification that caused the change, if a single one
+
+    Returns:
+        dict: Event data
+    """
+    return {
+        'delta': delta,
+        'notification_id': notification_id
+    }
+
+
 def build_settlement_event_data(settlement):
     """
     Build standard settlement event data.
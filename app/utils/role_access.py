@@ -6,6 +6,7 @@ Provides functions for enforcing role-based data filtering across the merchant p
 from functools import wraps
 from flask import jsonify
 from flask_jwt_extended import get_jwt_identity
+from app.extensions import db
 from app.models.merchant_user import MerchantUser, ROLE_HIERARCHY
 
 
@@ -17,8 +18,11 @@ class AccessDeniedError(Exception):
 
 
 def get_merchant_user(staff_id):
-    """Get MerchantUser by ID"""
-    return MerchantUser.query.filter_by(id=staff_id, is_active=True).first()
+    """Get active MerchantUser by ID (served from the session identity map when loaded)"""
+    user = db.session.get(MerchantUser, staff_id)
+    if user is None or not user.is_active:
+        return None
+    return user
 
 
 def get_accessible_branch_ids(user):
@@ -0,0 +1,58 @@
+"""
+JSON Serialization Utilities
+
+Provides an orjson-backed JSON provider for Flask responses.
+"""
+import logging
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+# orjson - optional import
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.warning("orjson not installed. Falling back to the standard json module.")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that serializes with orjson.
+
+    Keeps Flask's output conventions (sorted keys, HTTP dates) by routing
+    datetimes and non-native types through the default provider's hook.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if not ORJSON_AVAILABLE:
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if not ORJSON_AVAILABLE:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def iter_json_list_response(key, items):
+    """
+    Yield a {"success": true, "data": {key: [...]}} JSON body piece by piece.
+
+    Used with stream_with_context() so large listings are serialized one
+    item at a time instead of being built in memory first.
+    """
+    dumps = current_app.json.dumps
+    yield '{"success":true,"data":{%s:[' % dumps(key)
+    separator = ''
+    for item in items:
+        yield separator + dumps(item)
+        separator = ','
+    yield ']}}'
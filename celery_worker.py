@@ -0,0 +1,12 @@
+"""
+Celery Worker Entry Point
+
+Run with: celery -A celery_worker.celery worker --loglevel=info
+Schedule periodic tasks with: celery -A celery_worker.celery beat --loglevel=info
+"""
+from app import create_app
+import app.tasks.maintenance  # noqa: F401 - register tasks
+import app.tasks.notifications  # noqa: F401 - register tasks
+
+flask_app = create_app()
+celery = flask_app.extensions['celery']
@@ -0,0 +1,54 @@
+"""Add partial indexes for active merchants, branches and staff
+
+Revision ID: 007_active_partial_indexes
+Revises: 005_add_payment_lock
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007_active_partial_indexes'
+down_revision = '005_add_payment_lock'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Build concurrently so the tables stay writable during the migration
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_merchants_active_name', 'merchants', ['name_ar'],
+            postgresql_where=sa.text("status = 'active'"),
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_branches_merchant_active', 'branches', ['merchant_id'],
+            postgresql_where=sa.text('is_active'),
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_merchant_users_merchant_active', 'merchant_users', ['merchant_id'],
+            postgresql_where=sa.text('is_active'),
+            postgresql_concurrently=True
+        )
+        # Supports the correlated EXISTS lookup used when filtering stores by city
+        op.create_index(
+            'ix_branches_city_active_merchant', 'branches', ['city', 'merchant_id'],
+            postgresql_where=sa.text('is_active'),
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_branches_city_active_merchant', table_name='branches',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_merchant_users_merchant_active', table_name='merchant_users',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_branches_merchant_active', table_name='branches',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_merchants_active_name', table_name='merchants',
+                      postgresql_concurrently=True)
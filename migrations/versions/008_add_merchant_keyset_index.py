@@ -0,0 +1,31 @@
+"""Add composite index for keyset pagination of merchant search
+
+Revision ID: 008_merchant_keyset_index
+Revises: 007_active_partial_indexes
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008_merchant_keyset_index'
+down_revision = '007_active_partial_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_merchants_status_city_created', 'merchants',
+            ['status', 'city', sa.text('created_at DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_merchants_status_city_created', table_name='merchants',
+                      postgresql_concurrently=True)
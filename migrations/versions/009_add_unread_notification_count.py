@@ -0,0 +1,48 @@
+"""Add unread notification counter to customers and feed pagination index
+
+Revision ID: 009_unread_notification_count
+Revises: 008_merchant_keyset_index
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009_unread_notification_count'
+down_revision = '008_merchant_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('customers',
+        sa.Column('unread_notification_count', sa.Integer(), server_default='0', nullable=False)
+    )
+
+    # Backfill from existing notifications
+    op.execute("""
+        UPDATE customers SET unread_notification_count = counts.unread
+        FROM (
+            SELECT customer_id, count(*) AS unread
+            FROM notifications
+            WHERE is_read = false AND customer_id IS NOT NULL
+            GROUP BY customer_id
+        ) AS counts
+        WHERE customers.id = counts.customer_id
+    """)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_notifications_customer_created', 'notifications',
+            ['customer_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_notifications_customer_created', table_name='notifications',
+                      postgresql_concurrently=True)
+    op.drop_column('customers', 'unread_notification_count')
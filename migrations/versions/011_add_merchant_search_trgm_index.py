@@ -0,0 +1,34 @@
+"""Add trigram index for admin merchant search
+
+Revision ID: 011_merchant_search_trgm
+Revises: 009_unread_notification_count
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '011_merchant_search_trgm'
+down_revision = '009_unread_notification_count'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # Expression must stay in sync with _MERCHANT_SEARCH_EXPR in merchant_service
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_merchants_search_trgm
+            ON merchants USING gin ((
+                coalesce(name_ar, '') || ' ' || coalesce(name_en, '') || ' ' ||
+                coalesce(commercial_registration, '') || ' ' || coalesce(email, '')
+            ) gin_trgm_ops)
+        """)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_merchants_search_trgm')
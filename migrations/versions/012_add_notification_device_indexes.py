@@ -0,0 +1,62 @@
+"""Add composite indexes for notification feeds and active devices
+
+Revision ID: 012_notification_device_indexes
+Revises: 011_merchant_search_trgm
+Create Date: 2026-10-16
+
+ix_notif_cust_read_created leads with customer_id and covers unread
+lookups through its (customer_id, is_read) prefix, so the single-column
+customer_id index is dropped.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012_notification_device_indexes'
+down_revision = '011_merchant_search_trgm'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_notif_cust_read_created', 'notifications',
+            ['customer_id', 'is_read', sa.text('created_at DESC')],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_notif_staff_read_created', 'notifications',
+            ['merchant_user_id', 'is_read', sa.text('created_at DESC')],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_customer_devices_customer_active', 'customer_devices',
+            ['customer_id', 'is_active'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_merchant_user_devices_user_active', 'merchant_user_devices',
+            ['merchant_user_id', 'is_active'],
+            postgresql_concurrently=True
+        )
+        op.drop_index('ix_notifications_customer_id', table_name='notifications',
+                      postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_notifications_customer_id', 'notifications', ['customer_id'],
+            postgresql_concurrently=True
+        )
+        op.drop_index('ix_merchant_user_devices_user_active', table_name='merchant_user_devices',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_customer_devices_customer_active', table_name='customer_devices',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_notif_staff_read_created', table_name='notifications',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_notif_cust_read_created', table_name='notifications',
+                      postgresql_concurrently=True)
@@ -0,0 +1,46 @@
+"""Add composite indexes for outstanding transactions and payment history
+
+Revision ID: 013_payment_transaction_indexes
+Revises: 012_notification_device_indexes
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '013_payment_transaction_indexes'
+down_revision = '012_notification_device_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_txn_customer_status_due', 'transactions',
+            ['customer_id', 'status', 'due_date'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_pay_status_completed', 'payments',
+            ['status', 'completed_at', 'payment_method'],
+            postgresql_include=['amount'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_pay_customer_created', 'payments',
+            ['customer_id', sa.text('created_at DESC')],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_pay_customer_created', table_name='payments',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_pay_status_completed', table_name='payments',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_txn_customer_status_due', table_name='transactions',
+                      postgresql_concurrently=True)
@@ -0,0 +1,30 @@
+"""Add keyset pagination index for the admin payment list
+
+Revision ID: 014_payment_keyset_index
+Revises: 013_payment_transaction_indexes
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '014_payment_keyset_index'
+down_revision = '013_payment_transaction_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_pay_created_id', 'payments',
+            ['created_at', 'id'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_pay_created_id', table_name='payments',
+                      postgresql_concurrently=True)
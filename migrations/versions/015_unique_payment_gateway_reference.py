@@ -0,0 +1,59 @@
+"""Make the payment gateway reference index unique
+
+Revision ID: 015_unique_gateway_reference
+Revises: 014_payment_keyset_index
+Create Date: 2026-10-16
+
+The unique index is built under a new name before the old one is dropped,
+so gateway_reference stays indexed if the build fails.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '015_unique_gateway_reference'
+down_revision = '014_payment_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Duplicated PayTabs references need manual review; refuse to continue
+    duplicates = op.get_bind().exec_driver_sql("""
+        SELECT gateway_reference FROM payments
+        WHERE gateway_reference IS NOT NULL
+        GROUP BY gateway_reference
+        HAVING count(*) > 1
+        LIMIT 10
+    """).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            'payments.gateway_reference has duplicates, resolve them before upgrading: '
+            + ', '.join(duplicates)
+        )
+
+    with op.get_context().autocommit_block():
+        # A failed concurrent build leaves an INVALID index behind
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS uq_payments_gateway_reference')
+        op.create_index(
+            'uq_payments_gateway_reference', 'payments',
+            ['gateway_reference'],
+            unique=True,
+            postgresql_concurrently=True
+        )
+        op.drop_index('ix_payments_gateway_reference', table_name='payments',
+                      postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_payments_gateway_reference')
+        op.create_index(
+            'ix_payments_gateway_reference', 'payments',
+            ['gateway_reference'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.drop_index('uq_payments_gateway_reference', table_name='payments',
+                      postgresql_concurrently=True)
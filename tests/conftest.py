@@ -0,0 +1,28 @@
+"""
+Shared test fixtures
+"""
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.utils.query_counter import count_queries
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def sql_statements(app):
+    """
+    SQL statements executed during the test, captured by a
+    before_cursor_execute listener; clear() it before the call under test.
+    """
+    with count_queries() as statements:
+        yield statements
@@ -0,0 +1,222 @@
+"""
+Merchant service tests
+
+Query-count limits guard the merchant endpoints against N+1 regressions.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models.branch import Branch
+from app.models.customer import Customer
+from app.models.merchant import Merchant
+from app.models.merchant_user import MerchantUser
+from app.models.region import Region
+from app.models.transaction import Transaction
+from app.services.merchant_service import MerchantService
+from app.utils.query_counter import count_queries
+
+
+@pytest.fixture
+def merchant_id(app):
+    merchant = Merchant(
+        name_ar='متجر',
+        name_en='Shop',
+        commercial_registration='CR1',
+        email='shop@example.com',
+        phone='0500000001',
+        status='active',
+        city='riyadh'
+    )
+    db.session.add(merchant)
+    db.session.flush()
+
+    for r in range(3):
+        region = Region(merchant_id=merchant.id, name_ar=f'منطقة {r}', city='riyadh')
+        db.session.add(region)
+        db.session.flush()
+        for b in range(3):
+            branch = Branch(
+                merchant_id=merchant.id,
+                region_id=region.id,
+                name_ar=f'فرع {r}-{b}',
+                city='riyadh',
+                code=f'B{r}{b}',
+                is_active=b != 2
+            )
+            db.session.add(branch)
+            db.session.flush()
+            for s in range(4):
+                user = MerchantUser(
+                    merchant_id=merchant.id,
+                    email=f'staff{r}{b}{s}@example.com',
+                    full_name=f'Staff {r}{b}{s}',
+                    role='cashier',
+                    branch_id=branch.id,
+                    region_id=region.id,
+                    password_hash='not-a-real-hash'
+                )
+                db.session.add(user)
+
+    db.session.commit()
+    return merchant.id
+
+
+def _add_manager(merchant_id, role, email):
+    """Add a manager scoped to the merchant's first region; returns its ID"""
+    region = Region.query.filter_by(merchant_id=merchant_id).order_by(Region.name_ar).first()
+    user = MerchantUser(
+        merchant_id=merchant_id,
+        email=email,
+        full_name=role,
+        role=role,
+        region_id=region.id if role == 'region_manager' else None,
+        password_hash='not-a-real-hash'
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def test_get_staff_query_count(merchant_id):
+    with count_queries() as queries:
+        result = MerchantService.get_staff(merchant_id, per_page=100)
+
+    assert result['success'] is True
+    assert len(result['data']['staff']) == 36
+    assert all(staff['branch'] and staff['region'] for staff in result['data']['staff'])
+    assert len(queries) <= 3
+
+
+def test_get_regions_query_count(merchant_id):
+    with count_queries() as queries:
+        result = MerchantService.get_regions(merchant_id)
+
+    assert result['success'] is True
+    assert [region['branch_count'] for region in result['data']['regions']] == [2, 2, 2]
+    assert len(queries) <= 2
+
+
+def test_get_merchant_statistics_query_count(merchant_id):
+    customer = Customer(
+        national_id='1000000000',
+        full_name_ar='عميل',
+        phone='0500000000',
+        status='active',
+        credit_limit=1000,
+        available_credit=1000
+    )
+    db.session.add(customer)
+    db.session.flush()
+    branch_id = db.session.scalars(db.select(Branch.id).filter_by(merchant_id=merchant_id)).first()
+    for status, paid in (('confirmed', 40), ('paid', 100), ('pending', 0)):
+        db.session.add(Transaction(
+            customer_id=customer.id,
+            merchant_id=merchant_id,
+            branch_id=branch_id,
+            subtotal=100,
+            total_amount=100,
+            paid_amount=paid,
+            status=status,
+            due_date=date.today() + timedelta(days=10)
+        ))
+    db.session.commit()
+
+    with count_queries() as queries:
+        result = MerchantService.get_merchant_statistics(merchant_id)
+
+    assert result['success'] is True
+    assert result['data']['statistics'] == {
+        'total_transactions': 3,
+        'total_sales': 200.0,
+        'pending_settlement': 60.0,
+        'active_branches': 6,
+        'active_staff': 36
+    }
+    assert len(queries) <= 3
+
+
+# Every endpoint below loads with raiseload('*'): an attribute the
+# serializers touch without eager loading fails the test instead of
+# issuing a lazy query in production.
+
+@pytest.mark.parametrize('role, expected_staff', [('owner', 37), ('region_manager', 13)])
+def test_get_staff_for_requester(merchant_id, sql_statements, role, expected_staff):
+    requester_id = _add_manager(merchant_id, role, f'{role}@example.com')
+    sql_statements.clear()
+
+    result = MerchantService.get_staff(merchant_id, requester_id=requester_id, per_page=100)
+
+    assert result['success'] is True
+    assert len(result['data']['staff']) == expected_staff
+    assert len(sql_statements) <= 4
+
+
+@pytest.mark.parametrize('role, expected_regions', [('owner', 3), ('region_manager', 1)])
+def test_get_regions_for_staff(merchant_id, sql_statements, role, expected_regions):
+    staff_id = _add_manager(merchant_id, role, f'{role}@example.com')
+    sql_statements.clear()
+
+    result = MerchantService.get_regions(merchant_id, staff_id=staff_id)
+
+    assert result['success'] is True
+    assert len(result['data']['regions']) == expected_regions
+    assert len(sql_statements) <= 3
+
+
+def test_get_branches_query_count(merchant_id, sql_statements):
+    sql_statements.clear()
+
+    result = MerchantService.get_branches(merchant_id, is_active=True)
+
+    assert result['success'] is True
+    assert len(result['data']['branches']) == 6
+    assert len(sql_statements) <= 2
+
+
+def test_get_branches_for_region_manager(merchant_id, sql_statements):
+    staff_id = _add_manager(merchant_id, 'region_manager', 'region_manager@example.com')
+    sql_statements.clear()
+
+    result = MerchantService.get_branches(merchant_id, staff_id=staff_id)
+
+    assert result['success'] is True
+    assert len(result['data']['branches']) == 2
+    assert len(sql_statements) <= 4
+
+
+def test_get_branch_query_count(merchant_id, sql_statements):
+    branch_id = db.session.scalars(
+        db.select(Branch.id).filter_by(merchant_id=merchant_id, code='B00')
+    ).one()
+    sql_statements.clear()
+
+    result = MerchantService.get_branch(merchant_id, branch_id)
+
+    assert result['success'] is True
+    assert result['data']['branch']['staff_count'] == 4
+    assert result['data']['branch']['region']['name_ar'] == 'منطقة 0'
+    assert len(sql_statements) <= 2
+
+
+def test_get_store_details_query_count(merchant_id, sql_statements):
+    sql_statements.clear()
+
+    result = MerchantService.get_store_details(merchant_id)
+
+    assert result['success'] is True
+    assert result['data']['merchant']['name_en'] == 'Shop'
+    assert len(result['data']['branches']) == 6
+    assert len(sql_statements) <= 2
+
+
+def test_get_store_details_skips_branches_for_unavailable_store(merchant_id, sql_statements):
+    db.session.get(Merchant, merchant_id).status = 'suspended'
+    db.session.commit()
+    sql_statements.clear()
+
+    result = MerchantService.get_store_details(merchant_id)
+
+    assert result['error_code'] == 'MERCH_003'
+    assert len(sql_statements) == 1
@@ -0,0 +1,86 @@
+"""
+Notification service tests
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models.customer import Customer
+from app.models.device import CustomerDevice
+from app.services.firebase_service import push_manager
+from app.services.notification_service import NotificationService, DEVICE_STALE_DAYS
+
+
+@pytest.fixture
+def customer(app):
+    customer = Customer(
+        national_id='1000000000',
+        full_name_ar='عميل',
+        phone='0500000000',
+        status='active',
+        credit_limit=1000,
+        available_credit=1000
+    )
+    db.session.add(customer)
+    db.session.commit()
+    return customer
+
+
+def _add_device(customer, token, last_used_at):
+    device = CustomerDevice(
+        customer_id=customer.id,
+        fcm_token=token,
+        device_type='android',
+        is_active=True,
+        last_used_at=last_used_at
+    )
+    db.session.add(device)
+    db.session.commit()
+    return device.id
+
+
+def test_prune_keeps_device_that_recently_received_a_push(customer):
+    registered_at = datetime.utcnow() - timedelta(days=DEVICE_STALE_DAYS + 10)
+    pushed_id = _add_device(customer, 'token-pushed', registered_at)
+    idle_id = _add_device(customer, 'token-idle', registered_at)
+
+    # Registered long ago, but FCM accepted a push to it today
+    push_manager._record_delivery(['token-pushed'], {'success_count': 1, 'failed_tokens': []}, 'customer')
+
+    result = NotificationService.prune_stale_devices()
+
+    assert result['success'] is True
+    assert result['data']['customer_devices']['deactivated'] == 1
+    assert db.session.get(CustomerDevice, pushed_id).is_active is True
+    assert db.session.get(CustomerDevice, idle_id).is_active is False
+
+
+def test_record_delivery_deactivates_unregistered_tokens(customer):
+    device_id = _add_device(customer, 'token-gone', datetime.utcnow())
+
+    push_manager._record_delivery(['token-gone'], {
+        'success_count': 0,
+        'failed_tokens': [{'token': 'token-gone', 'error': 'UnregisteredError: Requested entity was not found.'}]
+    }, 'customer')
+
+    assert db.session.get(CustomerDevice, device_id).is_active is False
+
+
+def test_deferred_notification_emits_only_after_commit(customer, monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        'app.services.notification_service.emit_to_customer',
+        lambda customer_id, event_name, data: sent.append(event_name)
+    )
+
+    NotificationService.create_notification(customer.id, 'عنوان', 'نص', 'credit_limit', commit=False)
+    assert sent == []
+    db.session.commit()
+    assert sent == ['notification_new', 'unread_count_changed']
+
+    sent.clear()
+    NotificationService.create_notification(customer.id, 'عنوان', 'نص', 'credit_limit', commit=False)
+    db.session.rollback()
+    db.session.commit()
+    assert sent == []
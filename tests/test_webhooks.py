@@ -0,0 +1,48 @@
+"""
+Webhook route tests
+"""
+import io
+import json
+
+import pytest
+
+from app.api.v1.webhooks import WEBHOOK_MAX_BODY_BYTES
+
+PAYTABS_URL = '/api/v1/webhooks/paytabs'
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _oversize_body():
+    return json.dumps({'padding': 'x' * (WEBHOOK_MAX_BODY_BYTES + 1)}).encode()
+
+
+def test_paytabs_rejects_declared_oversize_body(client):
+    response = client.post(PAYTABS_URL, data=_oversize_body(), content_type='application/json')
+
+    assert response.status_code == 413
+
+
+def test_paytabs_rejects_chunked_oversize_body(client):
+    body = io.BytesIO(_oversize_body())
+    response = client.post(
+        PAYTABS_URL,
+        input_stream=body,
+        content_type='application/json',
+        headers={'Transfer-Encoding': 'chunked'},
+        # Set by gunicorn, which de-chunks the body before the app reads it
+        environ_overrides={'wsgi.input_terminated': True}
+    )
+
+    assert response.status_code == 413
+    # Only the limit plus one byte was consumed from the stream
+    assert body.tell() == WEBHOOK_MAX_BODY_BYTES + 1
+
+
+def test_paytabs_rejects_invalid_json(client):
+    response = client.post(PAYTABS_URL, data=b'{not json', content_type='application/json')
+
+    assert response.status_code == 400